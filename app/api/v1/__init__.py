@@ -1,5 +1,7 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import router as pollution_router
+from app.api.v1.endpoints.pollution import router as pollution_router
+from app.api.v1.endpoints.users import router as users_router
 
 api_router = APIRouter()
-api_router.include_router(pollution_router, prefix="/pollution", tags=["pollution"])
\ No newline at end of file
+api_router.include_router(pollution_router, prefix="/pollution", tags=["pollution"])
+api_router.include_router(users_router, prefix="/users", tags=["users"])
\ No newline at end of file
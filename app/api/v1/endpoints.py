@@ -1,17 +0,0 @@
-from fastapi import APIRouter
-
-router = APIRouter()
-
-@router.get("/pollution-data")
-async def get_pollution_data():
-    """
-    Endpoint to retrieve pollution data
-    """
-    return {"message": "Pollution data endpoint"}
-
-@router.post("/analyze-image")
-async def analyze_image():
-    """
-    Endpoint to analyze uploaded images
-    """
-    return {"message": "Image analysis endpoint"}
\ No newline at end of file
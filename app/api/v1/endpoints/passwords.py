@@ -1,47 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 import secrets
 
-from app.core.deps import get_db
+from app.database import get_db
 from app.services import auth_service
 from app.schemas.user import PasswordReset
 from app.core.config import settings
+from app.core.rate_limit import RateLimiter, client_route
 
 router = APIRouter()
 
+# Same per-IP, per-endpoint budget as the auth endpoints
+rate_limiter = RateLimiter(
+    requests_per_minute=settings.AUTH_RATE_LIMIT_PER_MINUTE,
+    key_func=client_route,
+    scope="auth",
+)
+
 @router.post("/forgot-password")
-async def forgot_password(email: str, db: Session = Depends(get_db)):
+async def forgot_password(email: str, db: AsyncSession = Depends(get_db)):
     """
     Initiates password reset process by generating and storing a reset token.
-    In a production environment, this would send an email with the reset link.
+    The reset link is emailed through the outbox when SMTP is configured.
     """
-    user = auth_service.get_user_by_email(db, email)
+    user = await auth_service.get_user_by_email(db, email)
     if not user:
         # We return success even if email doesn't exist for security
         return {"message": "If this email exists, a reset link has been sent"}
     
     # Generate reset token
     reset_token = secrets.token_urlsafe(32)
-    auth_service.store_reset_token(db, user.id, reset_token)
+    await auth_service.store_reset_token(db, user.id, reset_token, email=user.email)
     
-    # Here you would normally send an email with the reset link
-    # For development, we'll just return the token
+    # The email is queued by store_reset_token; for development we also return the token
     return {"reset_token": reset_token}
 
 @router.post("/reset-password")
 async def reset_password(
+    request: Request,
     reset_data: PasswordReset,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Resets user password using the provided reset token.
+    Resets user password using the provided reset token. Rate limited per
+    IP. The token is checked before the new password is hashed and is used
+    up atomically, so it works once.
     """
-    if not auth_service.verify_reset_token(db, reset_data.token):
+    await rate_limiter.check_rate_limit(request)
+    if not await auth_service.reset_password(db, reset_data.token, reset_data.new_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired reset token"
         )
-    
-    auth_service.reset_password(db, reset_data.token, reset_data.new_password)
     return {"message": "Password successfully reset"}
\ No newline at end of file
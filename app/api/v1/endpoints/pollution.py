@@ -0,0 +1,356 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core import responses
+from app.core.deps import get_current_user
+from app.core.responses import ModelResponse
+from app.database import AsyncSessionLocal, get_db
+from app.models.user import User
+from app.schemas.analysis import AnalysisJob
+from app.schemas.pollution import AnomalyReport, ObservationBatchReport, PollutionPage, RegionStatsPage
+from app.services import (
+    analysis_jobs, image_ingest, observation_export, observation_ingest, pollution_service, tile_service,
+)
+from app.services.analysis_cache import analysis_cache
+from app.services.analysis_engine import analysis_engine
+from app.services.pollution_analytics import MAX_PRECISION, severity_analytics
+from app.services.pollution_service import ObservationFilter
+
+router = APIRouter()
+
+_INGEST_CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+@router.get("/pollution-data", response_model=PollutionPage)
+async def get_pollution_data(
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound on observed_at"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound on observed_at"),
+    pollutant_type: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Endpoint to retrieve pollution data
+
+    Returns observations ordered by time, filtered by bounding box, time range
+    and pollutant type. Pages are cursor-based: pass ``next_cursor`` back as
+    ``cursor`` to get the next page. ``format=ndjson`` streams every matching
+    row (starting after ``cursor``, if given) as newline-delimited JSON for
+    exports.
+    """
+    try:
+        filters = ObservationFilter(
+            bbox=pollution_service.parse_bbox(bbox) if bbox else None,
+            start=start,
+            end=end,
+            pollutant_type=pollutant_type,
+        )
+        if cursor:
+            pollution_service.decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    if format == "ndjson":
+        return StreamingResponse(
+            pollution_service.stream_observations_ndjson(filters, cursor),
+            media_type="application/x-ndjson",
+        )
+
+    items, next_cursor = await pollution_service.list_observations(db, filters, limit, cursor)
+    # Rows are already in PollutionObservation shape: written straight by orjson
+    return responses.list_response({"items": items, "next_cursor": next_cursor})
+
+@router.get("/observations/export")
+async def export_observations(
+    format: str = Query("parquet", pattern="^(arrow|parquet)$"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to include (default: all)"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound on observed_at"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound on observed_at"),
+    pollutant_type: Optional[str] = None,
+):
+    """
+    Columnar export of pollution data for offline analysis.
+
+    Streams every matching observation, ordered by time, as a Parquet file
+    (one row group per EXPORT_BATCH_ROWS rows) or an Arrow IPC stream (one
+    record batch per EXPORT_BATCH_ROWS rows). Only the requested columns are
+    read, and the filters are applied by the database. Batches are sent as
+    they are encoded, so exports of any size use constant memory.
+    """
+    try:
+        filters = ObservationFilter(
+            bbox=pollution_service.parse_bbox(bbox) if bbox else None,
+            start=start,
+            end=end,
+            pollutant_type=pollutant_type,
+        )
+        selected = observation_export.parse_columns(columns)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    return StreamingResponse(
+        observation_export.stream_observations(filters, format, selected),
+        media_type=observation_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{observation_export.export_filename(format)}"'},
+    )
+
+@router.get("/stats", response_model=RegionStatsPage)
+async def get_severity_stats(
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    precision: int = Query(4, ge=1, le=MAX_PRECISION, description="Geohash characters per region"),
+    start: Optional[datetime] = Query(None, description="First bucket (default: 24 buckets back)"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound (default: now)"),
+    pollutant_type: Optional[str] = None,
+    region: Optional[str] = Query(None, description="Only regions inside this geohash prefix"),
+    window: int = Query(24, ge=1, le=720, description="Buckets in the rolling mean and z-score baseline"),
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Hourly or daily severity statistics per region.
+
+    For each region (geohash prefix of ``precision`` characters) and bucket
+    with readings: count, mean, max, 50th/90th/99th percentiles, the mean
+    over the trailing ``window`` buckets and the z-score of the bucket's
+    mean against the ``window`` buckets before it. Computed in memory over
+    the last ANALYTICS_RETENTION_DAYS of observations, at most
+    ANALYTICS_REFRESH_SECONDS behind the database.
+    """
+    try:
+        return responses.list_response(await severity_analytics.region_stats(
+            bucket, precision, start, end, pollutant_type, region, window, limit
+        ))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+@router.get("/anomalies", response_model=AnomalyReport)
+async def get_severity_anomalies(
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    precision: int = Query(4, ge=1, le=MAX_PRECISION, description="Geohash characters per region"),
+    pollutant_type: Optional[str] = None,
+    region: Optional[str] = Query(None, description="Only regions inside this geohash prefix"),
+    lookback: int = Query(24, ge=1, le=720, description="Recent buckets to check, the current one included"),
+    window: int = Query(24, ge=2, le=720, description="Buckets in the z-score baseline"),
+    threshold: float = Query(3.0, gt=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Regions whose severity spiked recently, highest score first.
+
+    A region's bucket is reported when its mean severity is ``threshold``
+    or more standard deviations above normal, by z-score (against the
+    region's previous ``window`` buckets) or by EWMA score (against an
+    exponentially weighted mean and variance of all its earlier buckets,
+    weight ANALYTICS_EWMA_ALPHA). Regions need ANALYTICS_MIN_PERIODS buckets
+    of history before they are scored.
+    """
+    try:
+        return responses.list_response(await severity_analytics.anomalies(
+            bucket, precision, pollutant_type, region, lookback, window, threshold, limit
+        ))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+@router.post(
+    "/observations:batch",
+    response_model=ObservationBatchReport,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def ingest_observations(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Ingest a batch of sensor and buoy readings.
+
+    The body is streamed as NDJSON (one reading per line) or msgpack (a
+    sequence of maps, or arrays of maps) with latitude, longitude,
+    observed_at, pollutant_type, severity and optionally source_image.
+    Valid readings are queued and written to the database within
+    INGEST_FLUSH_SECONDS; the report lists invalid readings by their 1-based
+    row number. A batch is queued whole or not at all: when the ingest
+    buffer is full the response is 429 with a Retry-After header.
+    """
+    fmt = _INGEST_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt is None or (fmt == "msgpack" and not observation_ingest.msgpack_available()):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send application/x-ndjson"
+            + (" or application/msgpack" if observation_ingest.msgpack_available() else ""),
+        )
+    buffer = observation_ingest.observation_buffer
+    # Refuse before reading the body when nothing would fit anyway
+    if not buffer.has_room():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Ingest buffer is full",
+            headers={"Retry-After": str(buffer.retry_after())},
+        )
+    try:
+        report = await observation_ingest.ingest(
+            request.stream(), fmt, buffer, max_rows=settings.INGEST_MAX_ROWS_PER_REQUEST
+        )
+    except observation_ingest.IngestTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    except observation_ingest.BufferFull as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return ModelResponse(ObservationBatchReport, report, status_code=status.HTTP_202_ACCEPTED)
+
+@router.get("/tiles/{z}/{x}/{y}")
+async def get_pollution_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    pollutant_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Heatmap tile with severity aggregates per geohash cell.
+
+    Served from precomputed hourly rollups, with the cell size chosen from
+    the zoom level. Responses carry an ETag; a matching If-None-Match
+    gets 304 Not Modified.
+    """
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile out of range")
+
+    etag, body = await tile_service.render_tile(db, z, x, y, start, end, pollutant_type)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={tile_service.tile_cache.ttl_seconds}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.post("/analyze-image")
+async def analyze_image(
+    request: Request,
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Endpoint to analyze uploaded images
+
+    The image is sent as the raw request body with a Content-Type of
+    image/jpeg, image/png or image/tiff. The body is streamed to a temporary
+    file rather than buffered, so memory per upload stays at one chunk
+    regardless of image size. Analysis requests are batched with other
+    concurrent uploads before they reach the model.
+
+    Results are cached by image content and model version; ``cache`` in the
+    response says whether this one came from memory, the result store, an
+    identical in-flight request, or a fresh model run.
+
+    With ``mode=async`` the image is queued and a job is returned straight
+    away (202 Accepted); poll ``GET /jobs/{id}`` or connect to
+    ``/jobs/{id}/ws`` to receive the result.
+    """
+    with await image_ingest.receive_image(request) as image:
+        if mode == "async":
+            job = await analysis_jobs.enqueue(db, image)
+            return ModelResponse(AnalysisJob, job, status_code=status.HTTP_202_ACCEPTED)
+
+        async def compute():
+            with image.view() as buffer:
+                return await analysis_engine.analyze(buffer)
+
+        model_version = analysis_engine.model.version
+        result, source = await analysis_cache.get_or_compute(db, image.sha256, model_version, compute)
+        return {
+            "sha256": image.sha256,
+            "size": image.size,
+            "content_type": image.content_type,
+            "model_version": model_version,
+            "cache": source,
+            "result": result,
+        }
+
+@router.get("/analysis/stats")
+async def get_analysis_stats():
+    """
+    Result cache and batch scheduler counters, including the cache hit ratio.
+    """
+    return {"cache": analysis_cache.stats(), "engine": analysis_engine.stats()}
+
+@router.get("/observations/stats")
+async def get_ingest_stats():
+    """
+    Write-behind buffer counters for batched observation ingest.
+    """
+    return observation_ingest.observation_buffer.stats()
+
+@router.get("/jobs/{job_id}", response_model=AnalysisJob)
+async def get_analysis_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Status of an async analysis job, with its result once it is done.
+    """
+    job = await analysis_jobs.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return ModelResponse(AnalysisJob, job)
+
+async def _push_job_states(websocket: WebSocket, job_id: str) -> None:
+    last_status = None
+    while True:
+        # A short session per poll, so a watcher never holds a connection
+        async with AsyncSessionLocal() as db:
+            job = await analysis_jobs.get_job(db, job_id)
+        if job is None:
+            await websocket.close(code=4404, reason="Job not found")
+            return
+        if job.status != last_status:
+            last_status = job.status
+            await websocket.send_text(AnalysisJob.model_validate(job).model_dump_json())
+        if job.status in analysis_jobs.FINISHED:
+            await websocket.close()
+            return
+        await analysis_jobs.job_events.wait(job_id, settings.ANALYSIS_JOB_POLL_SECONDS)
+
+async def _until_disconnected(websocket: WebSocket) -> None:
+    # Clients only listen; anything they send is ignored
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@router.websocket("/jobs/{job_id}/ws")
+async def watch_analysis_job(websocket: WebSocket, job_id: str):
+    """
+    Pushes the job's state as JSON each time its status changes and closes
+    after the final (done or failed) state. Jobs finished in this process are
+    pushed immediately; jobs finished by an external runner are picked up
+    within ANALYSIS_JOB_POLL_SECONDS. Watching stops as soon as the client
+    disconnects.
+    """
+    await websocket.accept()
+    tasks = [
+        asyncio.create_task(_push_job_states(websocket, job_id)),
+        asyncio.create_task(_until_disconnected(websocket)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
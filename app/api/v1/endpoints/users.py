@@ -0,0 +1,51 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.deps import get_current_superuser
+from app.database import get_db
+from app.models.user import User
+from app.schemas.user import UserImportReport
+from app.services import user_import
+
+router = APIRouter()
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults to the Content-Type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Bulk-create active, verified accounts (superusers only).
+
+    The body is streamed as CSV (header row with email, full_name, password
+    and/or hashed_password) or NDJSON (one object per line with the same
+    keys). Rows are committed in chunks of USER_IMPORT_CHUNK_SIZE; the report
+    lists every duplicate or invalid row by its 1-based row number.
+    """
+    fmt = format or _CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=",
+        )
+    try:
+        return await user_import.import_users(
+            db, request.stream(), fmt, max_rows=settings.USER_IMPORT_MAX_ROWS
+        )
+    except user_import.ImportTooLarge as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail={"message": str(exc), "report": exc.report},
+        )
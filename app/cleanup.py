@@ -0,0 +1,34 @@
+"""
+One-off cleanup of stale rows.
+
+Deletes used or expired password reset tokens, clears expired email
+verification tokens, and deletes old sent/failed outbox emails and expired
+analysis jobs with their spooled images, in bounded batches, then prints
+how many rows of each kind were purged. The API does the same every
+CLEANUP_INTERVAL_SECONDS; set that to 0 and run this from cron or a
+scheduled job instead if preferred:
+
+    python -m app.cleanup [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import json
+
+from app.core.config import settings
+from app.database import dispose_engines
+from app.services.maintenance import Janitor
+
+
+async def main(batch_size: int) -> None:
+    try:
+        report = await Janitor(batch_size=batch_size).run_once()
+    finally:
+        await dispose_engines()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired tokens, outbox emails and analysis jobs.")
+    parser.add_argument("--batch-size", type=int, default=settings.CLEANUP_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
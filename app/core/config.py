@@ -12,8 +12,145 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Password hashing (bcrypt runs in a process pool, None = one worker per CPU,
+    # 0 = hash in a local thread pool instead of separate processes)
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    
+    # Verified-token cache used by get_current_user
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    # Token revocation (logout, password reset): each process replays the
+    # token_revocations table every TOKEN_REVOCATION_REFRESH_SECONDS, which
+    # bounds how long a revocation made on another worker takes to apply
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5.0
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # Purge stale rows (used/expired reset and verification tokens, old
+    # outbox emails, expired analysis jobs) in the background
+    # (0 = never; run `python -m app.cleanup` from a scheduler instead)
+    CLEANUP_INTERVAL_SECONDS: int = 3600
+    CLEANUP_BATCH_SIZE: int = 1000
+    
+    # Outgoing email (verification, password reset). Messages go to the
+    # email_outbox table with their token and are sent by a background
+    # dispatcher (in the API, or `python -m app.mailer` with
+    # EMAIL_INLINE_DISPATCHER=False). Nothing is queued while SMTP_HOST is unset.
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    EMAIL_FROM: str = "Bluescan <no-reply@bluescan.local>"
+    EMAIL_LINK_BASE_URL: str = "http://localhost:3000"
+    EMAIL_INLINE_DISPATCHER: bool = True
+    EMAIL_BATCH_SIZE: int = 100
+    EMAIL_POLL_SECONDS: float = 1.0
+    # Open SMTP connections, each reused across messages and batches
+    EMAIL_SMTP_CONNECTIONS: int = 2
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_SECONDS: float = 30.0
+    EMAIL_DOMAIN_RATE_PER_MINUTE: int = 120
+    # Sent and failed outbox rows are deleted by the token cleanup after this
+    # long (sent rows have their body, and so their token, cleared at once)
+    EMAIL_OUTBOX_RETENTION_HOURS: int = 24
+    
+    # Bulk user import (POST /users/import, `python -m app.import_users`):
+    # rows per transaction and the most rows one request may contain
+    USER_IMPORT_CHUNK_SIZE: int = 500
+    USER_IMPORT_MAX_ROWS: int = 100000
+    
+    # Rate limiting: "memory" (per process), "shared" (mmap table shared by all
+    # workers on the host) or "redis" (shared across hosts)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_SHM_PATH: Optional[str] = None
+    RATE_LIMIT_SHM_SLOTS: int = 65536
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    # Per-IP limit on each auth endpoint, and limit on failed logins per
+    # (IP, account)
+    AUTH_RATE_LIMIT_PER_MINUTE: int = 5
+    LOGIN_FAILURE_RATE_LIMIT_PER_MINUTE: int = 10
+    
     # Database
     DATABASE_URL: str
+    # Async driver URL; derived from DATABASE_URL (asyncpg / aiosqlite) when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 30
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = 5000
+    # Comma-separated read replica URLs; reads marked replica_read use these
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_SELECTION: str = "round_robin"  # or "least_connections"
+    DB_REPLICA_EJECT_SECONDS: int = 30
+    # Refuse to start unless `python -m app.migrate` has brought the schema up to date
+    DB_SCHEMA_CHECK: bool = True
+    
+    # Pollution heatmap tiles
+    TILE_CACHE_MAX_ENTRIES: int = 2048
+    TILE_CACHE_TTL_SECONDS: int = 30
+    # Batched observation ingest (POST /pollution/observations:batch): accepted
+    # readings wait in a per-process write-behind buffer and are inserted
+    # INGEST_FLUSH_ROWS at a time, or every INGEST_FLUSH_SECONDS; requests get
+    # 429 while the buffer can't take them
+    INGEST_MAX_ROWS_PER_REQUEST: int = 50000
+    # Largest request body, and largest single NDJSON line
+    INGEST_MAX_BYTES_PER_REQUEST: int = 32 * 1024 * 1024
+    INGEST_MAX_LINE_BYTES: int = 64 * 1024
+    INGEST_BUFFER_MAX_ROWS: int = 200000
+    INGEST_FLUSH_ROWS: int = 10000
+    INGEST_FLUSH_SECONDS: float = 0.5
+    # Columnar exports (GET /pollution/observations/export, `python -m
+    # app.export_observations`): rows per Arrow record batch / Parquet row
+    # group, and the codec ("zstd", "lz4" or "none")
+    EXPORT_BATCH_ROWS: int = 65536
+    EXPORT_COMPRESSION: str = "zstd"
+    # Severity analytics (/pollution/stats, /pollution/anomalies): each worker
+    # holds the last ANALYTICS_RETENTION_DAYS of observations as NumPy columns
+    # (~18 bytes per reading), reads new rows every ANALYTICS_REFRESH_SECONDS
+    # and reloads everything every ANALYTICS_REBUILD_SECONDS. Regions need
+    # ANALYTICS_MIN_PERIODS buckets of history before they get anomaly scores
+    ANALYTICS_RETENTION_DAYS: int = 30
+    ANALYTICS_REFRESH_SECONDS: float = 10.0
+    ANALYTICS_REBUILD_SECONDS: float = 3600.0
+    ANALYTICS_EWMA_ALPHA: float = 0.1
+    ANALYTICS_MIN_PERIODS: int = 6
+    
+    # Image uploads (streamed to a temp file in IMAGE_UPLOAD_SPOOL_DIR, default system temp dir)
+    IMAGE_UPLOAD_MAX_BYTES: int = 64 * 1024 * 1024
+    IMAGE_UPLOAD_SPOOL_DIR: Optional[str] = None
+    
+    # Image analysis ("module:Class" model path; requests are micro-batched and
+    # run in a process pool, None = one worker per CPU, 0 = in-process thread)
+    ANALYSIS_MODEL: str = "app.services.analysis_models:StandInModel"
+    ANALYSIS_WORKERS: Optional[int] = None
+    ANALYSIS_MAX_BATCH_SIZE: int = 32
+    ANALYSIS_MAX_WAIT_MS: int = 10
+    ANALYSIS_MAX_QUEUE: int = 1024
+    # Analysis results keyed by image SHA-256 + model version: in-memory LRU
+    # bounded by serialized size, backed by the analysis_results table
+    ANALYSIS_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    ANALYSIS_CACHE_PERSIST: bool = True
+    # Async analysis jobs (?mode=async). Images wait in ANALYSIS_JOB_SPOOL_DIR
+    # (default <tmp>/bluescan-jobs, must be shared with external runners);
+    # set ANALYSIS_JOB_INLINE_RUNNER=False when running `python -m app.worker`
+    ANALYSIS_JOB_SPOOL_DIR: Optional[str] = None
+    ANALYSIS_JOB_INLINE_RUNNER: bool = True
+    ANALYSIS_JOB_POLL_SECONDS: float = 1.0
+    ANALYSIS_JOB_TIMEOUT_SECONDS: int = 300
+    ANALYSIS_JOB_MAX_ATTEMPTS: int = 3
+    # Finished (or never claimed) jobs and their images are deleted by the
+    # token cleanup after this long
+    ANALYSIS_JOB_RETENTION_HOURS: int = 24
+    
+    # Request metrics (/metrics, Prometheus text format); METRICS_SERVER_TIMING
+    # adds a Server-Timing header with per-request span timings
+    METRICS_ENABLED: bool = True
+    METRICS_SERVER_TIMING: bool = False
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
@@ -21,6 +158,15 @@ class Settings(BaseSettings):
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
+    GOOGLE_USERINFO_URL: str = "https://www.googleapis.com/oauth2/v3/userinfo"
+    # Shared app-lifetime HTTP client for Google (HTTP/2 when h2 is installed)
+    GOOGLE_HTTP_TIMEOUT_SECONDS: float = 5.0
+    GOOGLE_HTTP_MAX_CONNECTIONS: int = 20
+    GOOGLE_HTTP_MAX_KEEPALIVE: int = 10
+    GOOGLE_HTTP2: bool = True
+    # Validated token -> userinfo, so login retries skip the Google round trip
+    GOOGLE_USERINFO_CACHE_TTL_SECONDS: int = 60
+    GOOGLE_USERINFO_CACHE_MAX_ENTRIES: int = 10000
     
     class Config:
         env_file = ".env"
@@ -1,36 +1,32 @@
-from typing import Generator, Optional
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.database import SessionLocal
+from app.database import get_db
+from app.models.user import User
 from app.services import auth_service
-from app.core.security import verify_token
+from app.core.revocation import token_revocations
+from app.core.security import decode_token
+from app.core.token_cache import token_cache
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-def get_db() -> Generator:
-    """
-    Database dependency that creates a new SQLAlchemy session for each request.
-    Ensures proper cleanup of database resources.
-    """
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
-
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> Optional[str]:
+) -> Optional[User]:
     """
     Dependency that validates the JWT token and returns the current user.
     Raises an HTTP exception if the token is invalid.
+    
+    Verified tokens are cached (see app.core.token_cache), so repeat requests
+    with the same token skip the JWT decode and the user lookup. The returned
+    user is a detached snapshot and must be treated as read-only. Revoked
+    tokens are rejected on both paths (see app.core.revocation).
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,15 +34,34 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        email = verify_token(token)
-        if email is None:
+    cached = token_cache.get(token)
+    if cached is not None:
+        claims, user = cached
+        if await token_revocations.is_revoked(db, claims, user.id):
             raise credentials_exception
-    except JWTError:
+        return user
+    
+    claims = decode_token(token)
+    email = claims.get("sub") if claims else None
+    if email is None:
         raise credentials_exception
         
-    user = auth_service.get_user_by_email(db, email=email)
-    if user is None:
+    user = await auth_service.get_user_by_email(db, email=email)
+    if user is None or await token_revocations.is_revoked(db, claims, user.id, user.token_generation):
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    return token_cache.set(token, claims, user)
+
+async def get_current_superuser(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    Dependency for admin-only endpoints. Raises 403 unless the current
+    user is an active superuser.
+    """
+    if not current_user.is_active or not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough privileges",
+        )
+    return current_user
\ No newline at end of file
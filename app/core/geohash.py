@@ -0,0 +1,145 @@
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: index for index, char in enumerate(_BASE32)}
+
+# Geohash precision stored with every observation (~4.8 m x 4.8 m cells)
+PRECISION = 9
+
+
+def encode(latitude: float, longitude: float, precision: int = PRECISION) -> str:
+    """Encodes a coordinate as a geohash string of the given length."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lon_lo = mid
+            else:
+                value <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def encode_many(latitudes: "np.ndarray", longitudes: "np.ndarray", precision: int = PRECISION) -> List[str]:
+    """
+    Vectorized ``encode`` for arrays of coordinates. Bisects all of them at
+    once with the same comparisons as ``encode``, so the results are identical.
+    """
+    import numpy as np
+
+    lat_lo = np.full(len(latitudes), -90.0)
+    lat_hi = np.full(len(latitudes), 90.0)
+    lon_lo = np.full(len(longitudes), -180.0)
+    lon_hi = np.full(len(longitudes), 180.0)
+    chars = np.empty((len(latitudes), precision), dtype=np.uint8)
+    alphabet = np.frombuffer(_BASE32.encode(), dtype=np.uint8)
+    even = True
+    for position in range(precision):
+        value = np.zeros(len(latitudes), dtype=np.uint8)
+        for _ in range(5):
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                bit = longitudes >= mid
+                lon_lo = np.where(bit, mid, lon_lo)
+                lon_hi = np.where(bit, lon_hi, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                bit = latitudes >= mid
+                lat_lo = np.where(bit, mid, lat_lo)
+                lat_hi = np.where(bit, lat_hi, mid)
+            value = (value << 1) | bit
+            even = not even
+        chars[:, position] = alphabet[value]
+    return chars.view(f"S{precision}").ravel().astype(str).tolist()
+
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Returns (min_lat, min_lon, max_lat, max_lon) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Returns (lat_degrees, lon_degrees) spanned by a cell of this precision."""
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def cover(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float, max_cells: int = 16
+) -> Optional[List[str]]:
+    """
+    Returns the geohash prefixes of the finest precision whose cells cover the
+    bounding box using at most ``max_cells`` cells, or None if even a single
+    level-1 grid would need more (i.e. the box is too large to be worth it).
+    """
+    best = None
+    for precision in range(1, PRECISION + 1):
+        lat_step, lon_step = cell_size(precision)
+        rows = int(max_lat // lat_step) - int(min_lat // lat_step) + 1
+        cols = int(max_lon // lon_step) - int(min_lon // lon_step) + 1
+        if rows * cols > max_cells:
+            break
+        best = precision
+    if best is None:
+        return None
+
+    lat_step, lon_step = cell_size(best)
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(encode(min(lat, max_lat), min(lon, max_lon), best))
+            if lon >= max_lon:
+                break
+            lon += lon_step
+        if lat >= max_lat:
+            break
+        lat += lat_step
+    return sorted(cells)
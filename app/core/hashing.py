@@ -0,0 +1,158 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import span
+
+
+def _hash_job(password: str) -> Tuple[str, float, float]:
+    """Runs inside a pool worker. Returns the hash plus start time and duration."""
+    from app.core.security import pwd_context
+
+    started = time.time()
+    hashed = pwd_context.hash(password)
+    return hashed, started, time.time() - started
+
+
+def _verify_job(password: str, hashed_password: str) -> Tuple[bool, float, float]:
+    """Runs inside a pool worker. Returns the match result plus start time and duration."""
+    from app.core.security import pwd_context
+
+    started = time.time()
+    matches = pwd_context.verify(password, hashed_password)
+    return matches, started, time.time() - started
+
+
+class PasswordHasher:
+    """
+    Async front-end for bcrypt that runs every hash/verify on a worker pool.
+
+    bcrypt costs ~250 ms of CPU per call. Running it on the request thread
+    starves Starlette's threadpool, so the work is shipped to a process pool
+    and awaited instead. The number of operations waiting on the pool is
+    capped; once the cap is reached callers get an immediate 503 rather than
+    piling up behind each other.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = 64):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._bulk_in_flight = 0
+        self._stats: Dict[str, float] = {
+            "completed": 0,
+            "rejected": 0,
+            "hash_seconds_total": 0.0,
+            "hash_seconds_max": 0.0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+        }
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.workers > 0:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=os.cpu_count() or 1,
+                            thread_name_prefix="password-hash",
+                        )
+        return self._executor
+
+    async def _run(self, job: Callable[..., Tuple[Any, float, float]], *args: Any, bulk: bool = False) -> Any:
+        with self._lock:
+            if not bulk and self._in_flight >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy. Please try again shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self._in_flight += 1
+            if bulk:
+                self._bulk_in_flight += 1
+
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            with span("hash"):
+                result, started, duration = await loop.run_in_executor(
+                    self._get_executor(), job, *args
+                )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if bulk:
+                    self._bulk_in_flight -= 1
+
+        queue_wait = max(started - submitted, 0.0)
+        with self._lock:
+            stats = self._stats
+            stats["completed"] += 1
+            stats["hash_seconds_total"] += duration
+            stats["hash_seconds_max"] = max(stats["hash_seconds_max"], duration)
+            stats["queue_wait_seconds_total"] += queue_wait
+            stats["queue_wait_seconds_max"] = max(stats["queue_wait_seconds_max"], queue_wait)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hashes a password without blocking the event loop."""
+        return await self._run(_hash_job, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hashes a batch of passwords in parallel across the pool. At most one
+        job per worker is outstanding, so a bulk import does not queue
+        interactive logins behind thousands of hashes. That window is the
+        batch's own limit: its jobs wait for it rather than being rejected
+        when interactive traffic has filled ``max_queue``.
+        """
+        window = asyncio.Semaphore(self.workers or os.cpu_count() or 1)
+
+        async def hash_one(password: str) -> str:
+            async with window:
+                return await self._run(_hash_job, password, bulk=True)
+
+        return list(await asyncio.gather(*(hash_one(password) for password in passwords)))
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Checks a password against a stored hash without blocking the event loop."""
+        return await self._run(_verify_job, password, hashed_password)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns counters for monitoring: completed/rejected operations, total
+        and worst-case bcrypt latency, and total and worst-case time spent
+        waiting for a free worker.
+        """
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["in_flight"] = self._in_flight
+            snapshot["bulk_in_flight"] = self._bulk_in_flight
+        completed = snapshot["completed"] or 1
+        snapshot["hash_seconds_avg"] = snapshot["hash_seconds_total"] / completed
+        snapshot["queue_wait_seconds_avg"] = snapshot["queue_wait_seconds_total"] / completed
+        return snapshot
+
+    def shutdown(self) -> None:
+        """Stops the worker pool. A new one is started lazily on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,245 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Histogram resolution: 2**_SUB_BITS sub-buckets per power of two, which keeps
+# every recorded value within ~3% of its true value (HdrHistogram-style
+# log-linear buckets). Values are microseconds, capped at about 19 hours.
+_SUB_BITS = 6
+_SUB_COUNT = 1 << _SUB_BITS
+_HALF = _SUB_COUNT >> 1
+_MAX_VALUE = (1 << 36) - 1
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket(value: int) -> int:
+    if value < _SUB_COUNT:
+        return value
+    shift = value.bit_length() - _SUB_BITS
+    return _SUB_COUNT + (shift - 1) * _HALF + (value >> shift) - _HALF
+
+
+def _bucket_midpoint(index: int) -> float:
+    if index < _SUB_COUNT:
+        return float(index)
+    shift = (index - _SUB_COUNT) // _HALF + 1
+    top = (index - _SUB_COUNT) % _HALF + _HALF
+    return ((top << shift) + ((top + 1) << shift) - 1) / 2
+
+
+class LatencyHistogram:
+    """
+    Fixed-size log-linear histogram of durations. ``record`` is O(1) and
+    allocation-free; quantiles are only computed when metrics are scraped.
+    """
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (_bucket(_MAX_VALUE) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[_bucket(min(int(seconds * 1e6), _MAX_VALUE))] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Returns the q-quantile in seconds (0 when empty)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return _bucket_midpoint(index) / 1e6
+        return _MAX_VALUE / 1e6
+
+
+class RequestMetrics:
+    """Time spent per named span (and SQL statement count) within one request."""
+
+    __slots__ = ("spans", "db_statements")
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.db_statements = 0
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+class MetricsRegistry:
+    """
+    Process-wide request metrics: a latency histogram and status counts per
+    route, SQL statement and DB time totals per route, and a histogram per
+    span name. Rendered in the Prometheus text format by ``render``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._responses: Dict[Tuple[str, str, int], int] = {}
+        self._db_statements: Dict[Tuple[str, str], int] = {}
+        self._spans: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, request: RequestMetrics) -> None:
+        key = (method, route)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = LatencyHistogram()
+            histogram.record(seconds)
+            status_key = (method, route, status)
+            self._responses[status_key] = self._responses.get(status_key, 0) + 1
+            self._db_statements[key] = self._db_statements.get(key, 0) + request.db_statements
+            for name, spent in request.spans.items():
+                span = self._spans.get(name)
+                if span is None:
+                    span = self._spans[name] = LatencyHistogram()
+                span.record(spent)
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def summary(name: str, help_text: str, series: Dict[str, LatencyHistogram]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for labels, histogram in series.items():
+                for q in QUANTILES:
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {histogram.quantile(q):.6f}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        with self._lock:
+            summary(
+                "http_request_duration_seconds",
+                "Request latency by route.",
+                {f'method="{m}",route="{r}"': h for (m, r), h in self._latency.items()},
+            )
+            lines.append("# HELP http_responses_total Responses by route and status code.")
+            lines.append("# TYPE http_responses_total counter")
+            for (method, route, status), count in self._responses.items():
+                lines.append(f'http_responses_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+            lines.append("# HELP db_statements_total SQL statements executed, by route.")
+            lines.append("# TYPE db_statements_total counter")
+            for (method, route), count in self._db_statements.items():
+                lines.append(f'db_statements_total{{method="{method}",route="{route}"}} {count}')
+            summary(
+                "request_span_duration_seconds",
+                "Time per request spent in named spans (hash, token, db, serialize).",
+                {f'span="{name}"': h for name, h in self._spans.items()},
+            )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Adds the time spent in the block to the current request's ``name`` span."""
+    request = _current.get()
+    if request is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        request.add(name, time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    request = _current.get()
+    started = conn.info.pop("query_started", None)
+    if request is None or started is None:
+        return
+    request.add("db", time.perf_counter() - started)
+    request.db_statements += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Counts statements and DB time for the current request on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that records body rendering as the ``serialize`` span."""
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            return super().render(content)
+
+
+def _route_name(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status and the current
+    request's spans. With ``server_timing`` it also adds a Server-Timing
+    header listing the spans, SQL statement count and total app time.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = _current.set(request)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"server-timing", self._server_timing(request, started).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            registry.observe(
+                scope["method"], _route_name(scope), status, time.perf_counter() - started, request
+            )
+
+    @staticmethod
+    def _server_timing(request: RequestMetrics, started: float) -> str:
+        parts = []
+        for name, seconds in request.spans.items():
+            entry = f"{name};dur={seconds * 1000:.2f}"
+            if name == "db":
+                entry += f';desc="{request.db_statements} queries"'
+            parts.append(entry)
+        parts.append(f"app;dur={(time.perf_counter() - started) * 1000:.2f}")
+        return ", ".join(parts)
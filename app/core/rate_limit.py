@@ -1,31 +1,107 @@
 from fastapi import HTTPException, Request
-from datetime import datetime, timedelta
-from collections import defaultdict
-import time
+from typing import Callable, Optional
+import math
+
+from app.core.rate_limit_backends import RateLimitBackend, create_backend
+
+
+def client_ip(request: Request, identity: Optional[str] = None) -> Optional[str]:
+    """Rate limit key: the client's IP address."""
+    return request.client.host if request.client else None
+
+
+def client_route(request: Request, identity: Optional[str] = None) -> Optional[str]:
+    """Rate limit key: the client's IP address scoped to the requested route."""
+    ip = client_ip(request)
+    return f"{request.url.path}|{ip}" if ip else None
+
+
+def client_identity(request: Request, identity: Optional[str] = None) -> Optional[str]:
+    """
+    Rate limit key: the client's IP address and the identity it is acting on
+    (e.g. the login email), so one client's requests never use up another
+    client's budget for the same account.
+    """
+    ip = client_ip(request)
+    return f"{ip}|{identity.strip().lower()}" if ip and identity else None
+
+
+KeyFunc = Callable[[Request, Optional[str]], Optional[str]]
+
 
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 5):
-        # Store request timestamps for each IP address
-        self.requests = defaultdict(list)
+    """
+    GCRA (generic cell rate algorithm) rate limiter.
+
+    A key allows a burst of ``requests_per_minute`` requests and then refills
+    at one request every ``60 / requests_per_minute`` seconds. Per-key state
+    is a single theoretical arrival time held by a pluggable backend (see
+    app.core.rate_limit_backends): a process-local table by default, or one
+    shared by all workers when ``RATE_LIMIT_BACKEND`` is ``shared`` or
+    ``redis``. ``scope`` keeps the keys of different limiters apart when they
+    share a backend.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 5,
+        *,
+        key_func: KeyFunc = client_ip,
+        scope: str = "default",
+        backend: Optional[RateLimitBackend] = None,
+    ):
         self.requests_per_minute = requests_per_minute
+        self.key_func = key_func
+        self.scope = scope
+        self._backend = backend
+        self.period = 60.0
+        self.emission_interval = self.period / requests_per_minute
+        self._prefix = f"{scope}|"
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        # Created on first use, so importing the routes opens no shared memory or sockets
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    async def hit(self, key: str) -> float:
+        """
+        Records a request for ``key``.
 
-    def check_rate_limit(self, request: Request):
-        # Get the client's IP address
-        client_ip = request.client.host
-        now = datetime.now()
-        
-        # Remove timestamps older than 1 minute
-        self.requests[client_ip] = [
-            timestamp for timestamp in self.requests[client_ip]
-            if now - timestamp < timedelta(minutes=1)
-        ]
-        
-        # Check if request limit is exceeded
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
+        Returns 0.0 if the request is allowed, otherwise the number of seconds
+        until it would be.
+        """
+        return await self.backend.hit(self._prefix + key, self.emission_interval, self.period)
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    async def check_rate_limit(self, request: Request, identity: Optional[str] = None, *, record: bool = True):
+        """
+        Raises HTTP 429 if the request exceeds the limit for its key.
+
+        ``identity`` is passed through to the key function, for limiters keyed
+        by more than the connection (see ``client_identity``). With
+        ``record=False`` the request is only checked, not counted; limiters
+        that count failures call ``record`` once the request has failed.
+        """
+        key = self.key_func(request, identity)
+        if key is None:
+            return
+        if record:
+            retry_after = await self.hit(key)
+        else:
+            retry_after = await self.backend.peek(self._prefix + key, self.emission_interval, self.period)
+        if retry_after > 0:
             raise HTTPException(
                 status_code=429,
-                detail="Too many requests. Please try again later."
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
             )
-        
-        # Add current timestamp to requests
-        self.requests[client_ip].append(now)
\ No newline at end of file
+
+    async def record(self, request: Request, identity: Optional[str] = None) -> None:
+        """Counts a request against its key without checking it (e.g. a failed login)."""
+        key = self.key_func(request, identity)
+        if key is not None:
+            await self.hit(key)
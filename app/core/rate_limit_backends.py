@@ -0,0 +1,326 @@
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for GCRA rate limiting state.
+
+    A backend owns both the clock and the per-key theoretical arrival time
+    (TAT), and applies a hit atomically: ``hit`` returns 0.0 when the request
+    is allowed, otherwise the number of seconds until it would be. ``hit`` is
+    a coroutine so network backends never block the event loop; the local
+    ones finish without awaiting anything.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, emission_interval: float, period: float) -> float:
+        """Records a request for ``key`` if it is allowed."""
+
+    @abstractmethod
+    async def peek(self, key: str, emission_interval: float, period: float) -> float:
+        """Like ``hit``, but records nothing."""
+
+    def __len__(self) -> int:
+        return 0
+
+
+def _gcra(tat: float, now: float, emission_interval: float, period: float):
+    """Returns (new TAT or None if denied, seconds to wait)."""
+    if tat < now:
+        tat = now
+    new_tat = tat + emission_interval
+    allowed_at = new_tat - period
+    if allowed_at > now:
+        return None, allowed_at - now
+    return new_tat, 0.0
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Process-local backend. Each key costs one float on the monotonic clock.
+
+    Keys whose TAT is in the past carry no state and are swept every
+    ``sweep_interval`` seconds; the table never holds more than ``max_keys``
+    entries (least recently used keys are dropped first).
+    """
+
+    def __init__(self, max_keys: int = 100_000, sweep_interval: float = 30.0):
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        # Key -> TAT, in least to most recently used order
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    async def hit(self, key: str, emission_interval: float, period: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            new_tat, retry_after = _gcra(self._tat.get(key, now), now, emission_interval, period)
+            if new_tat is None:
+                return retry_after
+            self._tat[key] = new_tat
+            self._tat.move_to_end(key)
+            if len(self._tat) > self.max_keys:
+                self._tat.popitem(last=False)
+            return 0.0
+
+    async def peek(self, key: str, emission_interval: float, period: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            return _gcra(self._tat.get(key, now), now, emission_interval, period)[1]
+
+    def _sweep(self, now: float) -> None:
+        """Drops keys that have fully refilled. Caller holds the lock."""
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class SharedMemoryBackend(RateLimitBackend):
+    """
+    Backend shared by every worker process on one host.
+
+    State lives in a fixed-size open-addressing hash table in a memory-mapped
+    file (``/dev/shm`` by default). Each slot is a 64-bit key fingerprint and a
+    wall-clock TAT. A key may live in any of ``PROBE`` consecutive slots; when
+    none match, the slot with the oldest TAT is reused, which is always an
+    expired entry unless the table is saturated. Memory is therefore fixed at
+    ``slots * 16`` bytes regardless of how many keys are seen.
+
+    Writers serialize on an ``flock`` of the file (plus a thread lock, since
+    ``flock`` does not exclude threads sharing the descriptor).
+    """
+
+    MAGIC = b"BSRL"
+    VERSION = 1
+    PROBE = 8
+    _HEADER = struct.Struct("<4sII")
+    _SLOT = struct.Struct("<Qd")
+
+    def __init__(self, path: str, slots: int = 65536):
+        if fcntl is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=shared requires a POSIX system")
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.path = path
+        self.slots = slots
+        self._mask = slots - 1
+        self._window = struct.Struct("<" + "Qd" * self.PROBE)
+        self._lock = threading.Lock()
+        size = self._HEADER.size + (slots + self.PROBE) * self._SLOT.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, self._HEADER.pack(self.MAGIC, self.VERSION, slots), 0)
+            magic, version, file_slots = self._HEADER.unpack(
+                os.pread(self._fd, self._HEADER.size, 0)
+            )
+            if (magic, version, file_slots) != (self.MAGIC, self.VERSION, slots):
+                raise ValueError(
+                    f"{path} holds an incompatible rate limit table "
+                    f"(version {version}, {file_slots} slots)"
+                )
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def _find(self, base: int, fingerprint: int):
+        """(slot, TAT) of the key in the probe window at ``base``; a free or expired slot if absent."""
+        window = self._window.unpack_from(self._mm, base)
+        victim, victim_tat = 0, math.inf
+        for i in range(self.PROBE):
+            slot_fingerprint, slot_tat = window[2 * i], window[2 * i + 1]
+            if slot_fingerprint == fingerprint:
+                return i, slot_tat
+            if slot_tat < victim_tat:
+                victim, victim_tat = i, slot_tat
+        return victim, None
+
+    async def hit(self, key: str, emission_interval: float, period: float) -> float:
+        return self._apply(key, emission_interval, period, record=True)
+
+    async def peek(self, key: str, emission_interval: float, period: float) -> float:
+        return self._apply(key, emission_interval, period, record=False)
+
+    def _apply(self, key: str, emission_interval: float, period: float, record: bool) -> float:
+        fingerprint = self._fingerprint(key)
+        first = fingerprint & self._mask
+        base = self._HEADER.size + first * self._SLOT.size
+        now = time.time()
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                slot, tat = self._find(base, fingerprint)
+                new_tat, retry_after = _gcra(now if tat is None else tat, now, emission_interval, period)
+                if new_tat is None or not record:
+                    return retry_after
+                self._SLOT.pack_into(
+                    self._mm, base + slot * self._SLOT.size, fingerprint, new_tat
+                )
+                return 0.0
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        now = time.time()
+        count = 0
+        for i in range(self.slots + self.PROBE):
+            fingerprint, tat = self._SLOT.unpack_from(
+                self._mm, self._HEADER.size + i * self._SLOT.size
+            )
+            if fingerprint and tat > now:
+                count += 1
+        return count
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+
+# Shared by the hit and peek scripts: returns the wait if the request is denied
+_GCRA_CHECK = """
+local emission_interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + emission_interval
+local allowed_at = new_tat - period
+if allowed_at > now then return tostring(allowed_at - now) end
+"""
+_GCRA_SCRIPT = _GCRA_CHECK + """
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return '0'
+"""
+_GCRA_PEEK_SCRIPT = _GCRA_CHECK + "return '0'\n"
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Backend shared across hosts through any server speaking the Redis
+    protocol. The GCRA step runs as a Lua script so it is atomic and uses the
+    server's clock; keys expire on their own once they have fully refilled.
+
+    ``client`` may be any ``redis.asyncio`` compatible client (e.g.
+    ``fakeredis.FakeAsyncRedis`` in tests); otherwise one is created from
+    ``url``. If the server cannot be reached, hits go to ``fallback`` (a
+    process-local MemoryBackend by default) for ``retry_interval`` seconds
+    before the server is tried again, so an outage neither lifts the limits
+    nor makes every request wait out the socket timeout.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Any = None,
+        prefix: str = "ratelimit:",
+        fallback: Optional[RateLimitBackend] = None,
+        retry_interval: float = 5.0,
+    ):
+        if client is None:
+            try:
+                import redis.asyncio
+            except ImportError:  # pragma: no cover - optional dependency
+                raise RuntimeError("The redis package is required for RATE_LIMIT_BACKEND=redis")
+            client = redis.asyncio.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self.client = client
+        self.prefix = prefix
+        self.fallback = fallback if fallback is not None else MemoryBackend()
+        self.retry_interval = retry_interval
+        self._scripts = {
+            "hit": client.register_script(_GCRA_SCRIPT),
+            "peek": client.register_script(_GCRA_PEEK_SCRIPT),
+        }
+        self._unavailable_until = 0.0
+
+    async def hit(self, key: str, emission_interval: float, period: float) -> float:
+        return await self._run("hit", key, emission_interval, period)
+
+    async def peek(self, key: str, emission_interval: float, period: float) -> float:
+        return await self._run("peek", key, emission_interval, period)
+
+    async def _run(self, operation: str, key: str, emission_interval: float, period: float) -> float:
+        local = getattr(self.fallback, operation)
+        if time.monotonic() < self._unavailable_until:
+            return await local(key, emission_interval, period)
+        try:
+            result = await self._scripts[operation](keys=[self.prefix + key], args=[emission_interval, period])
+        except Exception:
+            logger.warning(
+                "Rate limit backend unavailable, using the local fallback for %.0f s",
+                self.retry_interval, exc_info=True,
+            )
+            self._unavailable_until = time.monotonic() + self.retry_interval
+            return await local(key, emission_interval, period)
+        return float(result)
+
+
+_shared_backend: Optional[RateLimitBackend] = None
+_shared_backend_lock = threading.Lock()
+
+
+def default_shm_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "bluescan-rate-limit")
+
+
+def create_backend() -> RateLimitBackend:
+    """
+    Returns the backend configured by ``RATE_LIMIT_BACKEND``.
+
+    ``memory`` gives every limiter its own table. ``shared`` and ``redis``
+    return one process-wide backend that all limiters share; limiters keep
+    their keys apart with their scope prefix.
+    """
+    kind = settings.RATE_LIMIT_BACKEND
+    if kind == "memory":
+        return MemoryBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+    global _shared_backend
+    with _shared_backend_lock:
+        if _shared_backend is None:
+            if kind == "shared":
+                _shared_backend = SharedMemoryBackend(
+                    settings.RATE_LIMIT_SHM_PATH or default_shm_path(),
+                    slots=settings.RATE_LIMIT_SHM_SLOTS,
+                )
+            elif kind == "redis":
+                _shared_backend = RedisBackend(url=settings.RATE_LIMIT_REDIS_URL)
+            else:
+                raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {kind}")
+        return _shared_backend
@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.token_revocation import TokenRevocation
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Holding ``capacity`` items it
+    answers membership with a false positive rate of about ``error_rate``
+    and never a false negative; each test is ``hashes`` bit lookups.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenRevocations:
+    """
+    Per-process view of the token_revocations table, checked on every
+    authenticated request without a database round trip.
+
+    Access tokens carry a ``jti`` and the user's ``gen`` (token generation)
+    at issue time. Revoking one token (logout) logs its jti; revoking all of
+    a user's tokens (password reset, deactivation) bumps
+    ``users.token_generation`` and logs the new generation. Each process
+    keeps the logged jtis in a Bloom filter and the highest generation per
+    user in a dict, so a check is a dict lookup plus a few bit tests. Only a
+    Bloom hit - a revoked token or a rare false positive - is settled with
+    one indexed query, and the answer is remembered.
+
+    A background task replays rows created since the last refresh every
+    ``refresh_seconds``, which bounds how long a revocation made by another
+    worker takes to apply here. Revocations made in this process apply
+    immediately. Rows expire with the tokens they revoke; every
+    ``rebuild_seconds`` the view is rebuilt from live rows only (and expired
+    rows are purged) so the filter does not fill up.
+    """
+
+    def __init__(
+        self,
+        refresh_seconds: float = 5.0,
+        rebuild_seconds: float = 1800,
+        bloom_capacity: int = 100000,
+        bloom_error_rate: float = 0.001,
+        confirmed_max_entries: int = 10000,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.confirmed_max_entries = confirmed_max_entries
+        # Rows are re-read this far back, so ones committed late are not missed
+        self.overlap = timedelta(seconds=max(30.0, 2 * refresh_seconds))
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._generations: Dict[int, int] = {}
+        self._confirmed: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._since: Optional[datetime] = None
+        self._rebuilt_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._stats = {"checks": 0, "bloom_hits": 0, "lookups": 0, "revoked": 0, "refreshes": 0}
+
+    def _apply(self, user_id: int, jti: Optional[str], generation: Optional[int]) -> None:
+        with self._lock:
+            if jti is not None:
+                # Refreshes re-read recent rows; only count each jti once
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+                self._confirmed.pop(jti, None)
+            if generation is not None and generation > self._generations.get(user_id, 0):
+                self._generations[user_id] = generation
+
+    def _remember(self, jti: str, revoked: bool) -> None:
+        with self._lock:
+            self._confirmed[jti] = revoked
+            self._confirmed.move_to_end(jti)
+            while len(self._confirmed) > self.confirmed_max_entries:
+                self._confirmed.popitem(last=False)
+
+    async def is_revoked(
+        self,
+        db: AsyncSession,
+        claims: Dict[str, Any],
+        user_id: int,
+        generation: Optional[int] = None,
+    ) -> bool:
+        """
+        Returns True if the token with these claims has been revoked.
+        ``generation`` is the user's current token_generation when the caller
+        has just loaded the user; it is authoritative over the local view.
+        """
+        self._stats["checks"] += 1
+        current = max(self._generations.get(user_id, 0), generation or 0)
+        if claims.get("gen", 0) < current:
+            self._stats["revoked"] += 1
+            return True
+        jti = claims.get("jti")
+        if jti is None or jti not in self._bloom:
+            return False
+
+        self._stats["bloom_hits"] += 1
+        revoked = self._confirmed.get(jti)
+        if revoked is None:
+            self._stats["lookups"] += 1
+            revoked = (await db.execute(
+                select(TokenRevocation.id).where(TokenRevocation.jti == jti).limit(1)
+            )).first() is not None
+            self._remember(jti, revoked)
+        if revoked:
+            self._stats["revoked"] += 1
+        return revoked
+
+    def add_token(self, db: AsyncSession, claims: Dict[str, Any], user_id: int) -> None:
+        """Logs the revocation of one token; applied by ``committed`` after the caller commits."""
+        db.add(TokenRevocation(
+            user_id=user_id,
+            jti=claims["jti"],
+            expires_at=datetime.utcfromtimestamp(claims["exp"]),
+            created_at=datetime.utcnow(),
+        ))
+
+    def add_generation(self, db: AsyncSession, user_id: int, generation: int) -> None:
+        """Logs that tokens issued before ``generation`` are revoked; the caller commits."""
+        now = datetime.utcnow()
+        db.add(TokenRevocation(
+            user_id=user_id,
+            generation=generation,
+            expires_at=now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            created_at=now,
+        ))
+
+    def committed(self, user_id: int, jti: Optional[str] = None, generation: Optional[int] = None) -> None:
+        """Applies a revocation this process just committed, without waiting for a refresh."""
+        self._apply(user_id, jti, generation)
+
+    async def refresh(self) -> int:
+        """
+        Replays revocations created since the last refresh, or rebuilds the
+        whole view when it is due. Returns the number of rows read.
+        """
+        started = datetime.utcnow()
+        rebuild = (
+            self._since is None
+            or self._rebuilt_at is None
+            or started - self._rebuilt_at >= timedelta(seconds=self.rebuild_seconds)
+            or self._bloom.count > self._bloom.capacity
+        )
+        query = select(
+            TokenRevocation.user_id, TokenRevocation.jti, TokenRevocation.generation
+        ).where(TokenRevocation.expires_at > started)
+        async with AsyncSessionLocal() as db:
+            if rebuild:
+                await db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at <= started))
+                await db.commit()
+            else:
+                query = query.where(TokenRevocation.created_at >= self._since - self.overlap)
+            rows = (await db.execute(query)).all()
+
+        if rebuild:
+            jtis = sum(1 for row in rows if row.jti is not None)
+            bloom = BloomFilter(max(self.bloom_capacity, 2 * jtis), self.bloom_error_rate)
+            generations: Dict[int, int] = {}
+            for row in rows:
+                if row.jti is not None:
+                    bloom.add(row.jti)
+                if row.generation is not None and row.generation > generations.get(row.user_id, 0):
+                    generations[row.user_id] = row.generation
+            with self._lock:
+                self._bloom = bloom
+                self._generations = generations
+                self._confirmed.clear()
+            self._rebuilt_at = started
+        else:
+            for row in rows:
+                self._apply(row.user_id, row.jti, row.generation)
+        self._since = started
+        self._stats["refreshes"] += 1
+        return len(rows)
+
+    async def run(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                await self.refresh()
+            except Exception:
+                # Keep serving from the last view; the window grows until the database is back
+                logger.exception("Refreshing token revocations failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "jtis": self._bloom.count,
+                "bloom_capacity": self._bloom.capacity,
+                "users": len(self._generations),
+                "since": self._since.isoformat() if self._since else None,
+            }
+
+
+token_revocations = TokenRevocations(
+    refresh_seconds=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+    rebuild_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    bloom_capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    bloom_error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+)
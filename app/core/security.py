@@ -1,14 +1,17 @@
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import span
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def create_access_token(
     subject: Union[str, int],
-    expires_delta: Optional[timedelta] = None
+    expires_delta: Optional[timedelta] = None,
+    generation: int = 0
 ) -> str:
     """
     Creates a JWT token for authentication.
@@ -16,6 +19,7 @@ def create_access_token(
     Args:
         subject: User identifier (email or ID)
         expires_delta: Optional expiration time
+        generation: The user's token_generation, checked on revocation
         
     Returns:
         Encoded JWT token as string
@@ -27,14 +31,40 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": secrets.token_urlsafe(12),
+        "gen": generation,
+    }
+    with span("token"):
+        encoded_jwt = jwt.encode(
+            to_encode,
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
     return encoded_jwt
 
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Decodes and validates a JWT token.
+    
+    Args:
+        token: JWT token to decode
+        
+    Returns:
+        Token claims if valid, None if invalid or expired
+    """
+    try:
+        with span("token"):
+            return jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=[settings.ALGORITHM]
+            )
+    except JWTError:
+        return None
+
 def verify_token(token: str) -> Optional[str]:
     """
     Verifies a JWT token and returns the subject (user identifier).
@@ -45,12 +75,7 @@ def verify_token(token: str) -> Optional[str]:
     Returns:
         Subject string if valid, None if invalid
     """
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload.get("sub")
-    except JWTError:
-        return None
\ No newline at end of file
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
\ No newline at end of file
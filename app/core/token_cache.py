@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import inspect
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    user_id: int
+    claims: Dict[str, Any]
+    user: User
+
+
+def _snapshot(user: User) -> User:
+    """
+    Copies the loaded column values of a user into a new transient instance.
+    The copy is not attached to any session, so it can be shared between
+    requests without lazy loads or accidental flushes.
+    """
+    state = inspect(user)
+    return User(**{
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    })
+
+
+class TokenCache:
+    """
+    In-process TTL + LRU cache of verified bearer tokens.
+
+    Maps a SHA-256 digest of the token to its decoded claims and a detached
+    snapshot of the user it belongs to, so repeat requests skip both the JWT
+    decode and the user SELECT. An entry lives for at most ``ttl_seconds`` and
+    never past the token's own ``exp``. The cache is per process; changes made
+    by another worker become visible once the TTL runs out, while changes made
+    through auth_service in this process call ``invalidate_user`` directly.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _discard(self, key: bytes) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry.user_id]
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], User]]:
+        """Returns (claims, user) for a cached token, or None on a miss."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.claims, entry.user
+
+    def set(self, token: str, claims: Dict[str, Any], user: User) -> User:
+        """
+        Caches a verified token and returns the detached user snapshot that
+        was stored for it.
+        """
+        ttl = self.ttl_seconds
+        exp = claims.get("exp")
+        if exp is not None:
+            ttl = min(ttl, float(exp) - time.time())
+        snapshot = _snapshot(user)
+        if ttl <= 0:
+            return snapshot
+
+        key = self._key(token)
+        entry = _Entry(time.monotonic() + ttl, snapshot.id, claims, snapshot)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._keys_by_user.setdefault(entry.user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+        return snapshot
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drops every cached token belonging to the given user."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current size for cache sizing."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+)
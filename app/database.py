@@ -1,19 +1,263 @@
-from sqlalchemy import create_engine
+import functools
+import itertools
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+from sqlalchemy import Delete, Insert, TextClause, Update, create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url: str) -> URL:
+    """Derives the async-driver URL for a sync database URL."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in _ASYNC_DRIVERS and parsed.get_driver_name() not in ("asyncpg", "aiosqlite"):
+        parsed = parsed.set(drivername=_ASYNC_DRIVERS[backend])
+    return parsed
+
+
+def engine_options(url: URL) -> Dict[str, Any]:
+    """
+    Builds create_engine keyword arguments from the DB_* settings.
+    SQLite picks its own pool class for file and in-memory databases, so only
+    pre-ping applies there.
+    """
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout and url.get_backend_name() == "postgresql":
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+class ReplicaSet:
+    """
+    Pool of read replica engines.
+
+    ``pick`` returns a healthy replica chosen round-robin or by fewest checked
+    out connections, or None when there is no healthy replica (callers then
+    fall back to the primary). A replica whose connection fails is ejected
+    for ``eject_seconds`` and re-admitted automatically afterwards.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], strategy: str = "round_robin", eject_seconds: float = 30):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.engines = engines
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self._counter = itertools.count()
+        self._in_use: Dict[Engine, int] = {}
+        self._ejected_until: Dict[Engine, float] = {}
+        for replica in engines:
+            self._instrument(replica.sync_engine)
+
+    def _instrument(self, replica: Engine) -> None:
+        self._in_use[replica] = 0
+
+        @event.listens_for(replica, "checkout")
+        def _checkout(*args: Any) -> None:
+            self._in_use[replica] += 1
+
+        @event.listens_for(replica, "checkin")
+        def _checkin(*args: Any) -> None:
+            self._in_use[replica] -= 1
+
+        @event.listens_for(replica, "handle_error")
+        def _handle_error(context: Any) -> None:
+            if context.is_disconnect or context.connection is None:
+                self.eject(replica)
+
+    def eject(self, replica: Engine) -> None:
+        self._ejected_until[replica] = time.monotonic() + self.eject_seconds
+
+    def healthy(self) -> List[Engine]:
+        now = time.monotonic()
+        return [
+            replica.sync_engine for replica in self.engines
+            if self._ejected_until.get(replica.sync_engine, 0.0) <= now
+        ]
+
+    def pick(self) -> Optional[Engine]:
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=self._in_use.__getitem__)
+        return candidates[next(self._counter) % len(candidates)]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            repr(replica.url): {
+                "in_use": self._in_use[replica.sync_engine],
+                "ejected": self._ejected_until.get(replica.sync_engine, 0.0) > now,
+            }
+            for replica in self.engines
+        }
+
+
+def _replica_engines() -> List[AsyncEngine]:
+    urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    engines = []
+    for url in urls:
+        parsed = async_url(url)
+        engines.append(create_async_engine(parsed, **engine_options(parsed)))
+    return engines
+
+
+# Engines are created on first use rather than at import, so importing the app
+# (workers, CLI commands, tests) neither loads DB drivers nor touches the database
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_replicas: Optional[ReplicaSet] = None
+_session_local: Optional[sessionmaker] = None
+
+
+def get_engine() -> Engine:
+    """Sync engine for the primary, used by migrations and scripts."""
+    global _engine
+    if _engine is None:
+        url = make_url(settings.DATABASE_URL)
+        _engine = create_engine(url, **engine_options(url))
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Async engine for the primary, used by request sessions."""
+    global _async_engine
+    if _async_engine is None:
+        url = make_url(settings.ASYNC_DATABASE_URL) if settings.ASYNC_DATABASE_URL else async_url(settings.DATABASE_URL)
+        _async_engine = create_async_engine(url, **engine_options(url))
+    return _async_engine
+
+
+def get_replicas() -> ReplicaSet:
+    global _replicas
+    if _replicas is None:
+        _replicas = ReplicaSet(
+            _replica_engines(),
+            strategy=settings.DB_REPLICA_SELECTION,
+            eject_seconds=settings.DB_REPLICA_EJECT_SECONDS,
+        )
+    return _replicas
+
+
+def get_session_local() -> sessionmaker:
+    """Sync session factory bound to the primary, for scripts."""
+    global _session_local
+    if _session_local is None:
+        _session_local = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_local
+
+
+async def dispose_engines() -> None:
+    """Closes the pooled connections of every engine created so far."""
+    global _engine, _async_engine, _replicas, _session_local
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _replicas is not None:
+        for replica in _replicas.engines:
+            await replica.dispose()
+    if _engine is not None:
+        _engine.dispose()
+    _engine = _async_engine = _replicas = _session_local = None
+
+
+def __getattr__(name: str) -> Any:
+    # Lazy module attributes for code that imports the engines by name
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "replicas":
+        return get_replicas()
+    if name == "SessionLocal":
+        return get_session_local()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica and everything else to the primary.
+
+    Reads only go to a replica inside a ``replica_read`` call. Once a session
+    has flushed, executed an INSERT/UPDATE/DELETE, or run raw SQL outside a
+    ``replica_read`` call, it stays on the primary for the rest of its
+    life, so a write followed by a read (create_user then
+    create_verification_token, refresh after commit, ...) always sees its
+    own changes.
+    """
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kw: Any) -> Any:
+        replica_ok = self.info.get("replica_read", False)
+        if (
+            self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or (isinstance(clause, TextClause) and not replica_ok)
+        ):
+            self.info["primary_only"] = True
+        elif replica_ok and not self.info.get("primary_only"):
+            replica = get_replicas().pick()
+            if replica is not None:
+                return replica
+        if self.bind is None:
+            return get_async_engine().sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def replica_read(func: Callable) -> Callable:
+    """
+    Marks an async service function (taking the session as its first
+    argument) as read-only, allowing its queries to run on a replica.
+    """
+    @functools.wraps(func)
+    async def wrapper(db: AsyncSession, *args: Any, **kwargs: Any) -> Any:
+        previous = db.info.get("replica_read", False)
+        db.info["replica_read"] = True
+        try:
+            return await func(db, *args, **kwargs)
+        finally:
+            db.info["replica_read"] = previous
+    return wrapper
+
+
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
-def get_db():
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Creates a database session for each request and ensures it's closed afterward.
+    Creates an async database session for each request and ensures it's closed afterward.
     This function is used as a dependency in FastAPI endpoints.
+
+    Sessions don't expire loaded objects on commit, so attributes stay readable
+    after a commit without triggering a lazy (blocking) reload.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
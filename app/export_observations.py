@@ -0,0 +1,65 @@
+"""
+Columnar export of pollution observations.
+
+Same export as GET /api/v1/pollution/observations/export, run directly
+against the database (or a read replica) and written to a file or stdout.
+Rows are read with a server-side cursor and written in --batch-rows record
+batches or row groups, so memory stays flat for any number of rows.
+
+    python -m app.export_observations observations.parquet [--columns latitude,longitude,severity]
+        [--bbox min_lon,min_lat,max_lon,max_lat] [--start 2026-01-01] [--end 2026-04-01]
+    python -m app.export_observations - --format arrow > observations.arrows
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from app.core.config import settings
+from app.database import dispose_engines
+from app.services import pollution_service
+from app.services.observation_export import FORMATS, parse_columns, stream_observations
+from app.services.pollution_service import ObservationFilter
+
+
+async def main(args: argparse.Namespace, filters: ObservationFilter) -> None:
+    output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+    written = 0
+    try:
+        async for chunk in stream_observations(
+            filters, args.format, args.columns, batch_rows=args.batch_rows, compression=args.compression
+        ):
+            await asyncio.to_thread(output.write, chunk)
+            written += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await dispose_engines()
+    print(f"Wrote {written} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export pollution observations as Parquet or Arrow.")
+    parser.add_argument("path", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension, else parquet")
+    parser.add_argument("--columns", help="comma-separated columns (default: all)")
+    parser.add_argument("--bbox", help="min_lon,min_lat,max_lon,max_lat")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="inclusive lower bound on observed_at")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="exclusive upper bound on observed_at")
+    parser.add_argument("--pollutant-type")
+    parser.add_argument("--batch-rows", type=int, default=settings.EXPORT_BATCH_ROWS)
+    parser.add_argument("--compression", choices=("zstd", "lz4", "none"), default=settings.EXPORT_COMPRESSION)
+    args = parser.parse_args()
+    if args.format is None:
+        args.format = "arrow" if args.path.endswith((".arrow", ".arrows")) else "parquet"
+    try:
+        args.columns = parse_columns(args.columns)
+        filters = ObservationFilter(
+            bbox=pollution_service.parse_bbox(args.bbox) if args.bbox else None,
+            start=args.start,
+            end=args.end,
+            pollutant_type=args.pollutant_type,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    asyncio.run(main(args, filters))
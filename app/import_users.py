@@ -0,0 +1,62 @@
+"""
+Bulk user import from a CSV or NDJSON file.
+
+Same import as POST /api/v1/users/import, run directly against the database
+for large onboarding batches. Passwords are hashed in parallel on
+PASSWORD_HASH_WORKERS processes (default: one per CPU) and rows are inserted
+in chunks of --chunk-size, one transaction per chunk. Prints the report
+(created, duplicates and invalid rows by row number) as JSON; exits 1 if any
+row was not imported.
+
+    python -m app.import_users users.csv [--format csv|ndjson] [--chunk-size 500]
+    python -m app.import_users - --format ndjson < users.ndjson
+"""
+import argparse
+import asyncio
+import sys
+from typing import AsyncIterator, BinaryIO
+
+import orjson
+
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.database import AsyncSessionLocal, dispose_engines
+from app.services.user_import import FORMATS, import_users
+
+
+async def _read(stream: BinaryIO, size: int = 1 << 16) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await asyncio.to_thread(stream.read, size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def main(args: argparse.Namespace) -> int:
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        async with AsyncSessionLocal() as db:
+            report = await import_users(db, _read(stream), args.format, chunk_size=args.chunk_size)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        password_hasher.shutdown()
+        await dispose_engines()
+    sys.stdout.buffer.write(orjson.dumps(report, option=orjson.OPT_INDENT_2) + b"\n")
+    return 1 if report["issues"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-create user accounts from CSV or NDJSON.")
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=settings.USER_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.format is None:
+        if args.path.endswith(".csv"):
+            args.format = "csv"
+        elif args.path.endswith((".ndjson", ".jsonl")):
+            args.format = "ndjson"
+        else:
+            parser.error("--format is required unless the file ends in .csv, .ndjson or .jsonl")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,47 @@
+"""
+Standalone email dispatcher.
+
+Sends the emails queued in the email_outbox table (verification and password
+reset links) over SMTP_HOST, so the API workers never wait on SMTP. Run one
+or more of these next to the API (with EMAIL_INLINE_DISPATCHER=False there),
+sharing its database:
+
+    python -m app.mailer [--batch-size 100] [--connections 2]
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.database import dispose_engines
+from app.services.email_outbox import EmailDispatcher
+
+
+async def main(batch_size: int, connections: int) -> None:
+    dispatcher = EmailDispatcher(
+        batch_size=batch_size,
+        poll_seconds=settings.EMAIL_POLL_SECONDS,
+        connections=connections,
+        max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+        retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+        domain_rate_per_minute=settings.EMAIL_DOMAIN_RATE_PER_MINUTE,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: loop.create_task(dispatcher.stop()))
+    try:
+        await dispatcher.run()
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send queued emails.")
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_BATCH_SIZE)
+    parser.add_argument("--connections", type=int, default=settings.EMAIL_SMTP_CONNECTIONS)
+    args = parser.parse_args()
+    if not settings.SMTP_HOST:
+        parser.error("SMTP_HOST is not set")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.connections))
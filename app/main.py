@@ -1,13 +1,60 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.core.config import settings
-from app.api.v1.endpoints import auth
-from app.database import engine, Base
+from app.core.hashing import password_hasher
+from app.core import metrics
+from app.core.revocation import token_revocations
+from app.api.v1 import api_router
+from app.api.v1.endpoints import auth, passwords
+from app.database import dispose_engines, get_async_engine
+from app.migrate import check_schema
+from app.services.analysis_engine import analysis_engine
+from app.services.analysis_jobs import job_runner
+from app.services.email_outbox import email_dispatcher
+from app.services.google_oauth import google_oauth
+from app.services.maintenance import janitor
+from app.services.observation_ingest import observation_buffer
+from app.services.pollution_analytics import severity_analytics
+
+logger = logging.getLogger(__name__)
 
-# Create all database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup checks the schema version (DDL only runs via `python -m app.migrate`),
+    loads the token revocation list and starts the background tasks; shutdown
+    writes out buffered observations and releases worker pools, HTTP clients
+    and pooled database connections.
+    """
+    if settings.DB_SCHEMA_CHECK:
+        await check_schema(get_async_engine())
+    await token_revocations.refresh()
+    token_revocations.start()
+    observation_buffer.start()
+    if settings.ANALYSIS_JOB_INLINE_RUNNER:
+        job_runner.start()
+    if settings.CLEANUP_INTERVAL_SECONDS:
+        janitor.start()
+    if settings.SMTP_HOST and settings.EMAIL_INLINE_DISPATCHER:
+        email_dispatcher.start()
+    yield
+    await job_runner.stop()
+    await email_dispatcher.stop()
+    await observation_buffer.stop()
+    await severity_analytics.stop()
+    await janitor.stop()
+    await token_revocations.stop()
+    password_hasher.shutdown()
+    analysis_engine.shutdown()
+    await google_oauth.aclose()
+    await dispose_engines()
 
 # Initialize FastAPI application
 app = FastAPI(
@@ -15,7 +62,9 @@ app = FastAPI(
     description="Backend API for Ocean Pollution Detection System",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=metrics.TimedORJSONResponse,
 )
 
 # Configure CORS middleware
@@ -27,12 +76,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, SQL statement counts and span timings
+if settings.METRICS_ENABLED:
+    # Listening on the Engine class covers every engine, including lazily created ones
+    metrics.instrument_engine(Engine)
+    app.add_middleware(metrics.MetricsMiddleware, server_timing=settings.METRICS_SERVER_TIMING)
+
 # Include routers
 app.include_router(
     auth.router,
     prefix=f"{settings.API_V1_STR}/auth",
     tags=["authentication"]
 )
+app.include_router(
+    passwords.router,
+    prefix=f"{settings.API_V1_STR}/auth",
+    tags=["authentication"]
+)
+app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # Health check endpoint
 @app.get("/", tags=["health"])
@@ -48,6 +109,11 @@ async def health_check():
         "debug_mode": settings.DEBUG
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # Error handler for database exceptions
 @app.exception_handler(SQLAlchemyError)
 async def sqlalchemy_exception_handler(request, exc):
@@ -55,7 +121,11 @@ async def sqlalchemy_exception_handler(request, exc):
     Global exception handler for database errors.
     Logs the error and returns a user-friendly message.
     """
-    return {
-        "status": "error",
-        "message": "Database error occurred. Please try again later."
-    }
\ No newline at end of file
+    logger.error("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={
+            "status": "error",
+            "message": "Database error occurred. Please try again later."
+        },
+    )
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Schema management.
+
+The API never runs DDL. Deployments run this command first; it creates any
+missing tables, columns and indexes and records SCHEMA_VERSION. At startup the app
+only reads that version back (one cheap query) and refuses to start on a
+mismatch.
+
+    python -m app.migrate           # create missing tables/columns/indexes, stamp the version
+    python -m app.migrate --check   # exit 1 unless the database is up to date
+"""
+import argparse
+import sys
+from typing import Optional
+
+from sqlalchemy import Column, Integer, Table, inspect, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn
+
+from app.database import Base, get_engine
+
+# Every model module, so the metadata below describes the full schema
+from app.models import analysis, email_outbox, password_reset, pollution, token_revocation, user  # noqa: F401
+
+# Bump whenever a model adds a table, column or index
+#   2: users.token_generation, token_revocations
+#   3: indexes for the expired token cleanup
+#   4: email_outbox
+SCHEMA_VERSION = 4
+
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    # New columns must be nullable or have a server_default to be added to populated tables
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    preparer = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+
+
+def migrate(engine: Engine) -> int:
+    """
+    Creates missing tables, and missing columns and indexes on existing
+    tables, then records SCHEMA_VERSION. Existing columns are never altered
+    or dropped. Returns the version the database was at before (0 if
+    unversioned).
+    """
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        previous = conn.execute(select(schema_version.c.version)).scalar()
+        if previous is None:
+            conn.execute(insert(schema_version).values(version=SCHEMA_VERSION))
+        else:
+            conn.execute(update(schema_version).values(version=SCHEMA_VERSION))
+    return previous or 0
+
+
+def _check(current: Optional[int]) -> None:
+    if current != SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at version {current or 'none'}, this build needs "
+            f"{SCHEMA_VERSION}. Run `python -m app.migrate` before starting the app."
+        )
+
+
+async def check_schema(engine: AsyncEngine) -> None:
+    """Raises SchemaVersionError unless the database is at SCHEMA_VERSION."""
+    try:
+        async with engine.connect() as conn:
+            current = (await conn.execute(select(schema_version.c.version))).scalar()
+    except SQLAlchemyError:
+        current = None
+    _check(current)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Create or check the database schema.")
+    parser.add_argument("--check", action="store_true", help="only check the schema version")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    try:
+        if args.check:
+            with engine.connect() as conn:
+                try:
+                    current = conn.execute(select(schema_version.c.version)).scalar()
+                except SQLAlchemyError:
+                    current = None
+            _check(current)
+            print(f"Schema is at version {SCHEMA_VERSION}")
+        else:
+            previous = migrate(engine)
+            print(f"Schema migrated from version {previous} to {SCHEMA_VERSION}")
+    except SchemaVersionError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AnalysisResult(Base):
+    """
+    Persisted image analysis results, keyed by the image's SHA-256 and the
+    version of the model that produced them. Backs the in-memory result cache
+    across restarts and workers.
+    """
+    __tablename__ = "analysis_results"
+
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), nullable=False)
+    model_version = Column(String, nullable=False)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("sha256", "model_version", name="uq_analysis_results_key"),
+    )
+
+class AnalysisJob(Base):
+    """
+    Queued image analysis for ``/analyze-image?mode=async``. The image is
+    spooled to ``image_path`` until a job runner claims the row, analyzes it
+    and stores the result (or error) here.
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False, default="queued")
+    sha256 = Column(String(64), nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    image_path = Column(String, nullable=True)
+    model_version = Column(String, nullable=True)
+    cache = Column(String(16), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Serves the runner's oldest-queued-first claim query
+        Index("ix_analysis_jobs_status_created", "status", "created_at"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.database import Base
+
+class EmailOutbox(Base):
+    """
+    Outgoing email, written in the same transaction as the token it carries
+    and delivered later by app.services.email_outbox.EmailDispatcher.
+    """
+    __tablename__ = "email_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    to_address = Column(String, nullable=False)
+    # Recipient domain, for per-domain throttling
+    domain = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, false
 from app.database import Base
 
 class PasswordReset(Base):
@@ -7,5 +7,16 @@ class PasswordReset(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     token = Column(String, unique=True, index=True)
-    expires_at = Column(DateTime)
-    used = Column(Boolean, default=False)
\ No newline at end of file
+    expires_at = Column(DateTime, index=True)
+    used = Column(Boolean, default=False)
+    
+    __table_args__ = (
+        # Only unused tokens can verify; keeps that lookup off used rows awaiting cleanup
+        Index(
+            "ix_password_resets_unused",
+            "token",
+            "expires_at",
+            postgresql_where=used == false(),
+            sqlite_where=used == false(),
+        ),
+    )
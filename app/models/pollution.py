@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class PollutionObservation(Base):
+    __tablename__ = "pollution_observations"
+    
+    id = Column(Integer, primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    geohash = Column(String(12), nullable=False)  # app.core.geohash.PRECISION characters
+    observed_at = Column(DateTime(timezone=True), nullable=False)
+    pollutant_type = Column(String, nullable=False)
+    severity = Column(Float, nullable=False)
+    source_image = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Serves time-range scans in keyset (observed_at, id) order, with the
+        # geohash prefix filter evaluated on the index entries
+        Index("ix_pollution_observations_time_geohash", "observed_at", "geohash"),
+        # Serves small bounding boxes over long time ranges
+        Index("ix_pollution_observations_geohash_time", "geohash", "observed_at"),
+    )
+
+class PollutionRollup(Base):
+    """
+    Pre-aggregated severity per geohash cell, time bucket and pollutant type,
+    kept for several geohash precisions so heatmap tiles at any zoom level
+    read a bounded number of rows. Updated incrementally on insert.
+    """
+    __tablename__ = "pollution_rollups"
+    
+    id = Column(Integer, primary_key=True)
+    precision = Column(Integer, nullable=False)
+    geohash = Column(String(12), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    pollutant_type = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    severity_sum = Column(Float, nullable=False, default=0.0)
+    severity_max = Column(Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        UniqueConstraint(
+            "precision", "geohash", "bucket_start", "pollutant_type",
+            name="uq_pollution_rollups_cell",
+        ),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from app.database import Base
+
+class TokenRevocation(Base):
+    """
+    Append-only log of access token revocations, replayed incrementally by
+    every process (see app.core.revocation). A row either revokes one token
+    (``jti``) or every token of a user issued before ``generation``.
+    """
+    __tablename__ = "token_revocations"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    jti = Column(String, nullable=True, index=True)
+    generation = Column(Integer, nullable=True)
+    # Rows past this point cannot match a live token and may be purged
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    # Fetch server-generated created_at/updated_at in the INSERT/UPDATE itself
+    # (RETURNING), so they never need a lazy reload under AsyncSession.
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -15,5 +18,17 @@ class User(Base):
     verification_token = Column(String, unique=True, nullable=True)
     verification_token_expires = Column(DateTime(timezone=True), nullable=True)
     google_id = Column(String, unique=True, nullable=True)
+    # Stamped into access tokens as "gen"; bumping it revokes every older token
+    token_generation = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # Only users with an outstanding token, for the expired-token cleanup
+        Index(
+            "ix_users_verification_token_expires",
+            "verification_token_expires",
+            postgresql_where=verification_token_expires.isnot(None),
+            sqlite_where=verification_token_expires.isnot(None),
+        ),
+    )
\ No newline at end of file
@@ -0,0 +1,20 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+class AnalysisJob(BaseModel):
+    id: str
+    status: str
+    sha256: str
+    content_type: str
+    size: int
+    model_version: Optional[str] = None
+    cache: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,63 @@
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+class PollutionObservation(BaseModel):
+    id: int
+    latitude: float
+    longitude: float
+    geohash: str
+    observed_at: datetime
+    pollutant_type: str
+    severity: float
+    source_image: Optional[str] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class PollutionPage(BaseModel):
+    items: List[PollutionObservation]
+    next_cursor: Optional[str] = None
+
+class ObservationIssue(BaseModel):
+    row: int
+    detail: str
+
+class ObservationBatchReport(BaseModel):
+    accepted: int
+    rejected: int
+    issues: List[ObservationIssue]
+
+class RegionBucketStats(BaseModel):
+    region: str
+    bucket_start: datetime
+    count: int
+    mean: float
+    max: float
+    p50: float
+    p90: float
+    p99: float
+    rolling_mean: float
+    zscore: Optional[float] = None
+
+class RegionStatsPage(BaseModel):
+    bucket: str
+    precision: int
+    window: int
+    as_of: Optional[datetime] = None
+    items: List[RegionBucketStats]
+    truncated: bool
+
+class SeverityAnomaly(BaseModel):
+    region: str
+    bucket_start: datetime
+    count: int
+    mean: float
+    zscore: Optional[float] = None
+    ewma_score: Optional[float] = None
+
+class AnomalyReport(BaseModel):
+    bucket: str
+    precision: int
+    threshold: float
+    as_of: Optional[datetime] = None
+    items: List[SeverityAnomaly]
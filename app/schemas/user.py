@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr, ConfigDict
 from datetime import datetime
 
@@ -21,6 +21,10 @@ class User(UserBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class UserRegistered(BaseModel):
+    user: User
+    verification_token: str
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -30,4 +34,26 @@ class TokenPayload(BaseModel):
     
 class PasswordReset(BaseModel):
     token: str
-    new_password: str
\ No newline at end of file
+    new_password: str
+
+class UserImportRow(BaseModel):
+    """One account in a bulk import (CSV column or NDJSON key per field)."""
+    email: EmailStr
+    full_name: Optional[str] = None
+    password: Optional[str] = None
+    # An existing bcrypt hash, e.g. when migrating accounts from another system
+    hashed_password: Optional[str] = None
+
+class UserImportIssue(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str  # "duplicate" or "invalid"
+    detail: str
+
+class UserImportReport(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    seconds: float
+    # Only rows that were not created, so large imports keep a small report
+    issues: List[UserImportIssue]
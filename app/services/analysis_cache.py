@@ -0,0 +1,169 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import replica_read
+from app.models.analysis import AnalysisResult
+
+# (sha256, model_version)
+Key = Tuple[str, str]
+# Where a result came from, reported to the caller as cache provenance
+MEMORY, STORE, COALESCED, COMPUTED = "memory", "store", "coalesced", "computed"
+# Rough per-entry bookkeeping cost on top of the serialized result
+_ENTRY_OVERHEAD = 200
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared computation whose request was cancelled; waiters retry."""
+
+
+@replica_read
+async def _load(db: AsyncSession, key: Key) -> Optional[Dict[str, Any]]:
+    sha256, model_version = key
+    stmt = select(AnalysisResult.result).where(
+        AnalysisResult.sha256 == sha256,
+        AnalysisResult.model_version == model_version,
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def _store(db: AsyncSession, key: Key, result: Dict[str, Any]) -> None:
+    sha256, model_version = key
+    db.add(AnalysisResult(sha256=sha256, model_version=model_version, result=result))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another worker stored the same result first
+        await db.rollback()
+
+
+class AnalysisResultCache:
+    """
+    Content-addressed cache of image analysis results.
+
+    Results are keyed by the image's SHA-256 plus the model version, so a
+    re-uploaded image is answered without running the model again and a new
+    model version never sees stale results. Lookups go through an in-memory
+    LRU bounded by ``max_bytes`` of serialized results, then the
+    ``analysis_results`` table (when ``persist`` is set). On a miss, concurrent
+    requests for the same key share a single computation.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, persist: bool = True):
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._entries: "OrderedDict[Key, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Key, asyncio.Future] = {}
+        self._counts = {MEMORY: 0, STORE: 0, COALESCED: 0, COMPUTED: 0}
+        self.evictions = 0
+
+    def get(self, key: Key) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Key, result: Dict[str, Any]) -> None:
+        size = len(orjson.dumps(result)) + len(key[0]) + len(key[1]) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._entries[key] = (size, result)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        db: AsyncSession,
+        sha256: str,
+        model_version: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Returns (result, source) for an image, running ``compute`` only when
+        neither tier has the result and no identical request is in flight.
+        ``source`` is one of "memory", "store", "coalesced" or "computed".
+        If the request computing a result is cancelled, a request waiting on
+        it takes over the computation.
+        """
+        key = (sha256, model_version)
+        result = self.get(key)
+        if result is not None:
+            self._counts[MEMORY] += 1
+            return result, MEMORY
+
+        while key in self._inflight:
+            try:
+                result = await asyncio.shield(self._inflight[key])
+            except _LeaderCancelled:
+                # The first waiter to wake up finds no computation in flight and starts one
+                continue
+            self._counts[COALESCED] += 1
+            return result, COALESCED
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await _load(db, key) if self.persist else None
+            source = STORE
+            if result is None:
+                result = await compute()
+                source = COMPUTED
+            self.set(key, result)
+            future.set_result(result)
+        except BaseException as exc:
+            # A cancelled request (client gone) must not fail the requests waiting on it
+            future.set_exception(_LeaderCancelled() if isinstance(exc, asyncio.CancelledError) else exc)
+            # Mark the exception as retrieved when nobody was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        self._counts[source] += 1
+
+        if source == COMPUTED and self.persist:
+            await _store(db, key, result)
+        return result, source
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns per-source counters, hit ratio and memory tier usage."""
+        with self._lock:
+            lookups = sum(self._counts.values())
+            hits = lookups - self._counts[COMPUTED]
+            return {
+                **self._counts,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "in_flight": len(self._inflight),
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+analysis_cache = AnalysisResultCache(
+    max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES,
+    persist=settings.ANALYSIS_CACHE_PERSIST,
+)
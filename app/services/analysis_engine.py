@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from app.services.analysis_models import AnalysisModel
+
+# Model instance inside each pool worker, loaded once by _init_worker
+_worker_model: Optional["AnalysisModel"] = None
+
+
+def _init_worker(model_path: str) -> None:
+    from app.services.analysis_models import load_model
+
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _predict_batch(batch: "np.ndarray") -> "np.ndarray":
+    return _worker_model.predict(batch)
+
+
+class AnalysisEngine:
+    """
+    Dynamic micro-batching scheduler for image analysis.
+
+    Callers preprocess their image (on the threadpool) and put the features
+    on an asyncio queue. A scheduler task collects queued requests into a
+    batch until ``max_batch_size`` is reached or the first request has waited
+    ``max_wait_ms``, stacks them into one array and runs the model on a
+    process pool. At most ``workers`` batches are in flight; while they run,
+    new requests keep queueing, so batches grow with load. Each caller awaits
+    its own future. A full queue is rejected with 503.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        workers: Optional[int] = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10,
+        max_queue: int = 1024,
+    ):
+        self.model_path = model_path
+        self._model: Optional["AnalysisModel"] = None
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stats: Dict[str, float] = {
+            "requests": 0,
+            "batches": 0,
+            "rejected": 0,
+            "batch_seconds_total": 0.0,
+        }
+
+    @property
+    def model(self) -> "AnalysisModel":
+        """The model instance used for pre/postprocessing, loaded on first use."""
+        if self._model is None:
+            from app.services.analysis_models import load_model
+
+            self._model = load_model(self.model_path)
+        return self._model
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._scheduler is not None and not self._scheduler.done() and self._scheduler.get_loop() is loop:
+            return
+        if self._executor is None:
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.model_path,),
+                )
+            else:
+                _init_worker(self.model_path)
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._slots = asyncio.Semaphore(max(self.workers, 1))
+        self._scheduler = loop.create_task(self._schedule())
+
+    async def analyze(self, image: memoryview) -> Dict[str, Any]:
+        """Runs the model on one image and returns its postprocessed result."""
+        features = await run_in_threadpool(self.model.preprocess, image)
+        output = await self.submit(features)
+        return self.model.postprocess(output)
+
+    async def submit(self, features: "np.ndarray") -> "np.ndarray":
+        """Queues preprocessed features and waits for this request's model output."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((features, future))
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Analysis queue is full. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        return await future
+
+    async def _schedule(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            loop.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple["np.ndarray", asyncio.Future]]) -> None:
+        import numpy as np
+
+        started = time.perf_counter()
+        try:
+            stacked = np.stack([features for features, _ in batch])
+            outputs = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _predict_batch, stacked
+            )
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+        finally:
+            self._slots.release()
+            self._stats["batches"] += 1
+            self._stats["requests"] += len(batch)
+            self._stats["batch_seconds_total"] += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, float]:
+        snapshot = dict(self._stats)
+        batches = snapshot["batches"] or 1
+        snapshot["mean_batch_size"] = snapshot["requests"] / batches
+        snapshot["queued"] = self._queue.qsize() if self._queue is not None else 0
+        return snapshot
+
+    def shutdown(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            self._scheduler = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+analysis_engine = AnalysisEngine(
+    settings.ANALYSIS_MODEL,
+    workers=settings.ANALYSIS_WORKERS,
+    max_batch_size=settings.ANALYSIS_MAX_BATCH_SIZE,
+    max_wait_ms=settings.ANALYSIS_MAX_WAIT_MS,
+    max_queue=settings.ANALYSIS_MAX_QUEUE,
+)
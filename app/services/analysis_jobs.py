@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.analysis import AnalysisJob
+from app.services.analysis_cache import MEMORY, analysis_cache
+from app.services.analysis_engine import analysis_engine
+from app.services.image_ingest import IngestedImage
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+
+def spool_dir() -> str:
+    path = settings.ANALYSIS_JOB_SPOOL_DIR or os.path.join(tempfile.gettempdir(), "bluescan-jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _spool(source: BinaryIO, path: str) -> None:
+    source.seek(0)
+    with open(path, "wb") as target:
+        shutil.copyfileobj(source, target, 1 << 20)
+
+
+def _remove(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class JobEvents:
+    """
+    Wakes coroutines waiting on a job when this process finishes it. Jobs
+    finished by a runner in another process are only seen by polling, so
+    waiters always pass a timeout.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, set()).add(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def notify(self, job_id: str) -> None:
+        for future in self._waiters.pop(job_id, ()):
+            if not future.done():
+                future.set_result(None)
+
+
+job_events = JobEvents()
+
+
+async def enqueue(db: AsyncSession, image: IngestedImage) -> AnalysisJob:
+    """
+    Records an analysis job for an uploaded image and returns it. A result
+    already in the memory cache completes the job immediately; otherwise the
+    image is copied to the spool directory for the runner to pick up.
+    """
+    job_id = uuid.uuid4().hex
+    model_version = analysis_engine.model.version
+    job = AnalysisJob(
+        id=job_id,
+        sha256=image.sha256,
+        content_type=image.content_type,
+        size=image.size,
+        attempts=0,
+    )
+    cached = analysis_cache.get((image.sha256, model_version))
+    if cached is not None:
+        now = datetime.now(timezone.utc)
+        job.status = DONE
+        job.model_version = model_version
+        job.cache = MEMORY
+        job.result = cached
+        job.started_at = job.finished_at = now
+    else:
+        job.status = QUEUED
+        job.image_path = os.path.join(spool_dir(), job_id)
+        await run_in_threadpool(_spool, image.file, job.image_path)
+    db.add(job)
+    try:
+        await db.commit()
+    except BaseException:
+        _remove(job.image_path)
+        raise
+    if job.status == QUEUED:
+        job_runner.wake()
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[AnalysisJob]:
+    # Always read from the primary: a job is polled right after it is created
+    stmt = select(AnalysisJob).where(AnalysisJob.id == job_id).execution_options(populate_existing=True)
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def claim_jobs(db: AsyncSession, limit: int) -> List[AnalysisJob]:
+    """
+    Atomically marks up to ``limit`` jobs as running and returns them, oldest
+    first. Jobs left running past ANALYSIS_JOB_TIMEOUT_SECONDS (their runner
+    died) are claimed again until they reach ANALYSIS_JOB_MAX_ATTEMPTS, then
+    failed. On PostgreSQL, rows locked by another runner are skipped.
+    """
+    now = datetime.now(timezone.utc)
+    stale = and_(
+        AnalysisJob.status == RUNNING,
+        AnalysisJob.started_at < now - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT_SECONDS),
+    )
+    await db.execute(
+        update(AnalysisJob)
+        .where(stale, AnalysisJob.attempts >= settings.ANALYSIS_JOB_MAX_ATTEMPTS)
+        .values(status=FAILED, error="Job timed out", finished_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    candidates = (
+        select(AnalysisJob.id)
+        .where(or_(AnalysisJob.status == QUEUED, stale))
+        .order_by(AnalysisJob.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(AnalysisJob)
+        .where(AnalysisJob.id.in_(candidates))
+        .values(status=RUNNING, started_at=now, attempts=AnalysisJob.attempts + 1)
+        .returning(AnalysisJob)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = list((await db.execute(stmt)).scalars().all())
+    await db.commit()
+    return sorted(jobs, key=lambda job: job.created_at)
+
+
+async def purge_jobs(db: AsyncSession, batch_size: int) -> int:
+    """
+    Deletes up to ``batch_size`` jobs that finished, or have sat unclaimed,
+    for more than ANALYSIS_JOB_RETENTION_HOURS in one short transaction,
+    then removes their spooled images. Returns how many were deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.ANALYSIS_JOB_RETENTION_HOURS)
+    batch = (
+        select(AnalysisJob.id)
+        .where(or_(
+            AnalysisJob.finished_at < cutoff,
+            and_(AnalysisJob.status == QUEUED, AnalysisJob.created_at < cutoff),
+        ))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(AnalysisJob)
+        .where(AnalysisJob.id.in_(batch))
+        .returning(AnalysisJob.image_path)
+        .execution_options(synchronize_session=False)
+    )
+    paths = result.scalars().all()
+    await db.commit()
+    await run_in_threadpool(lambda: [_remove(path) for path in paths])
+    return len(paths)
+
+
+async def _finish(db: AsyncSession, job: AnalysisJob, **values: Any) -> None:
+    await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job.id)
+        .values(finished_at=datetime.now(timezone.utc), image_path=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    _remove(job.image_path)
+    job_events.notify(job.id)
+
+
+async def run_job(job: AnalysisJob) -> None:
+    """Analyzes one claimed job and stores its result or error."""
+    model_version = analysis_engine.model.version
+    async with AsyncSessionLocal() as db:
+        try:
+            async def compute():
+                with IngestedImage(open(job.image_path, "rb"), job.size, job.sha256, job.content_type) as image:
+                    with image.view() as buffer:
+                        return await analysis_engine.analyze(buffer)
+
+            result, source = await analysis_cache.get_or_compute(db, job.sha256, model_version, compute)
+        except Exception as exc:
+            logger.exception("Analysis job %s failed", job.id)
+            await db.rollback()
+            await _finish(db, job, status=FAILED, error=str(exc) or type(exc).__name__)
+        else:
+            await _finish(db, job, status=DONE, model_version=model_version, cache=source, result=result)
+
+
+class JobRunner:
+    """
+    Claims queued jobs in batches and analyzes them concurrently, so the
+    analysis engine can batch them together. Runs inside the API process
+    (``ANALYSIS_JOB_INLINE_RUNNER``) or on its own via ``python -m app.worker``;
+    any number of runners can share the job table.
+    """
+
+    def __init__(self, batch_size: int = 32, poll_seconds: float = 1.0):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """Claims and runs one batch of jobs. Returns how many were claimed."""
+        async with AsyncSessionLocal() as db:
+            jobs = await claim_jobs(db, self.batch_size)
+        if jobs:
+            await asyncio.gather(*(run_job(job) for job in jobs))
+        return len(jobs)
+
+    async def run(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Claiming analysis jobs failed")
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            # Reset here rather than in run(), so a stop() before the task first runs is not lost
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stops after the current batch finishes."""
+        self._stopping = True
+        self.wake()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+
+job_runner = JobRunner(
+    batch_size=settings.ANALYSIS_MAX_BATCH_SIZE,
+    poll_seconds=settings.ANALYSIS_JOB_POLL_SECONDS,
+)
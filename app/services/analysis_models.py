@@ -0,0 +1,77 @@
+import importlib
+from typing import Any, Dict
+
+import numpy as np
+
+
+class AnalysisModel:
+    """
+    Interface for pollution detection models served by the analysis engine.
+
+    ``preprocess`` turns one raw image into a fixed-shape float32 array and
+    runs once per request; ``predict`` runs on a stacked batch of those
+    arrays inside a worker process; ``postprocess`` turns one row of the
+    batch output into the JSON result returned to the caller.
+    """
+
+    version: str = "base"
+    input_shape: tuple = ()
+
+    def preprocess(self, image: memoryview) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def postprocess(self, output: np.ndarray) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class StandInModel(AnalysisModel):
+    """
+    CPU stand-in used until the real detector is wired in.
+
+    Features are a normalized byte histogram of the encoded image (sampled
+    to at most ~1M bytes, straight from the memoryview without copying), fed
+    through a small fixed-weight two-layer network. The outputs are not
+    meaningful, but the cost profile (cheap per-request preprocessing, one
+    matrix multiply per batch) is representative.
+    """
+
+    version = "stand-in-1"
+    labels = ("clear", "plastic", "oil", "algae")
+    input_shape = (256,)
+    _MAX_SAMPLES = 1 << 20
+
+    def __init__(self, hidden: int = 512, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.w1 = rng.standard_normal((256, hidden), dtype=np.float32) / 16
+        self.w2 = rng.standard_normal((hidden, len(self.labels)), dtype=np.float32) / np.sqrt(hidden)
+
+    def preprocess(self, image: memoryview) -> np.ndarray:
+        data = np.frombuffer(image, dtype=np.uint8)
+        stride = max(len(data) // self._MAX_SAMPLES, 1)
+        sample = data[::stride]
+        histogram = np.bincount(sample, minlength=256).astype(np.float32)
+        return histogram / max(len(sample), 1) * 256
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        hidden = np.maximum(batch @ self.w1, 0)
+        logits = hidden @ self.w2
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def postprocess(self, output: np.ndarray) -> Dict[str, Any]:
+        scores = {label: float(score) for label, score in zip(self.labels, output)}
+        return {
+            "label": max(scores, key=scores.get),
+            "pollution_score": 1.0 - scores["clear"],
+            "scores": scores,
+        }
+
+
+def load_model(path: str) -> AnalysisModel:
+    """Instantiates a model from a "module:ClassName" path."""
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
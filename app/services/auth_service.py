@@ -1,117 +1,313 @@
-from typing import Optional
-from sqlalchemy.orm import Session
-from app.core.security import pwd_context
+from typing import Optional, Tuple
+from sqlalchemy import DateTime, bindparam, delete, false, insert, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.revocation import token_revocations
+from app.core.token_cache import token_cache
+from app.database import replica_read
+from app.models.password_reset import PasswordReset
+from app.models.token_revocation import TokenRevocation
 from app.models.user import User
 from app.schemas.user import UserCreate, UserGoogle
+from app.services import email_outbox
+from app.services.email_outbox import email_dispatcher
 from datetime import datetime, timedelta
-from typing import Optional
 import secrets
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+@replica_read
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def create_user(db: Session, user_in: UserCreate) -> User:
-    hashed_password = pwd_context.hash(user_in.password)
+async def _save(db: AsyncSession, user: User) -> User:
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
+    hashed_password = await password_hasher.hash(user_in.password)
     user = User(
         email=user_in.email,
         hashed_password=hashed_password,
         full_name=user_in.full_name
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await _save(db, user)
 
-def create_google_user(db: Session, user_in: UserGoogle) -> User:
+async def create_google_user(db: AsyncSession, user_in: UserGoogle) -> User:
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
         google_id=user_in.google_id
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await _save(db, user)
 
-def authenticate(db: Session, email: str, password: str) -> Optional[User]:
-    user = get_user_by_email(db, email=email)
+async def authenticate(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await get_user_by_email(db, email=email)
     if not user or not user.hashed_password:
         return None
-    if not pwd_context.verify(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
     return user
 
-def store_reset_token(db: Session, user_id: int, token: str) -> None:
-    """Stores password reset token with expiration time"""
+async def store_reset_token(db: AsyncSession, user_id: int, token: str, email: Optional[str] = None) -> None:
+    """
+    Stores password reset token with expiration time. When ``email`` is given
+    the reset link is queued in the email outbox in the same transaction.
+    """
     expiration = datetime.utcnow() + timedelta(hours=24)
-    db.execute(
-        """INSERT INTO password_resets (user_id, token, expires_at)
-        VALUES (:user_id, :token, :expires_at)""",
+    await db.execute(
+        text("""INSERT INTO password_resets (user_id, token, expires_at, used)
+        VALUES (:user_id, :token, :expires_at, FALSE)"""),
         {
             "user_id": user_id,
             "token": token,
             "expires_at": expiration
         }
     )
-    db.commit()
+    queued = email is not None and email_outbox.enqueue(db, email, *email_outbox.reset_email(token))
+    await db.commit()
+    if queued:
+        email_dispatcher.wake()
 
-def verify_reset_token(db: Session, token: str) -> bool:
+@replica_read
+async def verify_reset_token(db: AsyncSession, token: str) -> bool:
     """Verifies if a reset token is valid and not expired"""
-    result = db.execute(
-        """SELECT user_id FROM password_resets 
+    result = (await db.execute(
+        text("""SELECT user_id FROM password_resets
         WHERE token = :token AND expires_at > :now
-        AND used = FALSE""",
+        AND used = FALSE"""),
         {
             "token": token,
             "now": datetime.utcnow()
         }
-    ).first()
+    )).first()
     return bool(result)
 
-def reset_password(db: Session, token: str, new_password: str) -> None:
-    """Resets user password and marks reset token as used"""
-    user_id = db.execute(
-        "SELECT user_id FROM password_resets WHERE token = :token",
-        {"token": token}
-    ).scalar()
-    
-    if user_id:
-        hashed_password = pwd_context.hash(new_password)
-        db.execute(
-            "UPDATE users SET hashed_password = :password WHERE id = :user_id",
-            {"password": hashed_password, "user_id": user_id}
-        )
-        db.execute(
-            "UPDATE password_resets SET used = TRUE WHERE token = :token",
-            {"token": token}
-        )
-        db.commit()
-        
-        
-def create_verification_token(db: Session, user: User) -> str:
-    """
-    Creates a new email verification token for a user.
+# Password reset statements, built once so SQLAlchemy reuses their compiled
+# form and each reset only binds parameters.
+# Read on the primary before hashing: an unknown token costs one indexed
+# lookup, never a bcrypt hash
+_find_reset_token = (
+    select(PasswordReset.id)
+    .where(
+        PasswordReset.token == bindparam("reset_token"),
+        PasswordReset.used == false(),
+        PasswordReset.expires_at > bindparam("checked_at"),
+    )
+    .limit(1)
+)
+# Marks the token used only if it is still unused and unexpired, so of two
+# concurrent resets with the same token exactly one gets a user_id back.
+_claim_reset_token = (
+    update(PasswordReset)
+    .where(
+        PasswordReset.token == bindparam("reset_token"),
+        PasswordReset.used == false(),
+        PasswordReset.expires_at > bindparam("checked_at"),
+    )
+    .values(used=True)
+    .returning(PasswordReset.user_id)
+    .execution_options(synchronize_session=False)
+)
+# Bumping the generation revokes every token issued before the reset
+_set_password = (
+    update(User)
+    .where(User.id == bindparam("reset_user_id"))
+    .values(hashed_password=bindparam("new_hash"), token_generation=User.token_generation + 1)
+    .returning(User.token_generation)
+    .execution_options(synchronize_session=False)
+)
+_log_revocation = insert(TokenRevocation).values(
+    user_id=bindparam("reset_user_id"),
+    generation=bindparam("generation"),
+    expires_at=bindparam("revoke_until"),
+    created_at=bindparam("checked_at"),
+)
+# PostgreSQL: all three as one statement (data-modifying CTEs), one round
+# trip. Built on the Core tables: an ORM insert would take the bulk-insert
+# path, which can't compile an INSERT ... SELECT over CTEs.
+_password_resets = PasswordReset.__table__
+_users = User.__table__
+_token_revocations = TokenRevocation.__table__
+_claimed = (
+    update(_password_resets)
+    .where(
+        _password_resets.c.token == bindparam("reset_token"),
+        _password_resets.c.used == false(),
+        _password_resets.c.expires_at > bindparam("checked_at"),
+    )
+    .values(used=True)
+    .returning(_password_resets.c.user_id)
+    .cte("claimed")
+)
+_updated = (
+    update(_users)
+    .where(_users.c.id == _claimed.c.user_id)
+    .values(hashed_password=bindparam("new_hash"), token_generation=_users.c.token_generation + 1)
+    .returning(_users.c.id, _users.c.token_generation)
+    .cte("updated")
+)
+_reset_password_atomic = insert(_token_revocations).from_select(
+    ["user_id", "generation", "expires_at", "created_at"],
+    select(
+        _updated.c.id,
+        _updated.c.token_generation,
+        bindparam("revoke_until", type_=DateTime),
+        bindparam("checked_at", type_=DateTime),
+    ),
+).returning(_token_revocations.c.user_id, _token_revocations.c.generation)
+
+async def consume_reset_token(
+    db: AsyncSession, token: str, hashed_password: str
+) -> Optional[Tuple[int, int]]:
+    """
+    Uses a reset token and sets the already-hashed password, atomically.
+    Returns (user_id, new token generation), or None if the token is
+    unknown, expired or already used. One round trip on PostgreSQL; other
+    databases run the same statements in one short transaction.
+    """
+    now = datetime.utcnow()
+    params = {
+        "reset_token": token,
+        "checked_at": now,
+        "new_hash": hashed_password,
+        "revoke_until": now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+    if db.get_bind().dialect.name == "postgresql":
+        row = (await db.execute(_reset_password_atomic, params)).first()
+    else:
+        row = None
+        user_id = (await db.execute(_claim_reset_token, params)).scalar()
+        if user_id is not None:
+            params["reset_user_id"] = user_id
+            params["generation"] = (await db.execute(_set_password, params)).scalar()
+            await db.execute(_log_revocation, params)
+            row = (user_id, params["generation"])
+    if row is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    return row[0], row[1]
+
+async def reset_password(db: AsyncSession, token: str, new_password: str) -> bool:
+    """
+    Resets the user's password and uses up the reset token. Returns False if
+    the token is invalid, expired or was already used (also by a concurrent
+    request). The token is looked up first, so a bad token is rejected
+    without hashing; the bcrypt hash then runs on the hashing pool with no
+    transaction open, and consume_reset_token claims the token atomically.
+    """
+    live = (await db.execute(
+        _find_reset_token, {"reset_token": token, "checked_at": datetime.utcnow()}
+    )).first()
+    await db.rollback()
+    if live is None:
+        return False
+    hashed_password = await password_hasher.hash(new_password)
+    consumed = await consume_reset_token(db, token, hashed_password)
+    if consumed is None:
+        return False
+    user_id, generation = consumed
+    token_cache.invalidate_user(user_id)
+    token_revocations.committed(user_id, generation=generation)
+    return True
+
+
+async def purge_password_resets(db: AsyncSession, batch_size: int) -> int:
+    """
+    Deletes up to ``batch_size`` used or expired reset tokens in one short
+    transaction. Returns how many were deleted.
+    """
+    now = datetime.utcnow()
+    batch = (
+        select(PasswordReset.id)
+        .where(or_(PasswordReset.used.is_(True), PasswordReset.expires_at <= now))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(PasswordReset)
+        .where(PasswordReset.id.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def create_verification_token(db: AsyncSession, user: User) -> str:
+    """
+    Creates a new email verification token for a user and queues the
+    verification email in the same transaction.
     """
     token = secrets.token_urlsafe(32)
     user.verification_token = token
     user.verification_token_expires = datetime.utcnow() + timedelta(hours=24)
-    db.commit()
+    queued = email_outbox.enqueue(db, user.email, *email_outbox.verification_email(token))
+    await db.commit()
+    if queued:
+        email_dispatcher.wake()
     return token
 
-def verify_email_token(db: Session, token: str) -> Optional[User]:
+async def verify_email_token(db: AsyncSession, token: str) -> Optional[User]:
     """
     Verifies an email verification token and activates the user account.
     """
-    user = db.query(User).filter(
+    result = await db.execute(select(User).where(
         User.verification_token == token,
         User.verification_token_expires > datetime.utcnow()
-    ).first()
-    
+    ))
+    user = result.scalars().first()
+
     if user:
         user.email_verified = True
         user.is_active = True
         user.verification_token = None
         user.verification_token_expires = None
-        db.commit()
+        await db.commit()
+        token_cache.invalidate_user(user.id)
         return user
-    return None
\ No newline at end of file
+    return None
+
+async def purge_verification_tokens(db: AsyncSession, batch_size: int) -> int:
+    """
+    Clears up to ``batch_size`` expired email verification tokens in one
+    short transaction (the user can request a new one). Returns how many
+    were cleared.
+    """
+    now = datetime.utcnow()
+    batch = (
+        select(User.id)
+        .where(User.verification_token_expires <= now)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(batch))
+        .values(verification_token=None, verification_token_expires=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def deactivate_user(db: AsyncSession, user: User) -> User:
+    """
+    Deactivates a user account and revokes its tokens, so the change
+    takes effect on the user's next request in every worker.
+    """
+    user.is_active = False
+    user.token_generation = (user.token_generation or 0) + 1
+    token_revocations.add_generation(db, user.id, user.token_generation)
+    await db.commit()
+    token_cache.invalidate_user(user.id)
+    token_revocations.committed(user.id, generation=user.token_generation)
+    return user
+
+async def revoke_token(db: AsyncSession, claims: dict, user_id: int) -> None:
+    """
+    Revokes a single access token (logout). Other tokens of the user stay valid.
+    """
+    token_revocations.add_token(db, claims, user_id)
+    await db.commit()
+    token_revocations.committed(user_id, jti=claims["jti"])
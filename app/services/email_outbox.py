@@ -0,0 +1,392 @@
+import asyncio
+import logging
+import random
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter
+from app.database import AsyncSessionLocal
+from app.models.email_outbox import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def verification_email(token: str) -> Tuple[str, str]:
+    link = f"{settings.EMAIL_LINK_BASE_URL}/verify-email?token={token}"
+    return (
+        f"Verify your {settings.APP_NAME} account",
+        f"Welcome! Confirm your email address to activate your account:\n\n{link}\n\n"
+        "The link is valid for 24 hours.\n",
+    )
+
+
+def reset_email(token: str) -> Tuple[str, str]:
+    link = f"{settings.EMAIL_LINK_BASE_URL}/reset-password?token={token}"
+    return (
+        f"Reset your {settings.APP_NAME} password",
+        f"Someone asked to reset the password of this account. To choose a new one, open:\n\n{link}\n\n"
+        "The link is valid for 24 hours. If this wasn't you, ignore this email.\n",
+    )
+
+
+def enqueue(db: AsyncSession, to_address: str, subject: str, body: str) -> bool:
+    """
+    Adds an email to the outbox in the caller's transaction, so it is sent
+    if and only if the caller commits. Returns False (and queues nothing)
+    when no SMTP server is configured.
+    """
+    if not settings.SMTP_HOST:
+        return False
+    now = datetime.utcnow()
+    db.add(EmailOutbox(
+        to_address=to_address,
+        domain=to_address.rpartition("@")[2].lower(),
+        subject=subject,
+        body=body,
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now,
+    ))
+    return True
+
+
+class PermanentDeliveryError(Exception):
+    pass
+
+
+class SMTPConnection:
+    """
+    One SMTP session reused across messages and batches. smtplib blocks, so
+    every call on the session runs on this connection's own thread. The
+    session is reopened when the server has dropped it, and closed after
+    ``idle_seconds`` without use.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        timeout: float = 10.0,
+        idle_seconds: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self.opened = 0
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls and smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        self.opened += 1
+        return smtp
+
+    def _close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def _send(self, message: EmailMessage) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_seconds:
+            self._close()
+        reused = self._smtp is not None
+        if self._smtp is None:
+            self._smtp = self._open()
+        try:
+            self._smtp.send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self._smtp = None
+            if not reused:
+                raise
+            # The server dropped an idle session; retry once on a fresh one
+            self._smtp = self._open()
+            self._smtp.send_message(message)
+        except smtplib.SMTPRecipientsRefused as exc:
+            codes = [code for code, _ in exc.recipients.values()]
+            if all(code >= 500 for code in codes):
+                raise PermanentDeliveryError(str(exc)) from exc
+            raise
+        except smtplib.SMTPResponseException as exc:
+            if exc.smtp_code >= 500:
+                raise PermanentDeliveryError(f"{exc.smtp_code} {exc.smtp_error!r}") from exc
+            raise
+        finally:
+            self._last_used = time.monotonic()
+
+    async def send(self, message: EmailMessage) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._send, message)
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+
+
+def _message(row: EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_FROM
+    message["To"] = row.to_address
+    message["Subject"] = row.subject
+    # Stable per outbox row, so a resend after a crash can be deduplicated downstream
+    message["Message-ID"] = f"<outbox-{row.id}@{settings.EMAIL_FROM.rpartition('@')[2].rstrip('>')}>"
+    message.set_content(row.body)
+    return message
+
+
+async def claim_emails(db: AsyncSession, limit: int, lease_seconds: float) -> List[EmailOutbox]:
+    """
+    Atomically claims up to ``limit`` due emails for ``lease_seconds``.
+    Emails whose dispatcher died mid-batch become due again when the lease
+    runs out. On PostgreSQL, rows locked by another dispatcher are skipped.
+    """
+    now = datetime.utcnow()
+    candidates = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status.in_((PENDING, SENDING)), EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(candidates))
+        .values(status=SENDING, next_attempt_at=now + timedelta(seconds=lease_seconds))
+        .returning(EmailOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    rows = list((await db.execute(stmt)).scalars().all())
+    await db.commit()
+    return rows
+
+
+async def purge_emails(db: AsyncSession, batch_size: int) -> int:
+    """
+    Deletes up to ``batch_size`` sent or failed emails older than
+    EMAIL_OUTBOX_RETENTION_HOURS in one short transaction. Failed emails
+    still carry their token. Returns how many were deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=settings.EMAIL_OUTBOX_RETENTION_HOURS)
+    batch = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status.in_((SENT, FAILED)), EmailOutbox.created_at <= cutoff)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(EmailOutbox)
+        .where(EmailOutbox.id.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+class EmailDispatcher:
+    """
+    Sends queued emails in batches, outside of any request.
+
+    Each round claims up to ``batch_size`` due emails and spreads them over
+    ``connections`` reused SMTP sessions. Recipient domains are throttled to
+    ``domain_rate_per_minute`` (through the configured rate limit backend,
+    so the limit holds across dispatchers); emails over the limit are put
+    back until their domain has room. Temporary failures are retried with
+    exponential backoff and jitter up to ``max_attempts`` times; permanent
+    (5xx) rejections fail at once. Delivery is at-least-once.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        poll_seconds: float = 1.0,
+        connections: int = 2,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 30.0,
+        domain_rate_per_minute: int = 120,
+        lease_seconds: float = 300.0,
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.connection_count = connections
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.throttle = RateLimiter(requests_per_minute=domain_rate_per_minute, scope="email-domain")
+        self._connections: List[SMTPConnection] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._stats: Dict[str, int] = {"sent": 0, "retried": 0, "failed": 0, "throttled": 0}
+
+    @property
+    def connections(self) -> List[SMTPConnection]:
+        if not self._connections:
+            self._connections = [
+                SMTPConnection(
+                    settings.SMTP_HOST,
+                    settings.SMTP_PORT,
+                    username=settings.SMTP_USERNAME,
+                    password=settings.SMTP_PASSWORD,
+                    starttls=settings.SMTP_STARTTLS,
+                    timeout=settings.SMTP_TIMEOUT_SECONDS,
+                )
+                for _ in range(max(self.connection_count, 1))
+            ]
+        return self._connections
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), 6 * 3600)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    async def run_once(self) -> int:
+        """Claims and delivers one batch. Returns how many emails were claimed."""
+        async with AsyncSessionLocal() as db:
+            rows = await claim_emails(db, self.batch_size, self.lease_seconds)
+        if not rows:
+            return 0
+
+        ready: List[EmailOutbox] = []
+        deferred: List[Tuple[EmailOutbox, float]] = []
+        for row in rows:
+            wait = await self.throttle.hit(row.domain)
+            if wait > 0:
+                deferred.append((row, wait))
+            else:
+                ready.append(row)
+
+        errors: Dict[int, Exception] = {}
+
+        async def drain(connection: SMTPConnection, share: List[EmailOutbox]) -> None:
+            # SMTP is sequential per session; parallelism comes from the connections
+            for row in share:
+                try:
+                    await connection.send(_message(row))
+                except Exception as exc:
+                    errors[row.id] = exc
+
+        connections = self.connections
+        await asyncio.gather(*(
+            drain(connection, ready[i::len(connections)]) for i, connection in enumerate(connections)
+        ))
+
+        now = datetime.utcnow()
+        sent = [row.id for row in ready if row.id not in errors]
+        async with AsyncSessionLocal() as db:
+            if sent:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    # The body holds a live token; nothing needs it once delivered
+                    .values(status=SENT, sent_at=now, last_error=None, body="")
+                    .execution_options(synchronize_session=False)
+                )
+            for row, wait in deferred:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == row.id)
+                    .values(status=PENDING, next_attempt_at=now + timedelta(seconds=wait))
+                    .execution_options(synchronize_session=False)
+                )
+            for row in ready:
+                exc = errors.get(row.id)
+                if exc is None:
+                    continue
+                attempts = row.attempts + 1
+                permanent = isinstance(exc, PermanentDeliveryError) or attempts >= self.max_attempts
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == row.id)
+                    .values(
+                        status=FAILED if permanent else PENDING,
+                        attempts=attempts,
+                        next_attempt_at=now + self._backoff(attempts),
+                        last_error=str(exc)[:500],
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                self._stats["failed" if permanent else "retried"] += 1
+                if permanent:
+                    logger.warning("Giving up on email %s to %s: %s", row.id, row.to_address, exc)
+            await db.commit()
+        self._stats["sent"] += len(sent)
+        self._stats["throttled"] += len(deferred)
+        return len(rows)
+
+    async def run(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Dispatching emails failed")
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        for connection in self._connections:
+            await connection.close()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stops after the current batch and closes the SMTP sessions."""
+        self._stopping = True
+        self.wake()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        snapshot = dict(self._stats)
+        snapshot["connections_opened"] = sum(connection.opened for connection in self._connections)
+        return snapshot
+
+
+email_dispatcher = EmailDispatcher(
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    poll_seconds=settings.EMAIL_POLL_SECONDS,
+    connections=settings.EMAIL_SMTP_CONNECTIONS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+    domain_rate_per_minute=settings.EMAIL_DOMAIN_RATE_PER_MINUTE,
+)
@@ -0,0 +1,144 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class GoogleOAuthClient:
+    """
+    Validates Google access tokens against the userinfo endpoint.
+
+    One ``httpx.AsyncClient`` is shared for the life of the process, so calls
+    reuse pooled keep-alive (HTTP/2 when available) connections instead of a
+    new TLS handshake per login. Successful lookups are cached by a SHA-256 of
+    the token for ``cache_ttl_seconds``, so a client retrying a login with
+    the same token does not trigger another round trip to Google.
+    """
+
+    def __init__(
+        self,
+        userinfo_url: str,
+        timeout_seconds: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        http2: bool = True,
+        cache_ttl_seconds: float = 60,
+        cache_max_entries: int = 10000,
+    ):
+        self.userinfo_url = userinfo_url
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.http2 = http2
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """The shared client, created on first use (importing httpx is slow)."""
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            if self.http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:  # HTTP/2 needs the h2 package; fall back to HTTP/1.1 keep-alive
+                    self.http2 = False
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=min(self.timeout_seconds, 3.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=60,
+                ),
+            )
+        return self._client
+
+    def _cached(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._cache[key]
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, key: bytes, userinfo: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, userinfo)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    async def get_userinfo(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the userinfo claims for a Google access token, or None if
+        Google rejects the token. Raises 503 if Google cannot be reached.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        userinfo = self._cached(key)
+        if userinfo is not None:
+            return userinfo
+        client = self.client
+        import httpx
+
+        try:
+            response = await client.get(
+                self.userinfo_url,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+        except httpx.HTTPError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Google sign-in is temporarily unavailable",
+                headers={"Retry-After": "1"},
+            )
+        if response.status_code != 200:
+            return None
+        userinfo = response.json()
+        self._store(key, userinfo)
+        return userinfo
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._cache),
+                "http2": self.http2,
+            }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+google_oauth = GoogleOAuthClient(
+    settings.GOOGLE_USERINFO_URL,
+    timeout_seconds=settings.GOOGLE_HTTP_TIMEOUT_SECONDS,
+    max_connections=settings.GOOGLE_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.GOOGLE_HTTP_MAX_KEEPALIVE,
+    http2=settings.GOOGLE_HTTP2,
+    cache_ttl_seconds=settings.GOOGLE_USERINFO_CACHE_TTL_SECONDS,
+    cache_max_entries=settings.GOOGLE_USERINFO_CACHE_MAX_ENTRIES,
+)
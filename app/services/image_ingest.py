@@ -0,0 +1,127 @@
+import hashlib
+import mmap
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# Accepted image types and the magic bytes their payload must start with
+IMAGE_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/tiff": (b"II*\x00", b"MM\x00*"),
+}
+_SNIFF_BYTES = max(len(sig) for sigs in IMAGE_SIGNATURES.values() for sig in sigs)
+# Body chunks are collected up to this size, then hashed and written on a thread
+_WRITE_BATCH_BYTES = 1 << 20
+
+
+class IngestedImage:
+    """
+    An uploaded image spooled to an anonymous temporary file.
+
+    ``view()`` maps the file read-only and yields a memoryview over it, so the
+    analyzer reads the image without copying it into process memory. Close the
+    image (or use it as a context manager) to release the file.
+    """
+
+    def __init__(self, file: BinaryIO, size: int, sha256: str, content_type: str):
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapped)
+        try:
+            yield buffer
+        finally:
+            buffer.release()
+            mapped.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "IngestedImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _write(file: BinaryIO, digest: "hashlib._Hash", data: bytes) -> None:
+    digest.update(data)
+    file.write(data)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image exceeds the {max_bytes} byte limit",
+    )
+
+
+async def receive_image(request: Request, max_bytes: Optional[int] = None) -> IngestedImage:
+    """
+    Streams a raw image request body to a temporary file.
+
+    The declared Content-Type and Content-Length are checked before any of
+    the body is read, the magic bytes are checked against the declared type
+    as soon as they arrive, and the size limit is enforced while streaming.
+    The SHA-256 is computed on the way through. At most
+    ``_WRITE_BATCH_BYTES`` of the body is held in memory; each batch is
+    hashed and written on the threadpool so disk I/O never blocks the
+    event loop.
+    """
+    max_bytes = max_bytes or settings.IMAGE_UPLOAD_MAX_BYTES
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    signatures = IMAGE_SIGNATURES.get(content_type)
+    if signatures is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of: {', '.join(IMAGE_SIGNATURES)}",
+        )
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise _too_large(max_bytes)
+
+    file = await run_in_threadpool(tempfile.TemporaryFile, dir=settings.IMAGE_UPLOAD_SPOOL_DIR)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            if len(head) < _SNIFF_BYTES:
+                head += chunk[:_SNIFF_BYTES - len(head)]
+                if len(head) >= _SNIFF_BYTES and not head.startswith(signatures):
+                    raise HTTPException(
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail=f"Body is not a valid {content_type} image",
+                    )
+            pending += chunk
+            if len(pending) >= _WRITE_BATCH_BYTES:
+                await run_in_threadpool(_write, file, digest, bytes(pending))
+                pending.clear()
+        if size == 0 or not head.startswith(signatures):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Empty or truncated image",
+            )
+        await run_in_threadpool(_write, file, digest, bytes(pending))
+        await run_in_threadpool(file.flush)
+    except BaseException:
+        file.close()
+        raise
+    return IngestedImage(file, size, digest.hexdigest(), content_type)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.services.analysis_jobs import purge_jobs
+from app.services.auth_service import purge_password_resets, purge_verification_tokens
+from app.services.email_outbox import purge_emails
+
+logger = logging.getLogger(__name__)
+
+# A purger removes up to ``batch_size`` stale rows in one short transaction
+# and returns how many it removed
+Purger = Callable[[AsyncSession, int], Awaitable[int]]
+
+# (report key, purger), run in this order; each lives beside the code that
+# owns its table
+PURGERS: Sequence[Tuple[str, Purger]] = (
+    ("password_resets", purge_password_resets),
+    ("verification_tokens", purge_verification_tokens),
+    ("outbox_emails", purge_emails),
+    ("analysis_jobs", purge_jobs),
+)
+
+
+class Janitor:
+    """
+    Periodically purges stale rows: used/expired password reset tokens,
+    expired email verification tokens, old sent/failed outbox emails and
+    expired analysis jobs (with their spooled images). Work is done in
+    batches of ``batch_size`` rows, each its own transaction, with a short
+    pause in between, so row locks are held briefly and concurrent logins
+    and resets are not blocked. On PostgreSQL rows locked by another
+    worker's janitor are skipped, so every API worker can run it.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 3600,
+        batch_size: int = 1000,
+        pause_seconds: float = 0.05,
+        purgers: Sequence[Tuple[str, Purger]] = PURGERS,
+    ):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.purgers = purgers
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def _drain(self, purge: Purger) -> int:
+        total = 0
+        while not self._stopping:
+            async with AsyncSessionLocal() as db:
+                purged = await purge(db, self.batch_size)
+            total += purged
+            if purged < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_seconds)
+        return total
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Purges everything currently stale and returns how many rows of each kind went."""
+        started = time.perf_counter()
+        report: Dict[str, Any] = {}
+        for name, purge in self.purgers:
+            report[name] = await self._drain(purge)
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        report["finished_at"] = datetime.utcnow().isoformat()
+        self.last_report = report
+        logger.info(
+            "Cleanup purged %s in %.3fs",
+            ", ".join(f"{report[name]} {name.replace('_', ' ')}" for name, _ in self.purgers),
+            report["seconds"],
+        )
+        return report
+
+    async def run(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Cleanup failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stops after the current batch finishes."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+
+janitor = Janitor(
+    interval_seconds=settings.CLEANUP_INTERVAL_SECONDS,
+    batch_size=settings.CLEANUP_BATCH_SIZE,
+)
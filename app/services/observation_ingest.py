@@ -0,0 +1,426 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core import geohash
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.services import pollution_service
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "msgpack")
+# Issues listed per request; the rest are only counted
+MAX_ISSUES = 100
+MAX_POLLUTANT_TYPE_LENGTH = 64
+# Readings may be stamped slightly ahead of the server clock
+MAX_CLOCK_SKEW_SECONDS = 300
+_VALIDATE_CHUNK = 10000
+
+
+class IngestTooLarge(ValueError):
+    pass
+
+
+class BufferFull(Exception):
+    """Raised when the write-behind buffer has no room; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Ingest buffer is full")
+        self.retry_after = retry_after
+
+
+def msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _limited(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise IngestTooLarge(f"A batch is limited to {max_bytes} bytes")
+        yield chunk
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as exc:
+        return exc
+
+
+async def iter_readings(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    max_bytes: Optional[int] = None,
+    max_line_bytes: Optional[int] = None,
+) -> AsyncIterator[Any]:
+    """
+    Yields decoded readings from an NDJSON (one object per line) or msgpack
+    (a sequence of maps, or arrays of maps) byte stream. Lines that are not
+    valid JSON are yielded as exceptions. Raises IngestTooLarge once the
+    stream goes past ``max_bytes`` or an NDJSON line past ``max_line_bytes``
+    (INGEST_MAX_BYTES_PER_REQUEST / INGEST_MAX_LINE_BYTES by default), so
+    memory stays bounded however the body is shaped.
+    """
+    max_bytes = max_bytes or settings.INGEST_MAX_BYTES_PER_REQUEST
+    max_line_bytes = max_line_bytes or settings.INGEST_MAX_LINE_BYTES
+    chunks = _limited(chunks, max_bytes)
+    if fmt == "msgpack":
+        import msgpack
+
+        # Never holds more than the body limit, even for one huge array
+        unpacker = msgpack.Unpacker(raw=False, timestamp=3, max_buffer_size=max_bytes)
+        async for chunk in chunks:
+            unpacker.feed(chunk)
+            for item in unpacker:
+                if isinstance(item, list):
+                    for reading in item:
+                        yield reading
+                else:
+                    yield item
+        return
+
+    too_long = f"A line is limited to {max_line_bytes} bytes"
+    pending = bytearray()
+    async for chunk in chunks:
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            pending += chunk
+        else:
+            # One split per chunk, over the lines it completes
+            pending += chunk[:end]
+            lines = pending.split(b"\n")
+            pending = bytearray(chunk[end + 1:])
+            for line in lines:
+                if len(line) > max_line_bytes:
+                    raise IngestTooLarge(too_long)
+                if line.strip():
+                    yield _parse_line(line)
+        if len(pending) > max_line_bytes:
+            raise IngestTooLarge(too_long)
+    if pending.strip():
+        yield _parse_line(pending)
+
+
+# JSON numbers, and null (NaN); numpy would also convert numeric strings and
+# booleans, which the /pollution-data schema rejects
+_NUMBER_TYPES = {int, float, type(None)}
+
+
+def _floats(values: List[Any]) -> "np.ndarray":
+    import numpy as np
+
+    if set(map(type, values)) <= _NUMBER_TYPES:
+        return np.array(values, dtype=np.float64)
+    return np.array([
+        value if isinstance(value, (int, float)) and not isinstance(value, bool) else math.nan
+        for value in values
+    ], dtype=np.float64)
+
+
+def _fromisoformat(value: str) -> datetime:
+    # datetime.fromisoformat only takes the "Z" (UTC) suffix from Python 3.11
+    if value[-1:] in ("Z", "z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def _epoch(value: Any) -> Tuple[float, Optional[datetime]]:
+    if isinstance(value, str):
+        try:
+            value = _fromisoformat(value)
+        except ValueError:
+            return math.nan, None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp(), value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), None
+    return math.nan, None
+
+
+def _timestamps(values: List[Any]) -> Tuple["np.ndarray", List[Optional[datetime]]]:
+    """
+    Returns epoch seconds for each value (NaN if unparseable) and, for values
+    that were already datetimes or ISO 8601 strings, the parsed datetime, so
+    their precision is kept exactly.
+    """
+    import numpy as np
+
+    if set(map(type, values)) <= _NUMBER_TYPES:
+        return np.array(values, dtype=np.float64), [None] * len(values)
+    # All ISO 8601 strings: parse in one C-level pass, or, when that fails
+    # (e.g. "Z" suffixes before Python 3.11), one pass through _fromisoformat
+    for parse in (datetime.fromisoformat, _fromisoformat):
+        try:
+            parsed = [
+                value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+                for value in map(parse, values)
+            ]
+            return np.fromiter(map(datetime.timestamp, parsed), np.float64, len(parsed)), parsed
+        except (TypeError, ValueError):
+            pass
+    parsed = [_epoch(value) for value in values]
+    return np.array([seconds for seconds, _ in parsed], dtype=np.float64), [dt for _, dt in parsed]
+
+
+def _all(values: List[Any], kind: type) -> bool:
+    return set(map(type, values)) <= {kind}
+
+
+def validate_readings(
+    records: List[Any], first_row: int = 1
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validates a batch of decoded readings column by column and returns
+    (observation rows ready for pollution_service.add_observations, issues).
+
+    A reading needs latitude, longitude, severity (>= 0), pollutant_type and
+    observed_at (ISO 8601 or epoch seconds, not in the future); source_image
+    is optional. Issues give the 1-based row number and the first problem.
+    """
+    import numpy as np
+
+    maps = [record if isinstance(record, dict) else {} for record in records]
+    latitude = _floats([record.get("latitude") for record in maps])
+    longitude = _floats([record.get("longitude") for record in maps])
+    severity = _floats([record.get("severity") for record in maps])
+    seconds, parsed = _timestamps([record.get("observed_at") for record in maps])
+    pollutant_types = [record.get("pollutant_type") for record in maps]
+    source_images = [record.get("source_image") for record in maps]
+
+    n = len(records)
+    if _all(pollutant_types, str):
+        lengths = np.fromiter(map(len, pollutant_types), np.int64, n)
+        type_ok = (lengths > 0) & (lengths <= MAX_POLLUTANT_TYPE_LENGTH)
+    else:
+        type_ok = np.fromiter(
+            (isinstance(value, str) and 0 < len(value) <= MAX_POLLUTANT_TYPE_LENGTH for value in pollutant_types),
+            bool, n,
+        )
+    # NaN compares false, so missing or non-numeric values fail every range check
+    with np.errstate(invalid="ignore"):
+        checks = (
+            (np.ones(n, bool) if _all(records, dict)
+             else np.fromiter((isinstance(record, dict) for record in records), bool, n),
+             "Reading must be an object"),
+            (np.abs(latitude) <= 90, "latitude must be a number between -90 and 90"),
+            (np.abs(longitude) <= 180, "longitude must be a number between -180 and 180"),
+            ((severity >= 0) & np.isfinite(severity), "severity must be a non-negative number"),
+            ((seconds >= 0) & (seconds <= time.time() + MAX_CLOCK_SKEW_SECONDS),
+             "observed_at must be an ISO 8601 timestamp or epoch seconds, not in the future"),
+            (type_ok, "pollutant_type must be a non-empty string"),
+            (np.ones(n, bool) if source_images.count(None) == n
+             else np.fromiter((value is None or isinstance(value, str) for value in source_images), bool, n),
+             "source_image must be a string"),
+        )
+    valid = np.logical_and.reduce([passed for passed, _ in checks])
+
+    issues = []
+    for index in np.flatnonzero(~valid)[:MAX_ISSUES].tolist():
+        detail = next(message for passed, message in checks if not passed[index])
+        if isinstance(records[index], Exception):
+            detail = f"Unparseable reading: {records[index]}"
+        issues.append({"row": first_row + index, "detail": detail})
+
+    indices = np.flatnonzero(valid)
+    latitudes, longitudes = latitude[indices], longitude[indices]
+    cells = geohash.encode_many(latitudes, longitudes)
+    rows = [
+        {
+            "latitude": lat,
+            "longitude": lon,
+            "geohash": cell,
+            "observed_at": parsed[index] or datetime.fromtimestamp(epoch, tz=timezone.utc),
+            "pollutant_type": pollutant_types[index],
+            "severity": sev,
+            "source_image": source_images[index],
+        }
+        for index, lat, lon, cell, sev, epoch in zip(
+            indices.tolist(), latitudes.tolist(), longitudes.tolist(), cells,
+            severity[indices].tolist(), seconds[indices].tolist(),
+        )
+    ]
+    return rows, issues
+
+
+class ObservationBuffer:
+    """
+    Per-process write-behind buffer for ingested observations.
+
+    Rows are written with pollution_service.add_observations (one multi-row
+    INSERT plus the rollup upsert per transaction) ``flush_rows`` at a time
+    as soon as that many are waiting, and whatever is left every
+    ``flush_seconds``. ``offer`` refuses batches that would take the buffer
+    past ``max_rows``, which is what turns a slow database into 429s instead
+    of unbounded memory. A failed write is retried with backoff (the buffer
+    fills meanwhile) and dropped after ``max_attempts``. Buffered rows are
+    flushed on stop, but lost if the process dies.
+    """
+
+    def __init__(self, max_rows: int = 200000, flush_rows: int = 5000, flush_seconds: float = 0.5,
+                 max_attempts: int = 5):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self._rows: Deque[Dict[str, Any]] = deque()
+        self._in_flight = 0
+        self._last_flush = time.monotonic()
+        # Rows written per second, smoothed; used for Retry-After
+        self._write_rate = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._stats = {"accepted": 0, "rejected": 0, "flushed": 0, "dropped": 0, "flushes": 0}
+
+    def __len__(self) -> int:
+        return len(self._rows) + self._in_flight
+
+    def has_room(self, rows: int = 1) -> bool:
+        return len(self) + rows <= self.max_rows
+
+    def retry_after(self) -> int:
+        """Seconds until the buffer has probably drained enough to take more."""
+        if self._write_rate <= 0:
+            return max(1, math.ceil(self.flush_seconds))
+        return min(60, max(1, math.ceil(len(self) / self._write_rate)))
+
+    def offer(self, rows: List[Dict[str, Any]]) -> bool:
+        """Queues all of ``rows``, or none of them if they don't fit."""
+        if not self.has_room(len(rows)):
+            self._stats["rejected"] += len(rows)
+            return False
+        self._rows.extend(rows)
+        self._stats["accepted"] += len(rows)
+        if len(self._rows) >= self.flush_rows:
+            self.wake()
+        return True
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await pollution_service.add_observations(db, batch)
+            except Exception:
+                logger.exception("Writing %d observations failed (attempt %d)", len(batch), attempt)
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(min(0.5 * 2 ** attempt, 10))
+                continue
+            rate = len(batch) / max(time.perf_counter() - started, 1e-6)
+            self._write_rate = rate if not self._write_rate else 0.8 * self._write_rate + 0.2 * rate
+            self._stats["flushed"] += len(batch)
+            self._stats["flushes"] += 1
+            return
+        self._stats["dropped"] += len(batch)
+        logger.error("Dropped %d observations after %d failed writes", len(batch), self.max_attempts)
+
+    async def flush(self, partial: bool = True) -> int:
+        """
+        Writes full batches of ``flush_rows``, and the remainder too when
+        ``partial``. Returns how many rows were written or dropped.
+        """
+        written = 0
+        while len(self._rows) >= self.flush_rows or (partial and self._rows):
+            batch = [self._rows.popleft() for _ in range(min(self.flush_rows, len(self._rows)))]
+            self._in_flight = len(batch)
+            try:
+                await self._write(batch)
+            finally:
+                self._in_flight = 0
+            written += len(batch)
+        if written:
+            self._last_flush = time.monotonic()
+        return written
+
+    async def run(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush(partial=time.monotonic() - self._last_flush >= self.flush_seconds)
+            except Exception:
+                logger.exception("Flushing observations failed")
+        await self.flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stops after writing everything still buffered."""
+        self._stopping = True
+        self.wake()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "buffered": len(self), "write_rate": round(self._write_rate)}
+
+
+observation_buffer = ObservationBuffer(
+    max_rows=settings.INGEST_BUFFER_MAX_ROWS,
+    flush_rows=settings.INGEST_FLUSH_ROWS,
+    flush_seconds=settings.INGEST_FLUSH_SECONDS,
+)
+
+
+async def ingest(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    buffer: ObservationBuffer = observation_buffer,
+    max_rows: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Decodes and validates a stream of readings and queues the valid ones in
+    ``buffer`` as one all-or-nothing batch. Raises IngestTooLarge past
+    ``max_rows`` readings and BufferFull if the buffer can't take the batch;
+    in both cases nothing is queued.
+    """
+    records: List[Any] = []
+    async for reading in iter_readings(chunks, fmt):
+        records.append(reading)
+        if max_rows is not None and len(records) > max_rows:
+            raise IngestTooLarge(f"A batch is limited to {max_rows} readings")
+
+    rows: List[Dict[str, Any]] = []
+    issues: List[Dict[str, Any]] = []
+    for start in range(0, len(records), _VALIDATE_CHUNK):
+        chunk_rows, chunk_issues = validate_readings(records[start:start + _VALIDATE_CHUNK], first_row=start + 1)
+        rows.extend(chunk_rows)
+        issues.extend(chunk_issues)
+        # Let other requests in between chunks of a large batch
+        await asyncio.sleep(0)
+
+    if rows and not buffer.offer(rows):
+        raise BufferFull(buffer.retry_after())
+    return {"accepted": len(rows), "rejected": len(records) - len(rows), "issues": issues[:MAX_ISSUES]}
@@ -0,0 +1,697 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from app.core import geohash
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.pollution import PollutionObservation
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = {"hour": 3600, "day": 86400}
+PERCENTILES = (50, 90, 99)
+# Regions are geohash prefixes of up to this many characters (~1.2 km x 0.6
+# km cells), held as 30-bit integers
+MAX_PRECISION = 6
+# Rows read per query while loading new observations
+LOAD_ROWS = 100000
+# Below this a region's bucket means are treated as constant (no score)
+_MIN_VARIANCE = 1e-9
+
+
+def _alphabet() -> "np.ndarray":
+    import numpy as np
+
+    return np.frombuffer(geohash._BASE32.encode(), dtype=np.uint8)
+
+
+def encode_regions(cells: Sequence[str]) -> "np.ndarray":
+    """Integer codes (5 bits per character) of the first MAX_PRECISION characters of geohashes."""
+    import numpy as np
+
+    lookup = np.zeros(256, dtype=np.int32)
+    lookup[_alphabet()] = np.arange(32, dtype=np.int32)
+    chars = np.array(cells, dtype=f"S{MAX_PRECISION}").view(np.uint8).reshape(-1, MAX_PRECISION)
+    codes = np.zeros(len(chars), dtype=np.int32)
+    for position in range(MAX_PRECISION):
+        codes = (codes << 5) | lookup[chars[:, position]]
+    return codes
+
+
+def coarsen(codes: "np.ndarray", precision: int) -> "np.ndarray":
+    """Region codes at MAX_PRECISION -> codes of their ``precision``-character prefixes."""
+    return codes >> (5 * (MAX_PRECISION - precision))
+
+
+def region_names(codes: "np.ndarray", precision: int) -> List[str]:
+    """Geohash strings of ``precision``-character region codes."""
+    import numpy as np
+
+    alphabet = _alphabet()
+    chars = np.empty((len(codes), precision), dtype=np.uint8)
+    for position in range(precision):
+        chars[:, position] = alphabet[(codes >> (5 * (precision - 1 - position))) & 31]
+    return chars.view(f"S{precision}").ravel().astype(str).tolist()
+
+
+def prefix_code(prefix: str) -> int:
+    """Region code of a geohash prefix. Raises ValueError if it is not one."""
+    if not 1 <= len(prefix) <= MAX_PRECISION or any(char not in geohash._DECODE for char in prefix):
+        raise ValueError(f"region must be a geohash prefix of 1 to {MAX_PRECISION} characters")
+    code = 0
+    for char in prefix:
+        code = (code << 5) | geohash._DECODE[char]
+    return code
+
+
+def _epoch(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def group_severity(
+    regions: "np.ndarray",
+    buckets: "np.ndarray",
+    severity: "np.ndarray",
+    window: int,
+    min_periods: int,
+    percentiles: Sequence[int] = PERCENTILES,
+) -> Dict[str, "np.ndarray"]:
+    """
+    Severity statistics per (region, bucket), ordered by region then bucket.
+
+    Readings are sorted by (region, bucket), then by severity within each
+    group (as float32): group sums and maxima come from ``reduceat`` and
+    percentiles are read off the sorted values (linear interpolation, as
+    np.percentile). ``rolling_mean`` is the
+    mean of the region's readings over the trailing ``window`` buckets, this
+    one included; ``zscore`` compares the bucket's mean with the mean and
+    standard deviation of the region's bucket means over the ``window``
+    buckets before it, and is NaN with fewer than ``min_periods`` of them or
+    no spread. Buckets without readings are left out, not counted as zero.
+    """
+    import numpy as np
+
+    names = ("region", "bucket", "count", "mean", "max", "rolling_mean", "zscore") + tuple(
+        f"p{q}" for q in percentiles
+    )
+    if not len(regions):
+        integers = {"region": np.int32, "bucket": np.int64, "count": np.int64}
+        return {name: np.empty(0, dtype=integers.get(name, np.float64)) for name in names}
+    low = int(buckets.min())
+    # One int64 key per (region, bucket), with room for `window` buckets
+    # below each region's first one so trailing windows never reach the
+    # previous region
+    span = int(buckets.max()) - low + window + 1
+    key = regions.astype(np.int64) * span + (buckets - low + window)
+    order = np.argsort(key)
+    key = key[order]
+    first_of_group = np.concatenate(([True], key[1:] != key[:-1]))
+    if percentiles:
+        # One more sort puts each group's readings in severity order: group
+        # number in the high 32 bits, the float32's bits flipped so they
+        # order like the floats in the low 32 (much faster than lexsort)
+        bits = severity[order].astype(np.float32).view(np.uint32)
+        bits = np.where(bits >> 31, ~bits, bits | 0x80000000)
+        group = (np.cumsum(first_of_group) - 1).astype(np.uint64)
+        order = order[np.argsort((group << 32) | bits)]
+    values = severity[order].astype(np.float32).astype(np.float64)
+
+    starts = np.flatnonzero(first_of_group)
+    ends = np.append(starts[1:], len(key))
+    counts = ends - starts
+    sums = np.add.reduceat(values, starts)
+    means = sums / counts
+    group_key = key[starts]
+    stats = {
+        "region": (group_key // span).astype(np.int32),
+        "bucket": group_key % span - window + low,
+        "count": counts,
+        "mean": means,
+        "max": np.maximum.reduceat(values, starts),
+    }
+    for q in percentiles:
+        position = starts + (counts - 1) * (q / 100)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, ends - 1)
+        stats[f"p{q}"] = values[below] + (values[above] - values[below]) * (position - below)
+
+    groups = np.arange(len(starts))
+    total = np.concatenate(([0.0], np.cumsum(sums)))
+    readings = np.concatenate(([0], np.cumsum(counts)))
+    first = np.searchsorted(group_key, group_key - (window - 1))
+    stats["rolling_mean"] = (total[groups + 1] - total[first]) / (readings[groups + 1] - readings[first])
+
+    previous = np.searchsorted(group_key, group_key - window)
+    periods = groups - previous
+    level = np.concatenate(([0.0], np.cumsum(means)))
+    squares = np.concatenate(([0.0], np.cumsum(means * means)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = (level[groups] - level[previous]) / periods
+        variance = np.maximum((squares[groups] - squares[previous]) / periods - mu * mu, 0.0)
+        zscore = (means - mu) / np.sqrt(variance)
+    stats["zscore"] = np.where((periods >= min_periods) & (variance > _MIN_VARIANCE), zscore, np.nan)
+    return stats
+
+
+class EwmaState:
+    """
+    Exponentially weighted mean and variance of each region's bucket means,
+    folded in one closed bucket at a time (vectorized across regions), so
+    keeping it current costs one step per new bucket. The score of a bucket
+    is its mean's distance from the state before it, in EW standard
+    deviations; scores of folded buckets are kept for ``score_of``.
+    Buckets a region has no readings in are skipped, not decayed.
+    """
+
+    def __init__(self, alpha: float, min_periods: int):
+        import numpy as np
+
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.regions = np.empty(0, dtype=np.int32)  # sorted
+        self.mean = np.empty(0)
+        self.variance = np.empty(0)
+        self.periods = np.empty(0, dtype=np.int64)
+        self.through: Optional[int] = None  # last folded bucket
+        self._scores: Dict[int, Tuple["np.ndarray", "np.ndarray"]] = {}
+
+    def _slots(self, regions: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        new = np.setdiff1d(regions, self.regions, assume_unique=True)
+        if len(new):
+            merged = np.union1d(self.regions, new)
+            kept = np.searchsorted(merged, self.regions)
+            for name, dtype in (("mean", np.float64), ("variance", np.float64), ("periods", np.int64)):
+                grown = np.zeros(len(merged), dtype=dtype)
+                grown[kept] = getattr(self, name)
+                setattr(self, name, grown)
+            self.regions = merged
+        return np.searchsorted(self.regions, regions)
+
+    def score(self, regions: "np.ndarray", means: "np.ndarray") -> "np.ndarray":
+        """Scores against the current state (NaN for regions still warming up)."""
+        import numpy as np
+
+        if not len(self.regions):
+            return np.full(len(regions), np.nan)
+        slots = np.minimum(np.searchsorted(self.regions, regions), len(self.regions) - 1)
+        variance = self.variance[slots]
+        known = (self.regions[slots] == regions) & (self.periods[slots] >= self.min_periods)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = (means - self.mean[slots]) / np.sqrt(variance)
+        return np.where(known & (variance > _MIN_VARIANCE), scores, np.nan)
+
+    def fold(self, regions: "np.ndarray", buckets: "np.ndarray", means: "np.ndarray") -> int:
+        """Folds in bucket means (each bucket once, after ``through``); returns the buckets folded."""
+        import numpy as np
+
+        order = np.argsort(buckets, kind="stable")
+        steps = np.split(order, np.flatnonzero(np.diff(buckets[order])) + 1) if len(order) else []
+        for step in steps:
+            bucket = int(buckets[step[0]])
+            step_regions, values = regions[step], means[step]
+            self._scores[bucket] = (step_regions, self.score(step_regions, values))
+            slots = self._slots(step_regions)
+            mean, periods = self.mean[slots], self.periods[slots]
+            delta = values - mean
+            fresh = periods == 0
+            self.mean[slots] = np.where(fresh, values, mean + self.alpha * delta)
+            self.variance[slots] = np.where(
+                fresh, 0.0, (1 - self.alpha) * (self.variance[slots] + self.alpha * delta * delta)
+            )
+            self.periods[slots] = periods + 1
+            self.through = bucket
+        return len(steps)
+
+    def score_of(self, bucket: int, regions: "np.ndarray") -> "np.ndarray":
+        """Scores folded ``bucket`` got, for ``regions`` (NaN where it had none)."""
+        import numpy as np
+
+        scored = self._scores.get(bucket)
+        if scored is None or not len(scored[0]):
+            return np.full(len(regions), np.nan)
+        scored_regions, scores = scored
+        slots = np.minimum(np.searchsorted(scored_regions, regions), len(scored_regions) - 1)
+        return np.where(scored_regions[slots] == regions, scores[slots], np.nan)
+
+    def trim(self, before: int) -> None:
+        for bucket in [bucket for bucket in self._scores if bucket < before]:
+            del self._scores[bucket]
+
+
+class _Columns(NamedTuple):
+    size: int
+    region: "np.ndarray"
+    seconds: "np.ndarray"
+    severity: "np.ndarray"
+    pollutant: "np.ndarray"
+
+
+class ObservationWindow:
+    """
+    Recent observations as NumPy columns: region code, epoch seconds,
+    severity and pollutant type code (18 bytes per reading).
+
+    The columns and the row count are published together as one tuple,
+    replaced in a single assignment, and readers (``select``, in worker
+    threads) take it once. Appends only write past the published size, or
+    into grown copies, and trims build new arrays, so a snapshot taken
+    earlier never changes under its reader.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self.last_id = 0
+        self.pollutants: Dict[str, int] = {}
+        self._columns = _Columns(
+            0,
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int16),
+        )
+
+    @property
+    def size(self) -> int:
+        return self._columns.size
+
+    @property
+    def region(self) -> "np.ndarray":
+        return self._columns.region
+
+    @property
+    def seconds(self) -> "np.ndarray":
+        return self._columns.seconds
+
+    @property
+    def severity(self) -> "np.ndarray":
+        return self._columns.severity
+
+    @property
+    def pollutant(self) -> "np.ndarray":
+        return self._columns.pollutant
+
+    def _reserve(self, columns: _Columns, count: int) -> _Columns:
+        import numpy as np
+
+        size = columns.size
+        if size + count <= len(columns.seconds):
+            return columns
+        capacity = max(size + count, 2 * len(columns.seconds), 1024)
+        grown = []
+        for column in columns[1:]:
+            copy = np.empty(capacity, dtype=column.dtype)
+            copy[:size] = column[:size]
+            grown.append(copy)
+        return _Columns(size, *grown)
+
+    def append(
+        self,
+        regions: "np.ndarray",
+        seconds: "np.ndarray",
+        severity: "np.ndarray",
+        pollutants: Sequence[str],
+        last_id: int = 0,
+    ) -> None:
+        """Appends readings (``pollutants`` are type names); ``last_id`` is the highest id among them."""
+        import numpy as np
+
+        count = len(seconds)
+        columns = self._reserve(self._columns, count)
+        start, end = columns.size, columns.size + count
+        columns.region[start:end] = regions
+        columns.seconds[start:end] = seconds
+        columns.severity[start:end] = severity
+        codes = self.pollutants
+        columns.pollutant[start:end] = np.fromiter(
+            (codes.setdefault(kind, len(codes)) for kind in pollutants), dtype=np.int16, count=count
+        )
+        self._columns = columns._replace(size=end)
+        self.last_id = max(self.last_id, last_id)
+
+    def append_rows(self, rows: Sequence[Any]) -> None:
+        """Appends (id, geohash, observed_at, pollutant_type, severity) rows."""
+        import numpy as np
+
+        ids, cells, observed, kinds, severity = zip(*rows)
+        self.append(
+            encode_regions(cells),
+            np.fromiter(map(_epoch, observed), dtype=np.int64, count=len(observed)),
+            np.array(severity, dtype=np.float32),
+            kinds,
+            max(ids),
+        )
+
+    def trim(self, before: int) -> int:
+        """Drops readings observed before epoch second ``before``; returns how many."""
+        columns = self._columns
+        keep = columns.seconds[:columns.size] >= before
+        kept = int(keep.sum())
+        if kept < columns.size:
+            self._columns = _Columns(kept, *(column[:columns.size][keep] for column in columns[1:]))
+        return columns.size - kept
+
+    def select(
+        self,
+        start: int,
+        end: int,
+        precision: int,
+        pollutant_type: Optional[str] = None,
+        region: Optional[str] = None,
+    ) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        (region codes at ``precision``, epoch seconds, severity) of the
+        readings observed in [start, end) epoch seconds.
+        """
+        columns = self._columns
+        size = columns.size
+        seconds = columns.seconds[:size]
+        mask = (seconds >= start) & (seconds < end)
+        if pollutant_type is not None:
+            code = self.pollutants.get(pollutant_type)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= columns.pollutant[:size] == code
+        codes = columns.region[:size]
+        if region is not None:
+            mask &= coarsen(codes, len(region)) == prefix_code(region)
+        return coarsen(codes[mask], precision), seconds[mask], columns.severity[:size][mask]
+
+
+class SeverityAnalytics:
+    """
+    Hourly and daily severity statistics and anomaly scores per region,
+    computed with NumPy over the last ``retention_days`` of observations
+    held in memory.
+
+    The first request loads the window and starts a background task that
+    reads rows with ids above the highest one loaded every
+    ``refresh_seconds``, so each refresh only converts the delta, and drops
+    readings that fell out of retention. Every ``rebuild_seconds`` the
+    window is reloaded from scratch, which also picks up rows committed out
+    of id order by concurrent writers. EWMA states (one per bucket size,
+    precision and pollutant type asked for, at most ``max_states``) fold in
+    each closed bucket once; a rebuild resets them. Requests compute in a
+    worker thread, so the event loop is not held by the array work.
+    """
+
+    def __init__(
+        self,
+        retention_days: int = 30,
+        refresh_seconds: float = 10.0,
+        rebuild_seconds: float = 3600.0,
+        alpha: float = 0.1,
+        min_periods: int = 6,
+        max_states: int = 16,
+    ):
+        self.retention = timedelta(days=retention_days)
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.max_states = max_states
+        self._window: Optional[ObservationWindow] = None
+        self._states: "OrderedDict[Tuple[int, int, Optional[str]], EwmaState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = asyncio.Lock()
+        self._rebuilt_at: Optional[float] = None
+        self._as_of: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._stats = {"refreshes": 0, "rebuilds": 0, "rows_read": 0, "folded_buckets": 0}
+
+    async def refresh(self) -> int:
+        """
+        Loads observations added since the last refresh, or reloads the
+        window when a rebuild is due. Returns the number of rows read.
+        """
+        async with self._refreshing:
+            started = time.monotonic()
+            rebuild = (
+                self._window is None
+                or self._rebuilt_at is None
+                or started - self._rebuilt_at >= self.rebuild_seconds
+            )
+            window = ObservationWindow() if rebuild else self._window
+            as_of = datetime.now(timezone.utc)
+            cutoff = as_of - self.retention
+            read = 0
+            async with AsyncSessionLocal() as db:
+                db.info["replica_read"] = True
+                while True:
+                    rows = (await db.execute(
+                        select(
+                            PollutionObservation.id,
+                            PollutionObservation.geohash,
+                            PollutionObservation.observed_at,
+                            PollutionObservation.pollutant_type,
+                            PollutionObservation.severity,
+                        )
+                        .where(PollutionObservation.id > window.last_id, PollutionObservation.observed_at >= cutoff)
+                        .order_by(PollutionObservation.id)
+                        .limit(LOAD_ROWS)
+                    )).all()
+                    if rows:
+                        window.append_rows(rows)
+                    read += len(rows)
+                    if len(rows) < LOAD_ROWS:
+                        break
+            window.trim(_epoch(cutoff))
+            if rebuild:
+                # Threads still folding into the old states finish on the old dict
+                self._window = window
+                self._states = OrderedDict()
+                self._rebuilt_at = started
+                self._stats["rebuilds"] += 1
+            self._as_of = as_of
+            self._stats["refreshes"] += 1
+            self._stats["rows_read"] += read
+            return read
+
+    async def _current(self) -> ObservationWindow:
+        if self._window is None:
+            await self.refresh()
+            # Started on first use, so workers nobody asks never hold the window
+            self.start()
+        return self._window
+
+    def _bucket_range(self, bucket: str, start: Optional[datetime], end: Optional[datetime], default: int):
+        size = BUCKETS[bucket]
+        last = (_epoch(end) - 1 if end is not None else _epoch(self._as_of)) // size
+        first = _epoch(start) // size if start is not None else last - default + 1
+        return size, first, last
+
+    async def region_stats(
+        self,
+        bucket: str = "hour",
+        precision: int = 4,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        pollutant_type: Optional[str] = None,
+        region: Optional[str] = None,
+        window: int = 24,
+        limit: int = 1000,
+    ) -> Dict[str, Any]:
+        """
+        Statistics per region and bucket from ``start`` (default: 24 buckets
+        back) to ``end`` (default: now), ordered by region then time, at most
+        ``limit`` of them. Rolling means and z-scores also see the ``window``
+        buckets before ``start``.
+        """
+        if region is not None:
+            prefix_code(region)
+        observations = await self._current()
+        size, first, last = self._bucket_range(bucket, start, end, 24)
+
+        def compute():
+            regions, seconds, severity = observations.select(
+                (first - window) * size, (last + 1) * size, precision, pollutant_type, region
+            )
+            stats = group_severity(regions, seconds // size, severity, window, self.min_periods)
+            shown = stats["bucket"] >= first
+            return {name: column[shown][:limit] for name, column in stats.items()}, int(shown.sum())
+
+        stats, total = await asyncio.to_thread(compute)
+        items = [
+            {
+                "region": name,
+                "bucket_start": datetime.fromtimestamp(value * size, tz=timezone.utc),
+                "count": int(stats["count"][i]),
+                **{column: _number(stats[column][i]) for column in _STAT_COLUMNS},
+            }
+            for i, (name, value) in enumerate(zip(region_names(stats["region"], precision), stats["bucket"].tolist()))
+        ]
+        return {
+            "bucket": bucket,
+            "precision": precision,
+            "window": window,
+            "as_of": self._as_of,
+            "items": items,
+            "truncated": total > len(items),
+        }
+
+    def _state(self, bucket: str, precision: int, pollutant_type: Optional[str]) -> EwmaState:
+        key = (BUCKETS[bucket], precision, pollutant_type)
+        states = self._states
+        state = states.get(key)
+        if state is None:
+            state = states[key] = EwmaState(self.alpha, self.min_periods)
+            while len(states) > self.max_states:
+                states.popitem(last=False)
+        states.move_to_end(key)
+        return state
+
+    def _advance(self, state: EwmaState, observations: ObservationWindow, bucket: str, precision: int,
+                 pollutant_type: Optional[str], through: int) -> None:
+        """Folds the closed buckets up to ``through`` that ``state`` has not seen."""
+        size = BUCKETS[bucket]
+        if state.through is not None and state.through >= through:
+            return
+        start = 0 if state.through is None else (state.through + 1) * size
+        regions, seconds, severity = observations.select(start, (through + 1) * size, precision, pollutant_type)
+        groups = group_severity(regions, seconds // size, severity, 1, self.min_periods, percentiles=())
+        self._stats["folded_buckets"] += state.fold(groups["region"], groups["bucket"], groups["mean"])
+        state.through = through
+        state.trim(through - int(self.retention / timedelta(seconds=size)))
+
+    async def anomalies(
+        self,
+        bucket: str = "hour",
+        precision: int = 4,
+        pollutant_type: Optional[str] = None,
+        region: Optional[str] = None,
+        lookback: int = 24,
+        window: int = 24,
+        threshold: float = 3.0,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Region buckets among the last ``lookback`` (the current, still open
+        one included) whose mean severity is at least ``threshold`` above
+        normal by z-score (against the ``window`` buckets before it) or by
+        EWMA score, highest first.
+        """
+        if region is not None:
+            prefix_code(region)
+        observations = await self._current()
+        size, first, last = self._bucket_range(bucket, None, None, lookback)
+
+        def compute():
+            import numpy as np
+
+            regions, seconds, severity = observations.select(
+                (first - window) * size, (last + 1) * size, precision, pollutant_type, region
+            )
+            stats = group_severity(regions, seconds // size, severity, window, self.min_periods, percentiles=())
+            shown = stats["bucket"] >= first
+            stats = {name: column[shown] for name, column in stats.items()}
+            ewma = np.full(len(stats["bucket"]), np.nan)
+            with self._lock:
+                if observations is not self._window:
+                    # Rebuilt meanwhile: this window is no longer what states are folded from
+                    return stats, ewma
+                state = self._state(bucket, precision, pollutant_type)
+                self._advance(state, observations, bucket, precision, pollutant_type, last - 1)
+                for value in np.unique(stats["bucket"]).tolist():
+                    rows = stats["bucket"] == value
+                    if value <= state.through:
+                        ewma[rows] = state.score_of(value, stats["region"][rows])
+                    else:
+                        ewma[rows] = state.score(stats["region"][rows], stats["mean"][rows])
+            score = np.fmax(stats["zscore"], ewma)
+            flagged = np.flatnonzero(score >= threshold)
+            flagged = flagged[np.argsort(-score[flagged], kind="stable")][:limit]
+            return {name: column[flagged] for name, column in stats.items()}, ewma[flagged]
+
+        stats, ewma = await asyncio.to_thread(compute)
+        items = [
+            {
+                "region": name,
+                "bucket_start": datetime.fromtimestamp(value * size, tz=timezone.utc),
+                "count": int(stats["count"][i]),
+                "mean": float(stats["mean"][i]),
+                "zscore": _number(stats["zscore"][i]),
+                "ewma_score": _number(ewma[i]),
+            }
+            for i, (name, value) in enumerate(zip(region_names(stats["region"], precision), stats["bucket"].tolist()))
+        ]
+        return {
+            "bucket": bucket,
+            "precision": precision,
+            "threshold": threshold,
+            "as_of": self._as_of,
+            "items": items,
+        }
+
+    async def run(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                await self.refresh()
+            except Exception:
+                # Keep serving the last window until the database is back
+                logger.exception("Refreshing severity analytics failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        window = self._window
+        return {
+            **self._stats,
+            "readings": window.size if window is not None else 0,
+            "states": len(self._states),
+            "as_of": self._as_of.isoformat() if self._as_of else None,
+        }
+
+
+_STAT_COLUMNS = ("mean", "max") + tuple(f"p{q}" for q in PERCENTILES) + ("rolling_mean", "zscore")
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if value != value else value
+
+
+severity_analytics = SeverityAnalytics(
+    retention_days=settings.ANALYTICS_RETENTION_DAYS,
+    refresh_seconds=settings.ANALYTICS_REFRESH_SECONDS,
+    rebuild_seconds=settings.ANALYTICS_REBUILD_SECONDS,
+    alpha=settings.ANALYTICS_EWMA_ALPHA,
+    min_periods=settings.ANALYTICS_MIN_PERIODS,
+)
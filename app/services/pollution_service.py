@@ -0,0 +1,174 @@
+import base64
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import Select, insert, or_, select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import geohash
+from app.database import AsyncSessionLocal, replica_read
+from app.models.pollution import PollutionObservation
+from app.services import tile_service
+
+# (min_lon, min_lat, max_lon, max_lat)
+BBox = Tuple[float, float, float, float]
+
+COLUMNS = (
+    PollutionObservation.id,
+    PollutionObservation.latitude,
+    PollutionObservation.longitude,
+    PollutionObservation.geohash,
+    PollutionObservation.observed_at,
+    PollutionObservation.pollutant_type,
+    PollutionObservation.severity,
+    PollutionObservation.source_image,
+)
+
+
+class ObservationFilter(NamedTuple):
+    bbox: Optional[BBox] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    pollutant_type: Optional[str] = None
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def encode_cursor(observed_at: datetime, observation_id: int) -> str:
+    """Encodes the keyset position after the given row as an opaque string."""
+    payload = orjson.dumps([_utc(observed_at).isoformat(), observation_id])
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodes a cursor from encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        observed_at, observation_id = orjson.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(observed_at), int(observation_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _apply_filter(stmt: Select, filters: ObservationFilter) -> Select:
+    if filters.bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = filters.bbox
+        stmt = stmt.where(
+            PollutionObservation.latitude.between(min_lat, max_lat),
+            PollutionObservation.longitude.between(min_lon, max_lon),
+        )
+        # Prefix conditions let the geohash index narrow the scan; the exact
+        # lat/lon bounds above still apply at the cell edges.
+        prefixes = geohash.cover(min_lat, min_lon, max_lat, max_lon)
+        if prefixes:
+            stmt = stmt.where(or_(*(
+                PollutionObservation.geohash.startswith(prefix, autoescape=True)
+                for prefix in prefixes
+            )))
+    if filters.start is not None:
+        stmt = stmt.where(PollutionObservation.observed_at >= _utc(filters.start))
+    if filters.end is not None:
+        stmt = stmt.where(PollutionObservation.observed_at < _utc(filters.end))
+    if filters.pollutant_type is not None:
+        stmt = stmt.where(PollutionObservation.pollutant_type == filters.pollutant_type)
+    return stmt
+
+
+def _after(stmt: Select, cursor: Optional[str]) -> Select:
+    if cursor is None:
+        return stmt
+    observed_at, observation_id = decode_cursor(cursor)
+    return stmt.where(
+        tuple_(PollutionObservation.observed_at, PollutionObservation.id)
+        > tuple_(_utc(observed_at), observation_id)
+    )
+
+
+def observations_query(
+    filters: ObservationFilter, cursor: Optional[str] = None, columns: Sequence[Any] = COLUMNS
+) -> Select:
+    """
+    SELECT of ``columns`` for observations matching ``filters``, in keyset
+    order after ``cursor``.
+    """
+    stmt = _apply_filter(select(*columns), filters)
+    return _after(stmt, cursor).order_by(
+        PollutionObservation.observed_at, PollutionObservation.id
+    )
+
+
+async def add_observations(db: AsyncSession, observations: List[Dict[str, Any]]) -> int:
+    """
+    Inserts a batch of observations and folds them into the heatmap rollups
+    in the same transaction. Fills in ``geohash`` when it is missing.
+    Returns the number of observations inserted.
+    """
+    if not observations:
+        return 0
+    for obs in observations:
+        if not obs.get("geohash"):
+            obs["geohash"] = geohash.encode(obs["latitude"], obs["longitude"])
+    await db.execute(insert(PollutionObservation.__table__), observations)
+    await tile_service.upsert_rollups(db, observations)
+    await db.commit()
+    tile_service.tile_cache.bump()
+    return len(observations)
+
+
+@replica_read
+async def list_observations(
+    db: AsyncSession,
+    filters: ObservationFilter,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Row], Optional[str]]:
+    """
+    Returns one page of observations and the cursor for the next page
+    (None on the last page). Pages are keyset-paginated on
+    (observed_at, id), so every page costs the same regardless of depth.
+    """
+    result = await db.execute(observations_query(filters, cursor).limit(limit + 1))
+    rows = result.all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.observed_at, last.id)
+
+
+async def stream_observations_ndjson(
+    filters: ObservationFilter,
+    cursor: Optional[str] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """
+    Yields matching observations as NDJSON, one chunk per ``batch_size``
+    rows. Rows are fetched with a server-side cursor, so memory stays
+    bounded by the batch size however many rows match.
+
+    Uses its own session: a streaming response outlives the request's
+    dependency-managed session.
+    """
+    stmt = observations_query(filters, cursor).execution_options(yield_per=batch_size)
+    async with AsyncSessionLocal() as db:
+        db.info["replica_read"] = True
+        result = await db.stream(stmt)
+        async for rows in result.partitions(batch_size):
+            yield b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def parse_bbox(value: str) -> BBox:
+    """Parses "min_lon,min_lat,max_lon,max_lat". Raises ValueError if invalid."""
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must have four comma-separated numbers")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat within valid ranges")
+    return min_lon, min_lat, max_lon, max_lat
@@ -0,0 +1,253 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import orjson
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import geohash
+from app.core.config import settings
+from app.database import replica_read
+from app.models.pollution import PollutionRollup
+
+# Geohash precisions that get rollups (~630 km down to ~150 m cells)
+ROLLUP_PRECISIONS = range(2, 8)
+BUCKET_SECONDS = 3600
+# Aim for at most 2**6 = 64 cells across a 256 px tile
+_CELLS_PER_TILE_BITS = 6
+
+
+def bucket_start(observed_at: datetime) -> datetime:
+    """Floors a timestamp to the start of its rollup bucket (UTC)."""
+    if observed_at.tzinfo is None:
+        observed_at = observed_at.replace(tzinfo=timezone.utc)
+    epoch = int(observed_at.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % BUCKET_SECONDS, tz=timezone.utc)
+
+
+def rollup_rows(observations: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Folds a batch of observations into one row per (precision, cell, bucket,
+    pollutant type), so each batch costs a single multi-row upsert.
+    """
+    cells: Dict[Tuple[int, str, datetime, str], List[float]] = {}
+    for obs in observations:
+        bucket = bucket_start(obs["observed_at"])
+        severity = obs["severity"]
+        for precision in ROLLUP_PRECISIONS:
+            key = (precision, obs["geohash"][:precision], bucket, obs["pollutant_type"])
+            agg = cells.get(key)
+            if agg is None:
+                cells[key] = [1, severity, severity]
+            else:
+                agg[0] += 1
+                agg[1] += severity
+                if severity > agg[2]:
+                    agg[2] = severity
+    return [
+        {
+            "precision": precision,
+            "geohash": cell,
+            "bucket_start": bucket,
+            "pollutant_type": pollutant_type,
+            "count": count,
+            "severity_sum": severity_sum,
+            "severity_max": severity_max,
+        }
+        for (precision, cell, bucket, pollutant_type), (count, severity_sum, severity_max)
+        in cells.items()
+    ]
+
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Rollup upserts are not supported on {dialect_name}")
+    return insert
+
+
+async def upsert_rollups(db: AsyncSession, observations: Iterable[Mapping[str, Any]]) -> int:
+    """
+    Adds a batch of observations to the rollup table in the caller's
+    transaction. Existing cells are incremented in place rather than
+    recomputed. Returns the number of rollup rows touched.
+    """
+    rows = rollup_rows(observations)
+    if not rows:
+        return 0
+    insert = _dialect_insert(db.get_bind().dialect.name)
+    stmt = insert(PollutionRollup.__table__)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["precision", "geohash", "bucket_start", "pollutant_type"],
+        set_={
+            "count": PollutionRollup.count + excluded.count,
+            "severity_sum": PollutionRollup.severity_sum + excluded.severity_sum,
+            "severity_max": case(
+                (excluded.severity_max > PollutionRollup.severity_max, excluded.severity_max),
+                else_=PollutionRollup.severity_max,
+            ),
+        },
+    )
+    await db.execute(stmt, rows)
+    return len(rows)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Returns (min_lat, min_lon, max_lat, max_lon) of a Web Mercator XYZ tile."""
+    n = 1 << z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def precision_for_zoom(z: int) -> int:
+    """Finest rollup precision that keeps a tile at about 64 cells across or fewer."""
+    best = ROLLUP_PRECISIONS[0]
+    for precision in ROLLUP_PRECISIONS:
+        lon_bits = (precision * 5 + 1) // 2
+        if lon_bits - z <= _CELLS_PER_TILE_BITS:
+            best = precision
+    return best
+
+
+class TileCache:
+    """
+    Small LRU of rendered tiles keyed by tile coordinates and query.
+
+    Entries are dropped once this process commits new rollups (``bump``) and
+    after ``ttl_seconds`` otherwise, which bounds how stale a tile can be
+    when another worker did the write.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] != self._version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def set(self, key: Tuple, etag: str, body: bytes, version: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, version, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+tile_cache = TileCache(
+    max_entries=settings.TILE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TILE_CACHE_TTL_SECONDS,
+)
+
+
+@replica_read
+async def _query_cells(
+    db: AsyncSession,
+    precision: int,
+    prefixes: List[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    pollutant_type: Optional[str],
+) -> List[Any]:
+    stmt = (
+        select(
+            PollutionRollup.geohash,
+            func.sum(PollutionRollup.count).label("observations"),
+            func.sum(PollutionRollup.severity_sum).label("severity_sum"),
+            func.max(PollutionRollup.severity_max).label("severity_max"),
+        )
+        .where(
+            PollutionRollup.precision == precision,
+            or_(*(PollutionRollup.geohash.startswith(prefix, autoescape=True) for prefix in prefixes)),
+        )
+        .group_by(PollutionRollup.geohash)
+    )
+    if start is not None:
+        stmt = stmt.where(PollutionRollup.bucket_start >= bucket_start(start))
+    if end is not None:
+        stmt = stmt.where(PollutionRollup.bucket_start < end)
+    if pollutant_type is not None:
+        stmt = stmt.where(PollutionRollup.pollutant_type == pollutant_type)
+    return (await db.execute(stmt)).all()
+
+
+async def render_tile(
+    db: AsyncSession,
+    z: int,
+    x: int,
+    y: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    pollutant_type: Optional[str] = None,
+) -> Tuple[str, bytes]:
+    """
+    Returns (etag, JSON body) for a heatmap tile, from cache when possible.
+    The ETag is a hash of the body, so it matches across workers.
+    """
+    key = (z, x, y, start, end, pollutant_type)
+    cached = tile_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = tile_cache.version
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+    precision = precision_for_zoom(z)
+    prefixes = sorted({
+        prefix[:precision]
+        for prefix in geohash.cover(min_lat, min_lon, max_lat, max_lon) or [""]
+    })
+    cells = []
+    for row in await _query_cells(db, precision, prefixes, start, end, pollutant_type):
+        cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon = geohash.bounds(row.geohash)
+        if cell_max_lat < min_lat or cell_min_lat > max_lat or cell_max_lon < min_lon or cell_min_lon > max_lon:
+            continue
+        cells.append({
+            "geohash": row.geohash,
+            "lat": (cell_min_lat + cell_max_lat) / 2,
+            "lon": (cell_min_lon + cell_max_lon) / 2,
+            "count": row.observations,
+            "mean_severity": row.severity_sum / row.observations,
+            "max_severity": row.severity_max,
+        })
+
+    body = orjson.dumps({"z": z, "x": x, "y": y, "precision": precision, "cells": cells})
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    tile_cache.set(key, etag, body, version)
+    return etag, body
@@ -0,0 +1,39 @@
+"""
+Standalone analysis job runner.
+
+Claims jobs queued by ``/analyze-image?mode=async`` and analyzes them, so
+the API workers only accept uploads. Run any number of these next to the API
+(with ANALYSIS_JOB_INLINE_RUNNER=False there), sharing its database and
+ANALYSIS_JOB_SPOOL_DIR:
+
+    python -m app.worker [--batch-size 32]
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.database import dispose_engines
+from app.services.analysis_engine import analysis_engine
+from app.services.analysis_jobs import JobRunner
+
+
+async def main(batch_size: int) -> None:
+    runner = JobRunner(batch_size=batch_size, poll_seconds=settings.ANALYSIS_JOB_POLL_SECONDS)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: loop.create_task(runner.stop()))
+    try:
+        await runner.run()
+    finally:
+        analysis_engine.shutdown()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued image analysis jobs.")
+    parser.add_argument("--batch-size", type=int, default=settings.ANALYSIS_MAX_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
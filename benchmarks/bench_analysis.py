@@ -0,0 +1,84 @@
+"""
+Throughput benchmark for app.services.analysis_engine.AnalysisEngine.
+
+Fires a fixed number of concurrent synthetic image analyses at the engine,
+once with batching disabled (``max_batch_size=1``, one model call per
+request) and once with micro-batching, and reports requests per second,
+mean batch size and the speedup.
+
+    python -m benchmarks.bench_analysis [--requests 2000] [--concurrency 64] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np  # noqa: E402
+
+from app.services.analysis_engine import AnalysisEngine  # noqa: E402
+
+MODEL = "app.services.analysis_models:StandInModel"
+
+
+def _images(count: int, size: int):
+    rng = np.random.default_rng(1)
+    return [memoryview(rng.integers(0, 256, size, dtype=np.uint8).tobytes()) for _ in range(count)]
+
+
+async def _run(engine: AnalysisEngine, images, n_requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await engine.analyze(images[i % len(images)])
+
+    # Warm up the worker pool so process start-up is not timed
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    engine._stats.update(requests=0, batches=0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return time.perf_counter() - start
+
+
+def bench(label: str, max_batch_size: int, args, images) -> float:
+    engine = AnalysisEngine(
+        MODEL,
+        workers=args.workers,
+        max_batch_size=max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_queue=args.requests + args.concurrency,
+    )
+    try:
+        elapsed = asyncio.run(_run(engine, images, args.requests, args.concurrency))
+    finally:
+        engine.shutdown()
+    stats = engine.stats()
+    throughput = args.requests / elapsed
+    print(f"{label:<10} {throughput:9.0f} req/s  mean batch {stats['mean_batch_size']:5.1f}  "
+          f"({stats['batches']} model calls)")
+    return throughput
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--image-bytes", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    images = _images(16, args.image_bytes)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.workers} workers")
+    single = bench("unbatched", 1, args, images)
+    batched = bench("batched", args.batch_size, args, images)
+    print(f"speedup:   {batched / single:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Severity analytics (/pollution/stats, /pollution/anomalies) over millions of readings.
+
+Fills an ObservationWindow with --readings synthetic readings from
+--sensors fixed sensors over the last 30 days (one sensor spikes in the
+current hour), then times:
+
+  * hourly and daily statistics (count, mean, max, percentiles, rolling
+    mean, z-score) per 4-character region over the whole window and over
+    the last day, against a per-row Python loop over --python-rows of the
+    readings (grouping in dicts, sorting each group for percentiles);
+  * anomaly scoring: the first request, which folds every hourly bucket
+    into the EWMA state, and a request after one more hour of readings
+    arrives, which folds only that hour;
+  * loading from the database: a full load of --db-rows rows, then a
+    refresh after 1% more are inserted, which reads only those.
+
+    python -m benchmarks.bench_analytics [--readings 10000000] [--sensors 5000] [--db-rows 200000]
+
+Exits with status 1 if the spike is not the top anomaly, the incrementally
+folded EWMA state differs from one folded from scratch, or a refresh reads
+more than the new rows.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-analytics-")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'analytics.db')}")
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core import geohash  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.pollution import PollutionObservation  # noqa: E402
+from app.services import pollution_analytics  # noqa: E402
+from app.services.pollution_analytics import ObservationWindow, SeverityAnalytics  # noqa: E402
+
+POLLUTANTS = ("oil", "plastic", "algae", "sewage")
+DAYS = 30
+
+
+class Feed:
+    """Synthetic readings from fixed sensors, each with its own severity level."""
+
+    def __init__(self, sensors: int, now: datetime):
+        self.rng = np.random.default_rng(11)
+        latitude, longitude = self.rng.uniform(-60, 60, sensors), self.rng.uniform(-180, 180, sensors)
+        self.cells = geohash.encode_many(latitude, longitude)
+        self.regions = pollution_analytics.encode_regions(self.cells)
+        self.level = self.rng.uniform(0.1, 0.5, sensors)
+        self.kind = self.rng.integers(0, len(POLLUTANTS), sensors)
+        self.now = int(now.timestamp())
+
+    def readings(self, count: int, start: int, end: int):
+        """(sensor index, epoch seconds, severity) of ``count`` readings in [start, end)."""
+        sensor = self.rng.integers(0, len(self.regions), count)
+        seconds = self.rng.integers(start, end, count)
+        severity = np.clip(self.level[sensor] + self.rng.normal(0, 0.05, count), 0, 1).astype(np.float32)
+        return sensor, seconds, severity
+
+    def append(self, window: ObservationWindow, sensor, seconds, severity) -> None:
+        window.append(self.regions[sensor], seconds, severity, [POLLUTANTS[k] for k in self.kind[sensor].tolist()])
+
+
+def python_stats(regions, buckets, severity, window: int):
+    """The per-row loop the vectorized version replaces."""
+    groups = {}
+    for region, bucket, value in zip(regions.tolist(), buckets.tolist(), severity.tolist()):
+        groups.setdefault((region, bucket), []).append(value)
+    stats = {}
+    for (region, bucket), values in groups.items():
+        values.sort()
+        count = len(values)
+        rolling = [v for b in range(bucket - window + 1, bucket + 1) for v in groups.get((region, b), ())]
+        stats[(region, bucket)] = (
+            count,
+            sum(values) / count,
+            values[-1],
+            [values[int((count - 1) * q / 100)] for q in pollution_analytics.PERCENTILES],
+            sum(rolling) / len(rolling),
+        )
+    return stats
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+async def timed_async(awaitable):
+    started = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - started
+
+
+def memory_analytics(window: ObservationWindow, now: datetime) -> SeverityAnalytics:
+    """A SeverityAnalytics serving ``window`` as if it had just loaded it."""
+    analytics = SeverityAnalytics(retention_days=DAYS)
+    analytics._window = window
+    analytics._rebuilt_at = time.monotonic()
+    analytics._as_of = now
+    return analytics
+
+
+async def in_memory(args: argparse.Namespace) -> bool:
+    now = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+    feed = Feed(args.sensors, now)
+    window = ObservationWindow()
+    start = feed.now - DAYS * 86400
+    hour_start = feed.now - feed.now % 3600
+    started = time.perf_counter()
+    for offset in range(0, args.readings, 1000000):
+        feed.append(window, *feed.readings(min(1000000, args.readings - offset), start, hour_start))
+    # The current hour, with one sensor reporting a spill
+    sensor, seconds, severity = feed.readings(args.readings // (DAYS * 24), hour_start, feed.now)
+    spiking = int(sensor[0])
+    severity[sensor == spiking] = 0.95
+    feed.append(window, sensor, seconds, severity)
+    elapsed = time.perf_counter() - started
+    print(f"window.append     {window.size / elapsed:12.0f} readings/s  ({window.size} readings, "
+          f"{sum(getattr(window, c)[:window.size].nbytes for c in ('region', 'seconds', 'severity', 'pollutant')) / 2**20:.0f} MiB)")
+
+    regions, seconds, severity = window.select(start, feed.now + 1, 4)
+    for bucket, size in pollution_analytics.BUCKETS.items():
+        stats, vectorized = timed(pollution_analytics.group_severity, regions, seconds // size, severity, 24, 6)
+        print(f"stats.{bucket:<5} all   {window.size / vectorized:12.0f} readings/s  "
+              f"({vectorized:.2f} s for {len(stats['bucket'])} region-{bucket}s)")
+        if bucket == "hour":
+            hourly = vectorized
+    sample = min(args.python_rows, window.size)
+    _, per_row = timed(python_stats, regions[:sample], seconds[:sample] // 3600, severity[:sample], 24)
+    print(f"stats.hour  python {sample / per_row:12.0f} readings/s  "
+          f"({per_row * window.size / sample:.0f} s projected for {window.size}; "
+          f"{per_row * window.size / sample / hourly:.0f}x slower)")
+
+    analytics = memory_analytics(window, now)
+    page, elapsed = await timed_async(analytics.region_stats("hour", 4, limit=10000))
+    print(f"GET /stats (last 24 h)  {elapsed * 1000:8.1f} ms  ({len(page['items'])} items)")
+
+    report, first = await timed_async(analytics.anomalies("hour", 4))
+    print(f"GET /anomalies first    {first * 1000:8.1f} ms  "
+          f"(folds {analytics._stats['folded_buckets']} hourly buckets)")
+    top = report["items"][0] if report["items"] else {}
+    expected = feed.cells[spiking][:4]
+    ok = top.get("region") == expected
+    print(f"anomalies: top {top.get('region')} (z {top.get('zscore')}, EWMA {top.get('ewma_score')}), "
+          f"spiking sensor in {expected}, {len(report['items'])} flagged  {'ok' if ok else 'FAILED'}")
+
+    # One more hour arrives: only the now-closed hour is folded
+    analytics._as_of = now + timedelta(hours=1)
+    feed.append(window, *feed.readings(args.readings // (DAYS * 24), feed.now, feed.now + 3600))
+    folded = analytics._stats["folded_buckets"]
+    _, incremental = await timed_async(analytics.anomalies("hour", 4))
+    print(f"GET /anomalies +1 hour  {incremental * 1000:8.1f} ms  "
+          f"(folds {analytics._stats['folded_buckets'] - folded} bucket; {first / incremental:.1f}x faster)")
+
+    state = next(iter(analytics._states.values()))
+    scratch = memory_analytics(window, now + timedelta(hours=1))
+    await scratch.anomalies("hour", 4)
+    fresh = next(iter(scratch._states.values()))
+    same = (
+        state.through == fresh.through
+        and np.array_equal(state.regions, fresh.regions)
+        and np.allclose(state.mean, fresh.mean)
+        and np.allclose(state.variance, fresh.variance)
+    )
+    print(f"ewma: incremental state {'matches' if same else 'DIFFERS FROM'} one folded from scratch")
+    return ok and same
+
+
+async def from_database(rows: int, sensors: int) -> bool:
+    migrate(get_engine())
+    rng = np.random.default_rng(5)
+    latitude, longitude = rng.uniform(-60, 60, sensors), rng.uniform(-180, 180, sensors)
+    cells = geohash.encode_many(latitude, longitude)
+    now = datetime.now(timezone.utc)
+
+    async def seed(count: int) -> None:
+        for offset in range(0, count, 50000):
+            batch = min(50000, count - offset)
+            sensor = rng.integers(0, sensors, batch)
+            seconds = rng.uniform(0, DAYS * 86400 - 3600, batch)
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(PollutionObservation.__table__), [
+                    {
+                        "latitude": latitude[i],
+                        "longitude": longitude[i],
+                        "geohash": cells[i],
+                        "observed_at": now - timedelta(seconds=second),
+                        "pollutant_type": POLLUTANTS[i % len(POLLUTANTS)],
+                        "severity": severity,
+                        "source_image": None,
+                    }
+                    for i, second, severity in zip(sensor.tolist(), seconds.tolist(), rng.random(batch).tolist())
+                ])
+                await db.commit()
+
+    await seed(rows)
+    analytics = SeverityAnalytics(retention_days=DAYS)
+    full, elapsed = await timed_async(analytics.refresh())
+    print(f"refresh.full      {full / elapsed:12.0f} rows/s  ({full} rows in {elapsed:.2f} s)")
+    added = max(rows // 100, 1)
+    await seed(added)
+    delta, elapsed = await timed_async(analytics.refresh())
+    ok = delta == added and analytics._window.size == rows + added
+    print(f"refresh.delta     {delta:12d} rows read in {elapsed * 1000:.0f} ms  "
+          f"({analytics._window.size} in the window)  {'ok' if ok else 'FAILED'}")
+    await dispose_engines()
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    ok = await in_memory(args)
+    ok = await from_database(args.db_rows, args.sensors) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readings", type=int, default=10000000)
+    parser.add_argument("--sensors", type=int, default=5000)
+    parser.add_argument("--python-rows", type=int, default=1000000, help="readings for the per-row Python loop")
+    parser.add_argument("--db-rows", type=int, default=200000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
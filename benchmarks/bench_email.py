@@ -0,0 +1,276 @@
+"""
+Registration latency and delivery throughput of the email outbox.
+
+Starts a small SMTP sink on a thread (accepts everything, with an optional
+delay per connection and per message, and can answer 451/550 for chosen
+domains), then:
+
+  * registers --registrations users sending the verification email inline
+    (one SMTP session per request, as a naive implementation would) and
+    again through the outbox (one INSERT in the registration transaction);
+  * dispatches --emails queued emails spread over 50 domains with reused
+    SMTP sessions and with a new session per message;
+  * checks that a domain answering 451 twice is delivered on the third
+    attempt, that a 550 fails without retries, and that a domain throttled
+    to --domain-rate emails per minute never receives more than that;
+  * checks that sent emails no longer hold their body (and token) and that
+    the cleanup purge deletes sent and failed emails but not pending ones.
+
+    python -m benchmarks.bench_email [--registrations 200] [--emails 2000] [--connect-ms 20] [--message-ms 1]
+
+Exits with status 1 if a retry, throttling or purge check fails.
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-email-")
+with socket.socket() as _probe:
+    _probe.bind(("127.0.0.1", 0))
+    _port = _probe.getsockname()[1]
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'email.db')}")
+os.environ["SMTP_HOST"] = "127.0.0.1"
+os.environ["SMTP_PORT"] = str(_port)
+os.environ["SMTP_STARTTLS"] = "false"
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import pwd_context  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.email_outbox import EmailOutbox  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import auth_service, email_outbox  # noqa: E402
+from app.services.email_outbox import EmailDispatcher, SMTPConnection  # noqa: E402
+from benchmarks.harness import summarize  # noqa: E402
+
+
+class SMTPSink:
+    """Just enough of an SMTP server for smtplib, running its own event loop on a thread."""
+
+    def __init__(self, port: int, connect_delay: float = 0.0, message_delay: float = 0.0):
+        self.port = port
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.connections = 0
+        self.deliveries = []  # (monotonic time, recipient domain)
+        self.replies = {}  # domain -> list of RCPT replies to give before accepting
+        self._ready = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True).start()
+        self._ready.wait()
+
+    def delivered(self, domain: str) -> int:
+        return sum(1 for _, to in self.deliveries if to == domain)
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(self._session, "127.0.0.1", self.port)
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(self.connect_delay)
+        writer.write(b"220 sink ESMTP\r\n")
+        domains = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif verb == b"RCPT":
+                domain = line.decode().rpartition("@")[2].strip().rstrip(">").lower()
+                pending = self.replies.get(domain)
+                if pending:
+                    writer.write(pending.pop(0))
+                else:
+                    domains.append(domain)
+                    writer.write(b"250 ok\r\n")
+            elif verb == b"DATA":
+                writer.write(b"354 go ahead\r\n")
+                await writer.drain()
+                while (await reader.readline()) not in (b".\r\n", b""):
+                    pass
+                await asyncio.sleep(self.message_delay)
+                now = time.monotonic()
+                self.deliveries.extend((now, domain) for domain in domains)
+                domains = []
+                writer.write(b"250 queued\r\n")
+            elif verb == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            elif verb == b"RSET":
+                domains = []
+                writer.write(b"250 ok\r\n")
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+
+async def register(run: str, count: int, hashed: str, inline: bool) -> None:
+    latencies = []
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for i in range(count):
+            call_started = time.perf_counter()
+            user = await auth_service._save(db, User(email=f"{run}-{inline}-{i}@example.org", hashed_password=hashed))
+            if inline:
+                # The verification email sent from the request, one SMTP session each
+                token = uuid.uuid4().hex
+                user.verification_token = token
+                await db.commit()
+                subject, body = email_outbox.verification_email(token)
+                message = EmailMessage()
+                message["From"], message["To"], message["Subject"] = settings.EMAIL_FROM, user.email, subject
+                message.set_content(body)
+                with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as smtp:
+                    smtp.send_message(message)
+            else:
+                await auth_service.create_verification_token(db, user)
+            latencies.append(time.perf_counter() - call_started)
+    print(summarize(f"register.{'inline_smtp' if inline else 'outbox'}", latencies,
+                    time.perf_counter() - started).line())
+
+
+async def enqueue(addresses) -> None:
+    async with AsyncSessionLocal() as db:
+        for address in addresses:
+            email_outbox.enqueue(db, address, "benchmark", "benchmark body\n")
+        await db.commit()
+
+
+async def drain(dispatcher: EmailDispatcher) -> None:
+    while await dispatcher.run_once():
+        pass
+
+
+async def throughput(name: str, sink: SMTPSink, emails: int, connections: int, reuse: bool) -> None:
+    await drain(EmailDispatcher(domain_rate_per_minute=10 ** 6))
+    await enqueue(f"user{i}@domain{i % 50}.example" for i in range(emails))
+    dispatcher = EmailDispatcher(batch_size=100, connections=connections, domain_rate_per_minute=10 ** 6)
+    if not reuse:
+        dispatcher._connections = [
+            SMTPConnection(settings.SMTP_HOST, settings.SMTP_PORT, starttls=False, idle_seconds=0)
+            for _ in range(connections)
+        ]
+    before = len(sink.deliveries)
+    started = time.perf_counter()
+    await drain(dispatcher)
+    elapsed = time.perf_counter() - started
+    await dispatcher.stop()
+    delivered = len(sink.deliveries) - before
+    stats = dispatcher.stats()
+    print(f"{name:<32} {delivered:6d} emails in {elapsed:6.2f} s  {delivered / elapsed:8.0f} emails/s  "
+          f"{stats['connections_opened']} SMTP sessions")
+
+
+async def retries(sink: SMTPSink) -> bool:
+    sink.replies["flaky.example"] = [b"451 try later\r\n", b"451 try later\r\n"]
+    sink.replies["gone.example"] = [b"550 no such user\r\n"]
+    await enqueue(["someone@flaky.example", "someone@gone.example"])
+    dispatcher = EmailDispatcher(retry_base_seconds=0.05, max_attempts=5, domain_rate_per_minute=10 ** 6)
+    deadline = time.monotonic() + 5
+    while sink.delivered("flaky.example") == 0 and time.monotonic() < deadline:
+        await dispatcher.run_once()
+        await asyncio.sleep(0.05)
+    await dispatcher.stop()
+    async with AsyncSessionLocal() as db:
+        rows = {row.domain: row for row in (await db.execute(
+            select(EmailOutbox).where(EmailOutbox.domain.in_(["flaky.example", "gone.example"]))
+        )).scalars()}
+    flaky, gone = rows["flaky.example"], rows["gone.example"]
+    ok = flaky.status == "sent" and flaky.attempts == 2 and gone.status == "failed" and gone.attempts == 1
+    print(f"retry: 451 x2 -> {flaky.status} after {flaky.attempts} failed attempts; "
+          f"550 -> {gone.status} after {gone.attempts}  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+async def throttle(sink: SMTPSink, rate: int, seconds: float) -> bool:
+    await enqueue(f"user{i}@throttled.example" for i in range(rate * 2))
+    dispatcher = EmailDispatcher(domain_rate_per_minute=rate, poll_seconds=0.05)
+    started = time.monotonic()
+    dispatcher.start()
+    await asyncio.sleep(seconds)
+    await dispatcher.stop()
+    elapsed = time.monotonic() - started
+    delivered = sink.delivered("throttled.example")
+    # GCRA: a burst of `rate`, then one every 60/rate seconds
+    allowed = rate + int(elapsed * rate / 60) + 1
+    ok = delivered <= allowed
+    print(f"throttle: {delivered} of {rate * 2} emails to one domain in {elapsed:.1f} s at {rate}/min "
+          f"(limit {allowed}), {dispatcher.stats()['throttled']} deferrals  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+async def purge() -> bool:
+    async def counts():
+        async with AsyncSessionLocal() as db:
+            return dict((await db.execute(
+                select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+            )).all())
+
+    async with AsyncSessionLocal() as db:
+        bodies = (await db.execute(
+            select(func.count()).where(EmailOutbox.status == email_outbox.SENT, EmailOutbox.body != "")
+        )).scalar()
+    before = await counts()
+    settings.EMAIL_OUTBOX_RETENTION_HOURS = 0
+    purged = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            batch = await email_outbox.purge_emails(db, 1000)
+            purged += batch
+            if batch < 1000:
+                break
+    after = await counts()
+    finished = before.get(email_outbox.SENT, 0) + before.get(email_outbox.FAILED, 0)
+    ok = bodies == 0 and purged == finished and set(after) <= {email_outbox.PENDING, email_outbox.SENDING}
+    print(f"purge: {bodies} sent emails still holding a body; {purged} of {finished} sent/failed deleted, "
+          f"left {after}  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    migrate(get_engine())
+    sink = SMTPSink(_port, connect_delay=args.connect_ms / 1000, message_delay=args.message_ms / 1000)
+    sink.start()
+    run = uuid.uuid4().hex[:6]
+    hashed = pwd_context.hash("benchmark-password")
+
+    await register(run, args.registrations, hashed, inline=True)
+    await register(run, args.registrations, hashed, inline=False)
+    await throughput("dispatch.reused_sessions", sink, args.emails, args.connections, reuse=True)
+    await throughput("dispatch.session_per_email", sink, args.emails, args.connections, reuse=False)
+    ok = await retries(sink)
+    ok = await throttle(sink, args.domain_rate, args.throttle_seconds) and ok
+    ok = await purge() and ok
+    await dispose_engines()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--registrations", type=int, default=200)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--connections", type=int, default=2)
+    parser.add_argument("--connect-ms", type=float, default=20, help="delay before the SMTP greeting")
+    parser.add_argument("--message-ms", type=float, default=1, help="delay before accepting each message")
+    parser.add_argument("--domain-rate", type=int, default=30, help="emails per minute for the throttle check")
+    parser.add_argument("--throttle-seconds", type=float, default=3)
+    sys.exit(asyncio.run(main(parser.parse_args())))
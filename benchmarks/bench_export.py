@@ -0,0 +1,171 @@
+"""
+Size, speed and memory of observation exports: NDJSON vs Arrow vs Parquet.
+
+Seeds --rows observations spread over 90 days, then exports them through
+pollution_service.stream_observations_ndjson and
+observation_export.stream_observations (Arrow IPC and Parquet, zstd) and
+reports bytes, export throughput, the time to load each export back
+(orjson per line, pyarrow for the columnar formats) and a projected
+Parquet export of three columns. Peak memory (Python heap plus the Arrow
+pool) is measured for the first quarter of the time range and for all of
+it, and should not grow with the number of rows. Record batches and row
+groups have exactly --batch-rows rows, checked on the written files.
+
+    python -m benchmarks.bench_export [--rows 400000] [--batch-rows 65536]
+
+Exits with status 1 if Parquet is not at least 3x smaller than NDJSON, peak
+memory grows by more than half from a quarter to all of the rows, or a
+batch has the wrong size.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-export-")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'export.db')}")
+
+import numpy as np  # noqa: E402
+import orjson  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core import geohash  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.pollution import PollutionObservation  # noqa: E402
+from app.services import observation_export, pollution_service  # noqa: E402
+from app.services.pollution_service import ObservationFilter  # noqa: E402
+
+POLLUTANTS = ("oil", "plastic", "algae", "sewage")
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+DAYS = 90
+
+
+async def seed(rows: int) -> None:
+    rng = np.random.default_rng(3)
+    for offset in range(0, rows, 50000):
+        count = min(50000, rows - offset)
+        latitude, longitude = rng.uniform(-60, 60, count), rng.uniform(-180, 180, count)
+        seconds = rng.uniform(0, DAYS * 86400, count)
+        values = [
+            {
+                "latitude": lat,
+                "longitude": lon,
+                "geohash": cell,
+                "observed_at": START + timedelta(seconds=second),
+                "pollutant_type": POLLUTANTS[kind],
+                "severity": severity,
+                "source_image": None,
+            }
+            for lat, lon, cell, second, kind, severity in zip(
+                latitude.tolist(), longitude.tolist(), geohash.encode_many(latitude, longitude),
+                seconds.tolist(), rng.integers(0, len(POLLUTANTS), count).tolist(), rng.random(count).tolist(),
+            )
+        ]
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(PollutionObservation.__table__), values)
+            await db.commit()
+
+
+def _stream(fmt: str, filters: ObservationFilter, columns=None, batch_rows=None):
+    if fmt == "ndjson":
+        # As served by GET /pollution-data?format=ndjson
+        return pollution_service.stream_observations_ndjson(filters)
+    return observation_export.stream_observations(filters, fmt, columns, batch_rows=batch_rows)
+
+
+async def export(fmt: str, filters: ObservationFilter, path: str, columns=None, batch_rows=None):
+    """Returns (bytes written, seconds)."""
+    written = 0
+    started = time.perf_counter()
+    with open(path, "wb") as output:
+        async for chunk in _stream(fmt, filters, columns, batch_rows):
+            output.write(chunk)
+            written += len(chunk)
+    return written, time.perf_counter() - started
+
+
+async def peak_memory(fmt: str, filters: ObservationFilter, batch_rows: int) -> int:
+    """Peak Python heap plus Arrow pool bytes while streaming an export (output discarded)."""
+    tracemalloc.start()
+    arrow_base = pa.total_allocated_bytes()
+    arrow_peak = 0
+    async for _ in _stream(fmt, filters, batch_rows=batch_rows):
+        arrow_peak = max(arrow_peak, pa.total_allocated_bytes() - arrow_base)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak + arrow_peak
+
+
+def batch_sizes(fmt: str, path: str) -> list:
+    if fmt == "arrow":
+        with pa.OSFile(path) as source:
+            return [batch.num_rows for batch in pa.ipc.open_stream(source)]
+    metadata = pq.ParquetFile(path).metadata
+    return [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+
+
+def load(fmt: str, path: str) -> float:
+    started = time.perf_counter()
+    if fmt == "ndjson":
+        with open(path, "rb") as source:
+            [orjson.loads(line) for line in source]
+    elif fmt == "arrow":
+        with pa.OSFile(path) as source:
+            pa.ipc.open_stream(source).read_all()
+    else:
+        pq.read_table(path)
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> int:
+    migrate(get_engine())
+    started = time.perf_counter()
+    await seed(args.rows)
+    print(f"seeded {args.rows} observations in {time.perf_counter() - started:.1f} s")
+
+    everything = ObservationFilter()
+    quarter = ObservationFilter(end=START + timedelta(days=DAYS / 4))
+    sizes, ok = {}, True
+    for fmt in ("ndjson", "arrow", "parquet"):
+        path = os.path.join(_workdir, f"export.{fmt}")
+        size, seconds = await export(fmt, everything, path, batch_rows=args.batch_rows)
+        sizes[fmt] = size
+        small = await peak_memory(fmt, quarter, args.batch_rows)
+        full = await peak_memory(fmt, everything, args.batch_rows)
+        print(f"{fmt:<8} {size / 2**20:8.1f} MiB ({sizes['ndjson'] / size:4.1f}x smaller)  "
+              f"export {args.rows / seconds:8.0f} rows/s  load {args.rows / load(fmt, path):9.0f} rows/s  "
+              f"peak memory {small / 2**20:6.1f} MiB for 1/4, {full / 2**20:6.1f} MiB for all")
+        if fmt != "ndjson" and full > small * 1.5:
+            print(f"{fmt}: memory grows with the export size")
+            ok = False
+        if fmt != "ndjson":
+            batches = batch_sizes(fmt, path)
+            if any(rows != args.batch_rows for rows in batches[:-1]) or sum(batches) != args.rows:
+                print(f"{fmt}: batches of {sorted(set(batches))} rows, {sum(batches)} in total")
+                ok = False
+        os.unlink(path)
+
+    path = os.path.join(_workdir, "projected.parquet")
+    columns = ["latitude", "longitude", "severity"]
+    size, seconds = await export("parquet", everything, path, columns, args.batch_rows)
+    print(f"parquet, {','.join(columns)}: {size / 2**20:.1f} MiB, export {args.rows / seconds:.0f} rows/s")
+    if sizes["parquet"] * 3 > sizes["ndjson"]:
+        print("parquet is less than 3x smaller than NDJSON")
+        ok = False
+    await dispose_engines()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=400000)
+    parser.add_argument("--batch-rows", type=int, default=65536)
+    sys.exit(asyncio.run(main(parser.parse_args())))
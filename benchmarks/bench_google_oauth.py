@@ -0,0 +1,105 @@
+"""
+Latency benchmark for Google token validation in POST /auth/google.
+
+Starts a local mock of Google's userinfo endpoint and validates tokens
+against it three ways: a new ``httpx.AsyncClient`` per call (the old
+behaviour, one fresh connection per login), the shared pooled client in
+app.services.google_oauth with distinct tokens, and the pooled client with
+repeated tokens (login retries served from the userinfo cache).
+
+    python -m benchmarks.bench_google_oauth [--requests 500] [--concurrency 8] [--delay-ms 0]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app.services.google_oauth import GoogleOAuthClient  # noqa: E402
+
+
+def mock_google(delay_ms: float) -> Starlette:
+    """Userinfo endpoint accepting any "Bearer ok-*" token."""
+    async def userinfo(request: Request):
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not token.startswith("ok-"):
+            return JSONResponse({"error": "invalid_token"}, status_code=401)
+        return JSONResponse({"sub": token, "email": f"{token}@example.com", "name": "Mock User"})
+
+    return Starlette(routes=[Route("/oauth2/v3/userinfo", userinfo)])
+
+
+def serve(app: Starlette) -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}/oauth2/v3/userinfo"
+
+
+async def _measure(call, tokens, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(token: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            assert await call(token) is not None
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(token) for token in tokens))
+    return time.perf_counter() - start, latencies
+
+
+def report(label: str, elapsed: float, latencies) -> float:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{label:<22} mean {statistics.fmean(latencies) * 1000:7.2f} ms  p50 {p50:7.2f} ms  "
+          f"p95 {p95:7.2f} ms  {len(latencies) / elapsed:8.0f} req/s")
+    return statistics.fmean(latencies)
+
+
+async def main(args) -> None:
+    url = serve(mock_google(args.delay_ms))
+    tokens = [f"ok-{i}" for i in range(args.requests)]
+
+    async def per_request_client(token: str):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url, headers={"Authorization": f"Bearer {token}"})
+            return response.json() if response.status_code == 200 else None
+
+    pooled = GoogleOAuthClient(url, cache_ttl_seconds=60)
+    await pooled.get_userinfo("ok-warmup")
+
+    before = report("new client per call", *await _measure(per_request_client, tokens, args.concurrency))
+    after = report("pooled client", *await _measure(pooled.get_userinfo, tokens, args.concurrency))
+    cached = report("pooled + cache (retry)", *await _measure(pooled.get_userinfo, tokens, args.concurrency))
+    print(f"pooled speedup {before / after:5.1f}x, cached retry speedup {before / cached:5.0f}x  "
+          f"(cache {pooled.stats()})")
+    await pooled.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=0, help="artificial userinfo latency")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,237 @@
+"""
+Throughput of batched observation ingest (POST /pollution/observations:batch).
+
+  * validation: the column-wise validate_readings against a Pydantic model
+    built per reading (plus the scalar geohash.encode, for the same rows),
+    over --validate-rows synthetic readings;
+  * writes: pollution_service.add_observations one reading per transaction
+    against the buffer's INGEST_FLUSH_ROWS-row batches, for readings spread
+    worldwide over a day (the rollup worst case, ~6 rollup cells per
+    reading) and for a live feed from --sensors fixed sensors;
+  * sustained ingest: --concurrency clients POST --batches NDJSON batches of
+    --batch-rows live readings from --sensors fixed sensors to a uvicorn server (one worker), then wait for
+    the write-behind buffer to drain and check every accepted reading was
+    stored;
+  * backpressure: a server with a 10k-row buffer gets 20 concurrent 5k-row
+    batches and must answer some of them 429 with Retry-After, without
+    losing any accepted reading.
+
+    python -m benchmarks.bench_ingest [--batches 40] [--batch-rows 5000] [--concurrency 4] [--sensors 1000]
+
+Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-ingest-")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'ingest.db')}")
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+from pydantic import BaseModel, Field  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.core import geohash  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.pollution import PollutionObservation  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import pollution_service  # noqa: E402
+from app.services.observation_ingest import validate_readings  # noqa: E402
+from benchmarks.bench_load import start_server  # noqa: E402
+
+API = "/api/v1"
+POLLUTANTS = ("oil", "plastic", "algae", "sewage")
+
+
+class ReadingIn(BaseModel):
+    """What per-row validation would look like."""
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    observed_at: datetime
+    pollutant_type: str = Field(min_length=1, max_length=64)
+    severity: float = Field(ge=0, allow_inf_nan=False)
+    source_image: Optional[str] = None
+
+
+def readings(count: int, rng: random.Random, sensors: Optional[List[tuple]] = None) -> List[dict]:
+    """
+    Readings from the last day at random positions worldwide, or a live feed
+    from fixed ``sensors`` ((lat, lon, pollutant type), drifting ~100 m)
+    over the last minute.
+    """
+    now = datetime.now(timezone.utc)
+    if sensors:
+        picks = [rng.choice(sensors) for _ in range(count)]
+        positions = [(lat + rng.uniform(-0.001, 0.001), lon + rng.uniform(-0.001, 0.001), kind)
+                     for lat, lon, kind in picks]
+        window = 60
+    else:
+        positions = [(rng.uniform(-60, 60), rng.uniform(-180, 180), POLLUTANTS[i % len(POLLUTANTS)])
+                     for i in range(count)]
+        window = 86400
+    return [
+        {
+            "latitude": lat,
+            "longitude": lon,
+            # Buoys send ISO timestamps, vessel sensors epoch seconds
+            "observed_at": (now - timedelta(seconds=rng.uniform(0, window))).isoformat()
+            if i % 2 else now.timestamp() - rng.uniform(0, window),
+            "pollutant_type": kind,
+            "severity": rng.random(),
+        }
+        for i, (lat, lon, kind) in enumerate(positions)
+    ]
+
+
+def validation(count: int, rng: random.Random) -> None:
+    records = readings(count, rng)
+    # Same input type for both: each reading's timestamp as an ISO string
+    records = [
+        {**record, "observed_at": datetime.fromtimestamp(record["observed_at"], tz=timezone.utc).isoformat()}
+        if not isinstance(record["observed_at"], str) else record
+        for record in records
+    ]
+    started = time.perf_counter()
+    rows, issues = validate_readings(records)
+    columnar = count / (time.perf_counter() - started)
+    assert len(rows) == count and not issues
+    started = time.perf_counter()
+    for record in records:
+        reading = ReadingIn.model_validate(record)
+        row = reading.model_dump()
+        row["geohash"] = geohash.encode(reading.latitude, reading.longitude)
+    per_row = count / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for record in records:
+        ReadingIn.model_validate(record)
+    model_only = count / (time.perf_counter() - started)
+    print(f"validate.columnar  {columnar:10.0f} readings/s")
+    print(f"validate.per_row   {per_row:10.0f} readings/s  ({columnar / per_row:.1f}x slower; "
+          f"model_validate alone {model_only:.0f}/s)")
+
+
+async def writes(rng: random.Random, sensors: Optional[List[tuple]], label: str) -> None:
+    rows, _ = validate_readings(readings(settings.INGEST_FLUSH_ROWS + 500, rng, sensors))
+    started = time.perf_counter()
+    for row in rows[:500]:
+        async with AsyncSessionLocal() as db:
+            await pollution_service.add_observations(db, [row])
+    single = 500 / (time.perf_counter() - started)
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await pollution_service.add_observations(db, rows[500:])
+    batched = settings.INGEST_FLUSH_ROWS / (time.perf_counter() - started)
+    print(f"write.row_per_txn {single:10.0f} rows/s  ({label})")
+    print(f"write.batched     {batched:10.0f} rows/s  ({label}; {settings.INGEST_FLUSH_ROWS} rows per INSERT, "
+          f"{batched / single:.0f}x)")
+
+
+async def stored() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(PollutionObservation))).scalar()
+
+
+async def post_batches(base_url: str, token: str, bodies: List[bytes], concurrency: int):
+    """Returns (accepted readings, 429 responses, Retry-After values seen, seconds)."""
+    accepted, throttled, retry_after = 0, 0, set()
+    queue = list(bodies)
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"}
+
+    async def client():
+        nonlocal accepted, throttled
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=120) as http:
+            while queue:
+                response = await http.post(f"{API}/pollution/observations:batch", content=queue.pop())
+                if response.status_code == 429:
+                    throttled += 1
+                    retry_after.add(response.headers.get("retry-after"))
+                else:
+                    response.raise_for_status()
+                    accepted += response.json()["accepted"]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return accepted, throttled, retry_after, time.perf_counter() - started
+
+
+async def drain(base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        while (await http.get(f"{API}/pollution/observations/stats")).json()["buffered"]:
+            await asyncio.sleep(0.05)
+
+
+def bodies(count: int, rows: int, rng: random.Random, sensors: List[tuple]) -> List[bytes]:
+    return [
+        b"".join(orjson.dumps(reading) + b"\n" for reading in readings(rows, rng, sensors))
+        for _ in range(count)
+    ]
+
+
+async def main(args: argparse.Namespace) -> int:
+    migrate(get_engine())
+    rng = random.Random(7)
+    sensors = [(rng.uniform(-60, 60), rng.uniform(-180, 180), rng.choice(POLLUTANTS)) for _ in range(args.sensors)]
+    validation(args.validate_rows, rng)
+    await writes(rng, None, "worldwide, last day")
+    await writes(rng, sensors, f"{args.sensors} sensors, live")
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User).values(email="sensor@example.org", is_active=True))
+        await db.commit()
+    token = create_access_token(subject="sensor@example.org")
+    ok = True
+
+    server, base_url = start_server()
+    try:
+        before = await stored()
+        payload = bodies(args.batches, args.batch_rows, rng, sensors)
+        started = time.perf_counter()
+        accepted, throttled, _, posting = await post_batches(base_url, token, payload, args.concurrency)
+        await drain(base_url)
+        elapsed = time.perf_counter() - started
+        persisted = await stored() - before
+        ok = persisted == accepted
+        print(f"ingest.sustained  {accepted / posting:10.0f} readings/s accepted, "
+              f"{persisted / elapsed:8.0f} readings/s stored  ({accepted} readings, {throttled} x 429, "
+              f"{'all stored' if ok else f'{persisted} stored: MISMATCH'})")
+    finally:
+        server.terminate()
+        server.wait()
+
+    os.environ["INGEST_BUFFER_MAX_ROWS"] = "10000"
+    server, base_url = start_server()
+    try:
+        before = await stored()
+        accepted, throttled, retry_after, _ = await post_batches(base_url, token, bodies(20, 5000, rng, sensors), 20)
+        await drain(base_url)
+        persisted = await stored() - before
+        held = throttled > 0 and None not in retry_after and persisted == accepted
+        ok = ok and held
+        print(f"backpressure      {throttled} of 20 batches got 429 (Retry-After {sorted(retry_after)}), "
+              f"{accepted} accepted, {persisted} stored  {'ok' if held else 'FAILED'}")
+    finally:
+        server.terminate()
+        server.wait()
+    await dispose_engines()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--validate-rows", type=int, default=100000)
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--batch-rows", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sensors", type=int, default=1000, help="fixed sensors the live readings come from")
+    sys.exit(asyncio.run(main(parser.parse_args())))
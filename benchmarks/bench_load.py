@@ -0,0 +1,188 @@
+"""
+Macro load scenarios against a real uvicorn server.
+
+Starts the app in a subprocess on a free local port (against the database
+benchmarks/run.py was given), seeds users and pollution observations, then
+drives each scenario with a fixed number of concurrent httpx clients.
+Rate limits are raised for the server so they do not cap throughput.
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Tuple
+
+import httpx
+
+from benchmarks.harness import Result, summarize
+
+API = "/api/v1"
+PASSWORD = "benchmark-password"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int = 1) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "AUTH_RATE_LIMIT_PER_MINUTE": "100000000",
+        "LOGIN_FAILURE_RATE_LIMIT_PER_MINUTE": "100000000",
+        "METRICS_ENABLED": os.environ.get("METRICS_ENABLED", "true"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Benchmark server did not start within 60s")
+
+
+async def run_scenario(
+    name: str,
+    call: Callable[[int], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int,
+) -> Result:
+    """Closed-loop load: ``concurrency`` workers issue ``total`` calls between them."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await call(i)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, time.perf_counter() - started, errors)
+
+
+async def _seed_users(client: httpx.AsyncClient, count: int) -> List[str]:
+    run = uuid.uuid4().hex[:8]
+    emails = [f"load-{run}-{i}@example.com" for i in range(count)]
+
+    async def register(email: str) -> None:
+        response = await client.post(f"{API}/auth/register", json={
+            "email": email, "password": PASSWORD, "full_name": "Load Test",
+        })
+        response.raise_for_status()
+        token = response.json()["verification_token"]
+        (await client.post(f"{API}/auth/verify-email", params={"token": token})).raise_for_status()
+
+    await asyncio.gather(*(register(email) for email in emails))
+    return emails
+
+
+async def _seed_observations(count: int) -> None:
+    from app.database import AsyncSessionLocal, dispose_engines
+    from app.services import pollution_service
+
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "latitude": rng.uniform(-60, 60),
+            "longitude": rng.uniform(-180, 180),
+            "observed_at": now - timedelta(minutes=rng.randrange(7 * 24 * 60)),
+            "pollutant_type": rng.choice(("plastic", "oil", "algae")),
+            "severity": rng.random(),
+        }
+        for _ in range(count)
+    ]
+    async with AsyncSessionLocal() as db:
+        for i in range(0, count, 1000):
+            await pollution_service.add_observations(db, rows[i:i + 1000])
+    await dispose_engines()
+
+
+async def _run(requests: int, concurrency: int, users: int, observations: int) -> List[Result]:
+    server, base_url = start_server()
+    results = []
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            emails = await _seed_users(client, users)
+            await _seed_observations(observations)
+
+            async def login(i: int) -> httpx.Response:
+                return await client.post(f"{API}/auth/login", data={
+                    "username": emails[i % len(emails)], "password": PASSWORD,
+                })
+
+            tokens = [(await login(i)).json()["access_token"] for i in range(len(emails))]
+
+            async def me(i: int) -> httpx.Response:
+                return await client.get(f"{API}/auth/me", headers={
+                    "Authorization": f"Bearer {tokens[i % len(tokens)]}",
+                })
+
+            async def login_me_mixed(i: int) -> httpx.Response:
+                # One login per nine authenticated reads
+                return await (login(i) if i % 10 == 0 else me(i))
+
+            run = uuid.uuid4().hex[:8]
+
+            async def register(i: int) -> httpx.Response:
+                return await client.post(f"{API}/auth/register", json={
+                    "email": f"register-{run}-{i}@example.com", "password": PASSWORD,
+                })
+
+            async def pollution_data(i: int) -> httpx.Response:
+                lon = (i * 37) % 300 - 150
+                return await client.get(f"{API}/pollution/pollution-data", params={
+                    "bbox": f"{lon},-30,{lon + 30},30", "limit": 100,
+                })
+
+            async def tile(i: int) -> httpx.Response:
+                z = 3
+                return await client.get(f"{API}/pollution/tiles/{z}/{i % 8}/{(i // 8) % 8}")
+
+            bcrypt_requests = max(requests // 10, concurrency)
+            scenarios = [
+                ("load.me", me, requests),
+                ("load.login_me_mixed", login_me_mixed, requests // 2),
+                ("load.login", login, bcrypt_requests),
+                ("load.register", register, bcrypt_requests),
+                ("load.pollution_data", pollution_data, requests),
+                ("load.tiles", tile, requests),
+            ]
+            for name, call, total in scenarios:
+                await call(total)  # warm up caches and connections
+                results.append(await run_scenario(name, call, total, concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def run(requests: int = 2000, concurrency: int = 16, users: int = 20, observations: int = 20_000) -> List[Result]:
+    return asyncio.run(_run(requests, concurrency, users, observations))
@@ -0,0 +1,88 @@
+"""
+Microbenchmarks for the auth hot path: JWT create/verify, per-IP rate limit
+checks and the user lookup behind every login and uncached /me.
+
+Imported by benchmarks/run.py after it has pointed DATABASE_URL at the
+benchmark database.
+"""
+import asyncio
+import uuid
+from typing import List
+
+from starlette.requests import Request
+
+from benchmarks.harness import Result, time_async_calls, time_calls
+
+
+def _request(ip: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/auth/login",
+        "headers": [],
+        "query_string": b"",
+        "client": (ip, 50000),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+def bench_tokens(iterations: int) -> List[Result]:
+    from app.core.security import create_access_token, decode_token
+
+    token = create_access_token("bench@example.com")
+    return [
+        time_calls("micro.token_create", lambda: create_access_token("bench@example.com"), iterations),
+        time_calls("micro.token_verify", lambda: decode_token(token), iterations),
+    ]
+
+
+async def _bench_rate_limit(iterations: int, distinct_ips: int = 10_000) -> Result:
+    from app.core.rate_limit import RateLimiter
+    from app.core.rate_limit_backends import MemoryBackend
+
+    limiter = RateLimiter(requests_per_minute=1_000_000, backend=MemoryBackend(max_keys=distinct_ips * 2))
+    requests = [_request(f"10.0.{i >> 8 & 255}.{i & 255}") for i in range(distinct_ips)]
+    position = iter(range(1 << 62))
+    return await time_async_calls(
+        "micro.rate_limit_check",
+        lambda: limiter.check_rate_limit(requests[next(position) % distinct_ips]),
+        iterations,
+    )
+
+
+async def _bench_user_lookup(iterations: int, users: int) -> Result:
+    from sqlalchemy import insert
+
+    from app.database import AsyncSessionLocal, dispose_engines
+    from app.models.user import User
+    from app.services import auth_service
+
+    run = uuid.uuid4().hex[:8]
+    emails = [f"lookup-{run}-{i}@example.com" for i in range(users)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"email": email, "hashed_password": "x", "full_name": "Bench", "is_active": True}
+            for email in emails
+        ])
+        await db.commit()
+
+    position = iter(range(1 << 62))
+    try:
+        async with AsyncSessionLocal() as db:
+            async def lookup():
+                user = await auth_service.get_user_by_email(db, emails[next(position) % users])
+                # Drop the identity map so every call pays for a real SELECT
+                db.expunge_all()
+                return user
+
+            return await time_async_calls("micro.get_user_by_email", lookup, iterations)
+    finally:
+        await dispose_engines()
+
+
+def run(iterations: int = 20_000) -> List[Result]:
+    results = bench_tokens(iterations)
+    results.append(asyncio.run(_bench_rate_limit(iterations)))
+    results.append(asyncio.run(_bench_user_lookup(max(iterations // 10, 100), users=1000)))
+    return results
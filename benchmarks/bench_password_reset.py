@@ -0,0 +1,180 @@
+"""
+Round trips, latency and single-use check for the password reset flow.
+
+Compares the old flow (verify SELECT from the endpoint, then SELECT user_id,
+UPDATE users, UPDATE password_resets, INSERT token_revocations) with
+auth_service.consume_reset_token, counting statements sent to the database
+per reset. Both use a pre-computed hash so only the database work is timed.
+Then fires --concurrency simultaneous full reset_password calls at each of
+--tokens tokens and checks that each token succeeds exactly once (the old
+flow is run the same way for comparison, without the check). Finally runs
+reset_password with unknown tokens and checks that none of them costs a
+bcrypt hash.
+
+    python -m benchmarks.bench_password_reset [--resets 500] [--tokens 50] [--concurrency 8]
+
+Uses a temporary SQLite database unless DATABASE_URL is set. Against
+PostgreSQL the new flow must be a single statement, and that is checked
+too; run it there as well, since the PostgreSQL path is a different
+statement:
+
+    DATABASE_URL=postgresql://localhost/bluescan_bench python -m benchmarks.bench_password_reset
+
+Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-reset-")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'reset.db')}")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+from sqlalchemy import event, insert, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.core.hashing import password_hasher  # noqa: E402
+from app.core.security import pwd_context  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import auth_service  # noqa: E402
+from benchmarks.harness import summarize  # noqa: E402
+
+statements = 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+async def legacy_reset(db, token: str, hashed_password: str) -> bool:
+    """The flow this replaces: verify_reset_token in the endpoint, then reset_password."""
+    if not await auth_service.verify_reset_token(db, token):
+        return False
+    user_id = (await db.execute(
+        text("SELECT user_id FROM password_resets WHERE token = :token"), {"token": token}
+    )).scalar()
+    generation = (await db.execute(
+        text("""UPDATE users SET hashed_password = :password,
+        token_generation = token_generation + 1
+        WHERE id = :user_id RETURNING token_generation"""),
+        {"password": hashed_password, "user_id": user_id},
+    )).scalar()
+    await db.execute(text("UPDATE password_resets SET used = TRUE WHERE token = :token"), {"token": token})
+    auth_service.token_revocations.add_generation(db, user_id, generation)
+    await db.commit()
+    return True
+
+
+async def new_reset(db, token: str, hashed_password: str) -> bool:
+    return await auth_service.consume_reset_token(db, token, hashed_password) is not None
+
+
+async def _tokens(user_id: int, count: int) -> list:
+    tokens = [secrets.token_urlsafe(16) for _ in range(count)]
+    async with AsyncSessionLocal() as db:
+        for token in tokens:
+            await auth_service.store_reset_token(db, user_id, token)
+    return tokens
+
+
+async def measure(name: str, flow, user_id: int, resets: int, hashed_password: str) -> float:
+    """Returns the statements sent per reset."""
+    tokens = await _tokens(user_id, resets)
+    latencies = []
+    before = statements
+    started = time.perf_counter()
+    for token in tokens:
+        async with AsyncSessionLocal() as db:
+            call_started = time.perf_counter()
+            assert await flow(db, token, hashed_password)
+            latencies.append(time.perf_counter() - call_started)
+    result = summarize(name, latencies, time.perf_counter() - started)
+    per_reset = (statements - before) / resets
+    print(f"{result.line()}  {per_reset:.1f} statements/reset")
+    return per_reset
+
+
+async def full_reset(db, token: str, hashed_password: str) -> bool:
+    """auth_service.reset_password, bcrypt included (``hashed_password`` is unused)."""
+    return await auth_service.reset_password(db, token, "another-password")
+
+
+async def single_use(name: str, flow, user_id: int, tokens: int, concurrency: int, hashed_password: str) -> list:
+    """Returns how many of the concurrent attempts succeeded, per token."""
+    async def attempt(token: str) -> bool:
+        while True:
+            async with AsyncSessionLocal() as db:
+                try:
+                    return await flow(db, token, hashed_password)
+                except OperationalError as exc:
+                    # SQLite allows one writer; a locked database is retried, anything else is a failure
+                    if "database is locked" not in str(exc):
+                        raise
+
+    counts = []
+    for token in await _tokens(user_id, tokens):
+        counts.append(sum(await asyncio.gather(*(attempt(token) for _ in range(concurrency)))))
+    print(f"{name:<24} {tokens} tokens x {concurrency} concurrent resets: "
+          f"{counts.count(1)} used exactly once, {sum(c > 1 for c in counts)} more than once, "
+          f"{counts.count(0)} never")
+    return counts
+
+
+async def bogus_tokens(attempts: int) -> bool:
+    """Resets with unknown tokens must be rejected without hashing."""
+    hashed = password_hasher.stats()["completed"]
+    async with AsyncSessionLocal() as db:
+        rejected = [not await auth_service.reset_password(db, secrets.token_urlsafe(32), "another-password")
+                    for _ in range(attempts)]
+    hashes = password_hasher.stats()["completed"] - hashed
+    ok = all(rejected) and hashes == 0
+    print(f"{attempts} unknown tokens: {sum(rejected)} rejected, {hashes} bcrypt hashes  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    migrate(get_engine())
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(
+            insert(User).values(email=f"reset-{secrets.token_hex(4)}@example.com", is_active=True).returning(User.id)
+        )).scalar()
+        await db.commit()
+    hashed_password = pwd_context.hash("benchmark-password")
+
+    await measure("reset.legacy", legacy_reset, user_id, args.resets, hashed_password)
+    per_reset = await measure("reset.atomic", new_reset, user_id, args.resets, hashed_password)
+    ok = True
+    if get_engine().dialect.name == "postgresql":
+        ok = per_reset == 1
+        print(f"postgresql: {per_reset:.1f} statements per reset, expected 1  {'ok' if ok else 'FAILED'}")
+    await single_use("legacy flow", legacy_reset, user_id, args.tokens, args.concurrency, hashed_password)
+    counts = await single_use("reset_password", full_reset, user_id, args.tokens, args.concurrency, hashed_password)
+    ok = counts == [1] * args.tokens and ok
+
+    token = (await _tokens(user_id, 1))[0]
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        assert await auth_service.reset_password(db, token, "another-password")
+        print(f"full reset_password incl. bcrypt: {(time.perf_counter() - started) * 1000:.0f} ms")
+        assert not await auth_service.reset_password(db, token, "another-password")
+    ok = await bogus_tokens(100) and ok
+    await dispose_engines()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resets", type=int, default=500)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    sys.exit(asyncio.run(main(parser.parse_args())))
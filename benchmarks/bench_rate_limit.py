@@ -0,0 +1,191 @@
+"""
+Microbenchmark for app.core.rate_limit.RateLimiter.
+
+Measures the cost of a single check with 100k distinct keys tracked, both
+through the raw ``hit`` call and through ``check_rate_limit`` with a real
+Starlette request, and reports how many keys the table holds afterwards.
+Checks that ``peek`` (used for limits that count only failures) uses up
+nothing.
+With ``--backend shared`` it also checks that several processes hitting the
+same key are held to one combined limit. ``--backend redis`` runs the Redis
+adapter against an in-process fake server (fakeredis with lupa for Lua)
+and checks that several clients of one server share a limit, and that
+while the server is down hits fall back to a local limit.
+
+    python -m benchmarks.bench_rate_limit [--keys 100000] [--rounds 5] [--backend memory|shared|redis]
+
+Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import HTTPException  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.core.rate_limit import RateLimiter  # noqa: E402
+from app.core.rate_limit_backends import MemoryBackend, RedisBackend, SharedMemoryBackend  # noqa: E402
+
+SHM_PATH = os.path.join(tempfile.gettempdir(), "bluescan-rate-limit-bench")
+
+
+def _fake_redis(server=None):
+    import fakeredis
+
+    return fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer())
+
+
+def _backend(kind: str, max_keys: int):
+    if kind == "redis":
+        return RedisBackend(client=_fake_redis())
+    if kind == "shared":
+        slots = 1 << max(max_keys * 2 - 1, 1).bit_length()
+        if os.path.exists(SHM_PATH):
+            os.unlink(SHM_PATH)
+        return SharedMemoryBackend(SHM_PATH, slots=slots)
+    return MemoryBackend(max_keys=max_keys)
+
+
+def _request(ip: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/auth/login",
+        "headers": [],
+        "query_string": b"",
+        "client": (ip, 50000),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+async def bench_hit(kind: str, n_keys: int, rounds: int) -> float:
+    limiter = RateLimiter(requests_per_minute=5, backend=_backend(kind, n_keys))
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(n_keys)]
+    for key in keys:
+        await limiter.hit(key)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            await limiter.hit(key)
+    elapsed = time.perf_counter() - start
+    print(f"hit():              {elapsed / (n_keys * rounds) * 1e9:8.0f} ns/check  "
+          f"({len(limiter)} keys tracked)")
+    return elapsed
+
+
+async def bench_check(kind: str, n_keys: int, rounds: int) -> float:
+    limiter = RateLimiter(requests_per_minute=rounds + 1, backend=_backend(kind, n_keys))
+    requests = [_request(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}") for i in range(n_keys)]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for request in requests:
+            try:
+                await limiter.check_rate_limit(request)
+            except HTTPException:
+                pass
+    elapsed = time.perf_counter() - start
+    print(f"check_rate_limit(): {elapsed / (n_keys * rounds) * 1e9:8.0f} ns/check  "
+          f"({len(limiter)} keys tracked)")
+    return elapsed
+
+
+async def bench_cap(kind: str, n_keys: int) -> None:
+    limiter = RateLimiter(requests_per_minute=5, backend=_backend(kind, n_keys // 10))
+    start = time.perf_counter()
+    for i in range(n_keys):
+        await limiter.hit(str(i))
+    elapsed = time.perf_counter() - start
+    print(f"over capacity:      {elapsed / n_keys * 1e9:8.0f} ns/check  "
+          f"({len(limiter)} keys tracked)")
+
+
+async def check_peek(kind: str) -> bool:
+    backend = _backend(kind, 1024)
+    peeks = [await backend.peek("peek", 12.0, 60.0) for _ in range(20)]
+    hits = [await backend.hit("peek", 12.0, 60.0) for _ in range(6)]
+    ok = peeks == [0.0] * 20 and hits[:5] == [0.0] * 5 and hits[5] > 0 and await backend.peek("peek", 12.0, 60.0) > 0
+    print(f"peek: 20 peeks then 6 hits, {sum(h == 0.0 for h in hits)} allowed (limit 5)  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+async def _allowed(limiter: RateLimiter, key: str, attempts: int) -> int:
+    return sum([await limiter.hit(key) == 0.0 for _ in range(attempts)])
+
+
+def _worker(attempts: int, allowed) -> None:
+    backend = SharedMemoryBackend(SHM_PATH, slots=1024)
+    limiter = RateLimiter(requests_per_minute=5, backend=backend)
+    count = asyncio.run(_allowed(limiter, "203.0.113.7", attempts))
+    with allowed.get_lock():
+        allowed.value += count
+
+
+def check_shared(workers: int = 4, attempts: int = 50) -> bool:
+    if os.path.exists(SHM_PATH):
+        os.unlink(SHM_PATH)
+    allowed = multiprocessing.Value("i", 0)
+    procs = [multiprocessing.Process(target=_worker, args=(attempts, allowed)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    ok = allowed.value == 5
+    print(f"{workers} processes x {attempts} attempts on one key: "
+          f"{allowed.value} allowed (limit 5)  {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+async def check_redis(clients: int = 4, attempts: int = 50) -> bool:
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    limiters = [
+        RateLimiter(requests_per_minute=5, backend=RedisBackend(client=_fake_redis(server), retry_interval=60))
+        for _ in range(clients)
+    ]
+    counts = await asyncio.gather(*(_allowed(limiter, "203.0.113.7", attempts) for limiter in limiters))
+    shared = sum(counts) == 5
+    print(f"{clients} clients of one server x {attempts} attempts on one key: "
+          f"{sum(counts)} allowed (limit 5)  {'ok' if shared else 'FAILED'}")
+
+    # Server down: each client limits on its own instead of allowing everything
+    server.connected = False
+    started = time.perf_counter()
+    counts = [await _allowed(limiter, "198.51.100.9", attempts) for limiter in limiters]
+    elapsed = time.perf_counter() - started
+    fallback = counts == [5] * clients
+    print(f"server down: {counts} allowed per client (limit 5 each) in "
+          f"{elapsed * 1000:.1f} ms  {'ok' if fallback else 'FAILED'}")
+    return shared and fallback
+
+
+async def main(args: argparse.Namespace) -> int:
+    print(f"{args.backend} backend, {args.keys} distinct keys, {args.rounds} rounds")
+    await bench_hit(args.backend, args.keys, args.rounds)
+    await bench_check(args.backend, args.keys, args.rounds)
+    await bench_cap(args.backend, args.keys)
+    ok = await check_peek(args.backend)
+    if args.backend == "shared":
+        ok = check_shared() and ok
+        os.unlink(SHM_PATH)
+    elif args.backend == "redis":
+        ok = await check_redis() and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--backend", choices=("memory", "shared", "redis"), default="memory")
+    sys.exit(asyncio.run(main(parser.parse_args())))
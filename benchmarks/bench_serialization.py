@@ -0,0 +1,197 @@
+"""
+Response serialization cost per response size: FastAPI's default path against the direct one.
+
+For pages of 1 to 1000 observations (GET /pollution/pollution-data), a
+user (POST /auth/register, GET /auth/me) and a 10000-item /pollution/stats
+page, times three ways of turning what the endpoint has into body bytes:
+
+  * fastapi+json: what the app did before - response_model validation of
+    the ORM objects / rows, conversion to JSON-ready Python, json.dumps
+    (JSONResponse);
+  * fastapi+orjson: the same with ORJSONResponse, the new app default for
+    routes that return plain data;
+  * direct: what the hot routes now do - responses.ModelResponse (the
+    model's fields read off the object, no validation, one orjson call) or
+    responses.list_response (orjson straight from the rows, streamed in
+    chunks past STREAM_CHUNK_ITEMS).
+
+Also reports the time to the first streamed chunk of the large page.
+
+    python -m benchmarks.bench_serialization [--seconds 0.5]
+
+Exits with status 1 if a direct body does not parse to the same JSON as
+the fastapi+json one.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-serialization-")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'serialization.db')}")
+
+import numpy as np  # noqa: E402
+import orjson  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.core import geohash, responses  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.pollution import PollutionObservation  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas import user as user_schemas  # noqa: E402
+from app.schemas.pollution import PollutionPage, RegionStatsPage  # noqa: E402
+from app.services import pollution_service  # noqa: E402
+from app.services.pollution_service import ObservationFilter  # noqa: E402
+
+POLLUTANTS = ("oil", "plastic", "algae", "sewage")
+
+
+async def seed() -> None:
+    rng = np.random.default_rng(2)
+    latitude, longitude = rng.uniform(-60, 60, 1000), rng.uniform(-180, 180, 1000)
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(PollutionObservation.__table__), [
+            {
+                "latitude": lat,
+                "longitude": lon,
+                "geohash": cell,
+                "observed_at": now - timedelta(seconds=second),
+                "pollutant_type": POLLUTANTS[i % len(POLLUTANTS)],
+                "severity": severity,
+                "source_image": f"s3://bluescan/images/{i}.jpg" if i % 3 == 0 else None,
+            }
+            for i, (lat, lon, cell, second, severity) in enumerate(zip(
+                latitude.tolist(), longitude.tolist(), geohash.encode_many(latitude, longitude),
+                rng.uniform(0, 86400, 1000).tolist(), rng.random(1000).tolist(),
+            ))
+        ])
+        await db.execute(insert(User).values(
+            email="reader@example.org", full_name="Reader", hashed_password="x", is_active=True,
+            created_at=now, updated_at=now,
+        ))
+        await db.commit()
+
+
+def stats_page(items: int) -> dict:
+    """A /pollution/stats page as SeverityAnalytics.region_stats returns it."""
+    rng = np.random.default_rng(4)
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    return {
+        "bucket": "hour",
+        "precision": 4,
+        "window": 24,
+        "as_of": datetime.now(timezone.utc),
+        "items": [
+            {
+                "region": f"u{i % 997:03d}",
+                "bucket_start": start + timedelta(hours=i // 997),
+                "count": int(count),
+                "mean": mean,
+                "max": mean + 0.2,
+                "p50": mean,
+                "p90": mean + 0.1,
+                "p99": mean + 0.15,
+                "rolling_mean": mean,
+                "zscore": None if i % 10 == 0 else z,
+            }
+            for i, (count, mean, z) in enumerate(zip(
+                rng.integers(1, 50, items).tolist(), rng.random(items).tolist(), rng.normal(0, 1, items).tolist()
+            ))
+        ],
+        "truncated": True,
+    }
+
+
+_fields = {}
+
+
+async def fastapi_body(model, content, response_class) -> bytes:
+    """What FastAPI does with a returned value for a route with response_model=model."""
+    field = _fields.get(model)
+    if field is None:
+        field = _fields[model] = create_model_field(name=f"Response_{model.__name__}", type_=model,
+                                                    mode="serialization")
+    value = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return response_class(value).body
+
+
+async def direct_body(response) -> bytes:
+    if hasattr(response, "body_iterator"):
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return response.body
+
+
+async def per_call(make, seconds: float) -> float:
+    """Mean seconds per ``await make()`` over about ``seconds`` of calls."""
+    calls, started = 0, time.perf_counter()
+    while True:
+        await make()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return elapsed / calls
+
+
+async def compare(name: str, model, content, direct, seconds: float) -> bool:
+    old = await fastapi_body(model, content, JSONResponse)
+    new = await direct_body(direct())
+    # json.dumps writes 1e-05 where orjson writes 1e-5, so compare parsed bodies
+    same = orjson.loads(old) == orjson.loads(new)
+    timings = [
+        await per_call(lambda: fastapi_body(model, content, JSONResponse), seconds),
+        await per_call(lambda: fastapi_body(model, content, ORJSONResponse), seconds),
+        await per_call(lambda: direct_body(direct()), seconds),
+    ]
+    print(f"{name:<22} {len(new) / 1024:9.1f} KiB  " + "  ".join(f"{t * 1e6:10.0f} us" for t in timings)
+          + f"  {timings[0] / timings[2]:5.1f}x{'' if same else '  BODY DIFFERS'}")
+    return same
+
+
+async def main(args: argparse.Namespace) -> int:
+    migrate(get_engine())
+    await seed()
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await pollution_service.list_observations(db, ObservationFilter(), 1000)
+        user = (await db.execute(select(User))).scalar_one()
+
+    print(f"{'response':<22} {'size':>13}  {'fastapi+json':>13}  {'fastapi+orjson':>13}  {'direct':>13}  speedup")
+    ok = True
+    for size in (1, 10, 100, 1000):
+        page = {"items": rows[:size], "next_cursor": next_cursor}
+        ok = await compare(f"pollution-data x{size}", PollutionPage, page,
+                           lambda: responses.list_response(page), args.seconds) and ok
+    registered = {"user": user, "verification_token": "x" * 43}
+    ok = await compare("register", user_schemas.UserRegistered, registered,
+                       lambda: responses.ModelResponse(user_schemas.UserRegistered, registered), args.seconds) and ok
+    ok = await compare("me", user_schemas.User, user,
+                       lambda: responses.ModelResponse(user_schemas.User, user), args.seconds) and ok
+    stats = stats_page(10000)
+    ok = await compare("stats x10000", RegionStatsPage, stats,
+                       lambda: responses.list_response(stats), args.seconds) and ok
+
+    started = time.perf_counter()
+    iterator = responses.list_response(stats).body_iterator
+    await iterator.__anext__()
+    first = time.perf_counter() - started
+    async for _ in iterator:
+        pass
+    print(f"stats x10000 streamed: first chunk after {first * 1e6:.0f} us, "
+          f"whole body {(time.perf_counter() - started) * 1e6:.0f} us, "
+          f"{responses.STREAM_CHUNK_ITEMS} items per chunk")
+    await dispose_engines()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=0.5, help="time spent on each measurement")
+    sys.exit(asyncio.run(main(parser.parse_args())))
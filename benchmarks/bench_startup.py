@@ -0,0 +1,76 @@
+"""
+Startup time budget for the API.
+
+Measures, each in a fresh interpreter, how long ``import app.main`` takes
+and how long the lifespan startup (schema version check, job runner start)
+takes against a migrated database. Prints the median of --runs runs and
+exits 1 when either median is over its budget, so it can gate CI.
+
+    python -m benchmarks.bench_startup [--runs 7] [--import-budget-ms 1500] [--startup-budget-ms 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Runs in the child interpreter; prints both timings as JSON
+_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    began = time.perf_counter()
+    async with app.main.lifespan(app.main.app):
+        return time.perf_counter() - began
+
+print(json.dumps({"import": imported - started, "startup": asyncio.run(startup())}))
+"""
+
+
+def measure(runs: int, env: dict) -> dict:
+    """Median import and startup seconds over ``runs`` fresh interpreters."""
+    samples = {"import": [], "startup": []}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        for key in samples:
+            samples[key].append(timings[key])
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--startup-budget-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bluescan-startup-")
+    env = {
+        **os.environ,
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark"),
+        "DATABASE_URL": os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'startup.db')}"),
+        "ANALYSIS_JOB_SPOOL_DIR": os.path.join(workdir, "jobs"),
+    }
+    subprocess.run([sys.executable, "-m", "app.migrate"], env=env, check=True, capture_output=True)
+
+    medians = measure(args.runs, env)
+    failed = False
+    for key, budget_ms in (("import", args.import_budget_ms), ("startup", args.startup_budget_ms)):
+        elapsed_ms = medians[key] * 1000
+        over = elapsed_ms > budget_ms
+        failed |= over
+        print(f"{key:8} {elapsed_ms:8.1f} ms  (budget {budget_ms:.0f} ms){'  OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Throughput of bulk user import versus one-account-at-a-time registration.
+
+Imports --users NDJSON rows carrying pre-computed bcrypt hashes through
+app.services.user_import (chunked multi-row INSERTs), and creates a sample
+of accounts the way /auth/register does (INSERT + commit, then a
+verification token + commit, per user) with the same hashes, so both
+measure only the database work. Then imports --password-rows rows with
+plaintext passwords to measure parallel bcrypt throughput on
+PASSWORD_HASH_WORKERS processes and projects the cost of 10k such rows.
+
+    python -m benchmarks.bench_user_import [--users 10000] [--password-rows 32]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+_workdir = tempfile.mkdtemp(prefix="bluescan-import-")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'import.db')}")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))
+
+import orjson  # noqa: E402
+
+from app.core.hashing import password_hasher  # noqa: E402
+from app.core.security import pwd_context  # noqa: E402
+from app.database import AsyncSessionLocal, dispose_engines, get_engine  # noqa: E402
+from app.migrate import migrate  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import auth_service  # noqa: E402
+from app.services.user_import import import_users  # noqa: E402
+
+
+async def _stream(rows):
+    # 64 KiB request-body-sized pieces
+    body = b"".join(orjson.dumps(row) + b"\n" for row in rows)
+    for start in range(0, len(body), 1 << 16):
+        yield body[start:start + (1 << 16)]
+
+
+async def main(args: argparse.Namespace) -> None:
+    migrate(get_engine())
+    run = uuid.uuid4().hex[:6]
+    hashed = pwd_context.hash("benchmark-password")
+
+    rows = [{"email": f"bulk-{run}-{i}@example.org", "hashed_password": hashed} for i in range(args.users)]
+    async with AsyncSessionLocal() as db:
+        report = await import_users(db, _stream(rows), "ndjson")
+    bulk_rate = report["created"] / report["seconds"]
+    print(f"bulk import            {report['created']:6d} users in {report['seconds']:7.2f} s  "
+          f"{bulk_rate:8.0f} users/s")
+
+    sample = min(args.users, 1000)
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for i in range(sample):
+            user = await auth_service._save(db, User(email=f"loop-{run}-{i}@example.org", hashed_password=hashed))
+            await auth_service.create_verification_token(db, user)
+    loop_rate = sample / (time.perf_counter() - started)
+    print(f"per-user register loop {sample:6d} users in {sample / loop_rate:7.2f} s  "
+          f"{loop_rate:8.0f} users/s  ({bulk_rate / loop_rate:.1f}x slower than bulk)")
+
+    rows = [{"email": f"pw-{run}-{i}@example.org", "password": f"Secret-{i}"} for i in range(args.password_rows)]
+    async with AsyncSessionLocal() as db:
+        report = await import_users(db, _stream(rows), "ndjson")
+    hash_rate = report["created"] / report["seconds"]
+    print(f"bulk with passwords    {report['created']:6d} users in {report['seconds']:7.2f} s  "
+          f"{hash_rate:8.1f} users/s on {password_hasher.workers} hash workers "
+          f"(10k users ~{10000 / hash_rate:.0f} s; bcrypt-bound, scales with workers)")
+    password_hasher.shutdown()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--password-rows", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+Shared pieces of the benchmark suite: latency summaries, JSON baselines and
+regression checks. See benchmarks/run.py for the command line.
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class Result:
+    name: str
+    n: int
+    ops_per_sec: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    errors: int = 0
+
+    def line(self) -> str:
+        return (f"{self.name:<32} {self.ops_per_sec:10.0f} ops/s  p50 {self.p50_ms:8.3f} ms  "
+                f"p95 {self.p95_ms:8.3f} ms  p99 {self.p99_ms:8.3f} ms"
+                + (f"  errors {self.errors}" if self.errors else ""))
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int = 0) -> Result:
+    """Builds a Result from per-operation latencies (seconds) and wall time."""
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+    return Result(
+        name=name,
+        n=len(ordered),
+        ops_per_sec=len(ordered) / elapsed if elapsed else 0.0,
+        mean_ms=statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        p50_ms=pct(0.50),
+        p95_ms=pct(0.95),
+        p99_ms=pct(0.99),
+        errors=errors,
+    )
+
+
+def time_calls(name: str, func, iterations: int) -> Result:
+    """Times ``func()`` ``iterations`` times, one latency sample per call."""
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(iterations):
+        before = clock()
+        func()
+        latencies.append(clock() - before)
+    return summarize(name, latencies, clock() - start)
+
+
+async def time_async_calls(name: str, func, iterations: int) -> Result:
+    """Times ``await func()`` ``iterations`` times sequentially."""
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(iterations):
+        before = clock()
+        await func()
+        latencies.append(clock() - before)
+    return summarize(name, latencies, clock() - start)
+
+
+def save_baseline(path: str, results: Iterable[Result], meta: Optional[Dict] = None) -> None:
+    payload = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            **(meta or {}),
+        },
+        "results": {result.name: asdict(result) for result in results},
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def compare(path: str, results: Iterable[Result], threshold: float) -> List[str]:
+    """
+    Compares results with a saved baseline. Returns one message per
+    benchmark whose throughput dropped, or whose p95 latency grew, by more
+    than ``threshold`` (a fraction, 0.1 = 10%).
+    """
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        if before["ops_per_sec"] and result.ops_per_sec < before["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{result.name}: throughput {before['ops_per_sec']:.0f} -> {result.ops_per_sec:.0f} ops/s"
+            )
+        if before["p95_ms"] and result.p95_ms > before["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{result.name}: p95 {before['p95_ms']:.3f} -> {result.p95_ms:.3f} ms"
+            )
+    return regressions
@@ -0,0 +1,76 @@
+"""
+Benchmark suite for the auth and pollution APIs.
+
+Runs the microbenchmarks (token create/verify, rate limit checks, user
+lookup) and/or the load scenarios (uvicorn + concurrent httpx clients),
+prints throughput and tail latency, and optionally saves the results as a
+JSON baseline or compares them with one. With --compare the exit status is
+1 when any benchmark regressed by more than --threshold.
+
+    python -m benchmarks.run [--suite all|micro|load] [--database-url URL]
+                             [--save baseline.json] [--compare baseline.json] [--threshold 0.1]
+
+Without --database-url a fresh SQLite file in a temp directory is used. For
+Postgres pass a database you can write benchmark users and observations to.
+The schema is migrated before any suite runs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suite", choices=("all", "micro", "load"), default="all")
+    parser.add_argument("--database-url", help="sync SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--iterations", type=int, default=20_000, help="calls per microbenchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per load scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bluescan-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Settings are read at import time, so configure them before importing app modules
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))
+    os.environ.setdefault("ANALYSIS_JOB_SPOOL_DIR", os.path.join(workdir, "jobs"))
+
+    from app.database import get_engine
+    from app.migrate import migrate
+    from benchmarks import harness
+
+    migrate(get_engine())
+    get_engine().dispose()
+    results = []
+    if args.suite in ("all", "micro"):
+        from benchmarks import bench_micro
+        results += bench_micro.run(args.iterations)
+    if args.suite in ("all", "load"):
+        from benchmarks import bench_load
+        results += bench_load.run(args.requests, args.concurrency)
+
+    print(f"database: {database_url}")
+    for result in results:
+        print(result.line())
+
+    meta = {"database": database_url.split("://")[0], "concurrency": args.concurrency}
+    if args.save:
+        harness.save_baseline(args.save, results, meta)
+        print(f"saved baseline to {args.save}")
+    if args.compare:
+        regressions = harness.compare(args.compare, results, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())